@@ -39,7 +39,7 @@ echo "=== Push $AGENT_NAME to ECR Succeeded! Tag: ${VERSION_TAG} ==="
 # AGENT_NAME="a2a_demo_remote_agent1"
 # ECR_IMAGE="${ECR_BASE}/${AGENT_NAME}"
 # echo "--- Building $AGENT_NAME ---"
-# docker build -f services/remote-agent-1/Dockerfile -t ${AGENT_NAME}:${VERSION_TAG} services/remote-agent-1 --network sagemaker
+# docker build -f services/remote-agent-1/Dockerfile -t ${AGENT_NAME}:${VERSION_TAG} services --network sagemaker
 # docker tag ${AGENT_NAME}:${VERSION_TAG} ${ECR_IMAGE}:${VERSION_TAG}
 # docker push ${ECR_IMAGE}:${VERSION_TAG}
 # echo "=== Push $AGENT_NAME to ECR Succeeded! Tag: ${VERSION_TAG} ==="
@@ -49,7 +49,7 @@ echo "=== Push $AGENT_NAME to ECR Succeeded! Tag: ${VERSION_TAG} ==="
 # AGENT_NAME="a2a_demo_remote_agent2"
 # ECR_IMAGE="${ECR_BASE}/${AGENT_NAME}"
 # echo "--- Building $AGENT_NAME ---"
-# docker build -f services/remote-agent-2/Dockerfile -t ${AGENT_NAME}:${VERSION_TAG} services/remote-agent-2 --network sagemaker
+# docker build -f services/remote-agent-2/Dockerfile -t ${AGENT_NAME}:${VERSION_TAG} services --network sagemaker
 # docker tag ${AGENT_NAME}:${VERSION_TAG} ${ECR_IMAGE}:${VERSION_TAG}
 # docker push ${ECR_IMAGE}:${VERSION_TAG}
 # echo "=== Push $AGENT_NAME to ECR Succeeded! Tag: ${VERSION_TAG} ==="
@@ -23,8 +23,8 @@ echo "=== Push Root Agent to ECR Succeeded! ==="
 
 # Remote Agent 1 Images
 REMOTE_AGENT1='182399696164.dkr.ecr.ap-southeast-1.amazonaws.com/image/a2a_demo_remote_agent1'
-echo "docker build -f services/remote-agent-1/Dockerfile -t image/a2a_demo_remote_agent1:latest . --network sagemaker"
-docker build -f services/remote-agent-1/Dockerfile -t image/a2a_demo_remote_agent1:latest services/remote-agent-1 --network sagemaker
+echo "docker build -f services/remote-agent-1/Dockerfile -t image/a2a_demo_remote_agent1:latest services --network sagemaker"
+docker build -f services/remote-agent-1/Dockerfile -t image/a2a_demo_remote_agent1:latest services --network sagemaker
 echo "=== Build Remote Agent 1 Docker Succeeded! ==="
 
 echo "docker tag image/a2a_demo_remote_agent1:latest $REMOTE_AGENT1:latest"
@@ -38,8 +38,8 @@ echo "=== Push Root Agent to ECR Succeeded! ==="
 
 # Remote Agent 2 Images
 REMOTE_AGENT2='182399696164.dkr.ecr.ap-southeast-1.amazonaws.com/image/a2a_demo_remote_agent2'
-echo "docker build -f services/remote-agent-2/Dockerfile -t a2a_demo_remote_agent2:latest . --network sagemaker"
-docker build -f services/remote-agent-2/Dockerfile -t a2a_demo_remote_agent2:latest services/remote-agent-2 --network sagemaker
+echo "docker build -f services/remote-agent-2/Dockerfile -t a2a_demo_remote_agent2:latest services --network sagemaker"
+docker build -f services/remote-agent-2/Dockerfile -t a2a_demo_remote_agent2:latest services --network sagemaker
 echo "=== Build Remote Agent 2 Docker Succeeded! ==="
 
 echo "docker tag a2a_demo_remote_agent2:latest $REMOTE_AGENT2:latest"
@@ -0,0 +1,37 @@
+# a2a_cash_flow_demo/services/remote-agent-1/app/handlers.py
+
+import time
+import logging
+from typing import Any, Dict
+
+from a2a_worker.runtime import TaskHandler
+from recognition import get_engine
+
+logger = logging.getLogger(__name__)
+
+
+def recognize_transactions(task: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Task.RecognizeTransactions: categorizes the loan case's bank transactions
+    into cash-flow buckets with monthly inflow / outflow / net. CPU-bound, so
+    it runs in the worker's process pool.
+    """
+    started = time.perf_counter()
+    case_id = task.get("loan_case_id") or task["task_id"]
+    summary = get_engine().recognize_cases({case_id: task.get("transactions") or []})[case_id]
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    logger.info("Recognized %d transactions for loan case %s in %.1f ms",
+                summary["transaction_count"], case_id, elapsed_ms)
+    return {"loan_case_id": task.get("loan_case_id"), **summary, "elapsed_ms": round(elapsed_ms, 3)}
+
+
+HANDLERS = [
+    TaskHandler(
+        "Task.RecognizeTransactions",
+        recognize_transactions,
+        source="remote-agent-a",
+        succeeded_status="transactions_recognized",
+        failed_status="error_dispatch_a",
+        cpu_bound=True,
+    ),
+]
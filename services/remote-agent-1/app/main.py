@@ -1,14 +1,50 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.responses import JSONResponse
 import uvicorn
+import logging
 import os
 
-app = FastAPI()
+from a2a_worker.invoke import InvokeService, build_router
+from a2a_worker.runtime import HandlerRunner, build_worker
+from handlers import HANDLERS
+
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO"))
+
 PORT = int(os.environ.get("PORT", 50001))
 
+# SQS worker 與 HTTP (POST /a2a/invoke) 共用同一組 handler 執行資源
+runner = HandlerRunner()
+invoke_service = InvokeService(HANDLERS, runner)
+worker = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 啟動時開始消費派工佇列，關閉時先把處理中的任務收尾
+    global worker
+    worker = build_worker(HANDLERS, runner=runner)
+    if worker:
+        worker.start()
+    # 202 之後的結果以 callback 回報時走同一個 callback queue
+    invoke_service.report = worker.report if worker else None
+    yield
+    await invoke_service.close()
+    if worker:
+        await worker.stop()
+    runner.shutdown()
+
+app = FastAPI(lifespan=lifespan)
+app.include_router(build_router(invoke_service))
+
 @app.get("/")
 def status():
-    return JSONResponse({"status": "OK", "agent": "Remote Agent 1", "port": PORT})
+    return JSONResponse({
+        "status": "OK",
+        "agent": "Remote Agent 1",
+        "port": PORT,
+        "worker": worker.stats if worker else None,
+        "invoke": invoke_service.stats,
+    })
 
 if __name__ == "__main__":
     # 這裡就用你指定的寫法；注意：reload 在容器內要搭配掛載原始碼才看得到變更
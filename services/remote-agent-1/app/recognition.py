@@ -0,0 +1,354 @@
+# a2a_cash_flow_demo/services/remote-agent-1/app/recognition.py
+
+import os
+import re
+import json
+import logging
+import threading
+from operator import itemgetter
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+# --- Configuration ---
+# 自訂分類規則 (JSON 陣列)，未設定時使用內建規則
+RECOGNITION_RULES_PATH = os.getenv("RECOGNITION_RULES_PATH")
+# 描述字串 -> 分類結果的快取上限；同一個 process 處理的案件常有相同的商家/對象
+RECOGNITION_MEMO_MAX_ENTRIES = int(os.getenv("RECOGNITION_MEMO_MAX_ENTRIES", "200000"))
+
+UNCATEGORIZED = "uncategorized"
+
+# category -> cash-flow bucket
+CATEGORY_BUCKETS = {
+    "sales_revenue": "operating",
+    "salary_income": "operating",
+    "interest_income": "operating",
+    "tax_refund": "operating",
+    "payroll": "operating",
+    "rent": "operating",
+    "utilities": "operating",
+    "tax": "operating",
+    "supplier_payment": "operating",
+    "card_spend": "operating",
+    "bank_fees": "operating",
+    "loan_disbursement": "financing",
+    "loan_repayment": "financing",
+    "cash_deposit": "non_operating",
+    "cash_withdrawal": "non_operating",
+    "transfer_in": "non_operating",
+    "transfer_out": "non_operating",
+    UNCATEGORIZED: "unclassified",
+}
+
+# (category, direction, keywords, pattern) in priority order; direction is
+# "in" (amount > 0), "out" (amount < 0) or "any". A rule applies when one of
+# its keywords is a token of the normalized description and, if given, its
+# pattern matches too. Keywords double as the index that picks candidate rules.
+DEFAULT_RULES: List[Tuple[str, str, Tuple[str, ...], Optional[str]]] = [
+    ("loan_disbursement", "in", ("LOAN",), r"\bLOAN (DISB|DISBURSEMENT|DRAWDOWN)\b"),
+    ("loan_repayment", "out", ("LOAN", "EMI", "INSTALMENT", "INSTALLMENT", "REPAYMENT"), None),
+    ("payroll", "out", ("PAYROLL", "SALARY", "SALARIES", "WAGES", "CPF"), None),
+    ("salary_income", "in", ("PAYROLL", "SALARY"), None),
+    ("tax_refund", "in", ("IRAS", "TAX", "GST"), r"\b(REFUND|REBATE)\b"),
+    ("tax", "out", ("IRAS", "TAX", "GST", "VAT"), None),
+    ("rent", "out", ("RENT", "RENTAL", "LEASE"), None),
+    ("utilities", "out", ("ELECTRIC", "ELECTRICITY", "WATER", "GAS", "TELECOM", "INTERNET",
+                          "UTILITIES", "SINGTEL", "STARHUB", "SP"), None),
+    ("bank_fees", "out", ("FEE", "FEES", "CHARGE", "CHARGES", "COMMISSION"), None),
+    ("interest_income", "in", ("INTEREST",), None),
+    ("sales_revenue", "in", ("SETTLEMENT", "STRIPE", "PAYPAL", "SQUARE", "MERCHANT", "SHOPEE", "LAZADA", "GRAB"), None),
+    ("supplier_payment", "out", ("SUPPLIER", "INVOICE", "INV", "PO"), None),
+    ("cash_withdrawal", "out", ("ATM", "WITHDRAWAL", "CASH"), None),
+    ("cash_deposit", "in", ("CDM", "DEPOSIT", "CASH"), None),
+    ("card_spend", "out", ("POS", "PURCHASE", "VISA", "MASTERCARD", "NETS"), None),
+    ("transfer_in", "in", ("TRANSFER", "TRF", "FAST", "GIRO", "PAYNOW", "IBG"), None),
+    ("transfer_out", "out", ("TRANSFER", "TRF", "FAST", "GIRO", "PAYNOW", "IBG"), None),
+]
+
+_DIRECTIONS = {"in": 1, "out": -1, "any": 0}
+# 數字、參考編號、標點一律去掉，讓同一商家的描述收斂成同一個 key
+_NON_ALPHA = re.compile(r"[^A-Z]+")
+# A-Z 與換行保留，其他 byte (含 UTF-8 多位元組字元) 一律換成空白
+_ALPHA_TABLE = bytes(c if 65 <= c <= 90 or c == 10 else 32 for c in range(256))
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_description(description: Any) -> str:
+    return _NON_ALPHA.sub(" ", str(description or "").upper()).strip()
+
+
+def normalize_descriptions(descriptions: Sequence[Any]) -> List[str]:
+    """
+    `normalize_description` over many strings: one upper() and one byte-table
+    translate over their concatenation instead of a regex call per string.
+    """
+    strings = [d if d.__class__ is str else str(d or "") for d in descriptions]
+    text = "\n".join(strings).upper().encode("utf-8", "replace").translate(_ALPHA_TABLE).decode("ascii")
+    parts = text.split("\n")
+    if len(parts) != len(strings):
+        # 描述本身含換行，逐筆處理
+        return [normalize_description(d) for d in strings]
+    return [" ".join(part.split()) for part in parts]
+
+
+class CategoryRule:
+    __slots__ = ("category", "direction", "keywords", "pattern")
+
+    def __init__(self, category: str, direction: str = "any", keywords: Iterable[str] = (), pattern: Optional[str] = None):
+        if direction not in _DIRECTIONS:
+            raise ValueError(f"Unknown rule direction {direction!r} for {category}")
+        self.category = category
+        self.direction = _DIRECTIONS[direction]
+        self.keywords = tuple(keyword.upper() for keyword in keywords)
+        self.pattern = re.compile(pattern) if pattern else None
+
+
+class RecognitionEngine:
+    """
+    Categorizes bank transactions of many loan cases at once and aggregates
+    them into monthly and per-category cash flows.
+
+    Rows of all cases are loaded into columnar NumPy arrays (case index,
+    month, amount) plus one code per row for its description. Descriptions
+    are factorized: each distinct raw string is normalized once, each
+    distinct normalized string is matched once, and the rules evaluated are
+    only the candidates found through the keyword index, in priority order.
+    The per-row category is then a single `np.where` over the amount's sign,
+    and every aggregate is a `np.bincount` over a combined (case, key) index.
+    Month keys are factorized with `np.unique` first, so memory follows the
+    (case, month) pairs present rather than the batch's date range.
+    """
+
+    def __init__(self, rules: Sequence[CategoryRule], memo_max_entries: int = RECOGNITION_MEMO_MAX_ENTRIES):
+        self.rules = list(rules)
+        self.categories = sorted({rule.category for rule in self.rules} | {UNCATEGORIZED})
+        self._category_codes = {category: code for code, category in enumerate(self.categories)}
+        self._uncategorized = self._category_codes[UNCATEGORIZED]
+        self._rule_codes = [self._category_codes[rule.category] for rule in self.rules]
+
+        self._index: Dict[str, List[int]] = {}
+        self._always: List[int] = []
+        for position, rule in enumerate(self.rules):
+            if not rule.keywords:
+                self._always.append(position)
+            for keyword in rule.keywords:
+                self._index.setdefault(keyword, []).append(position)
+
+        self.memo_max_entries = memo_max_entries
+        # 正規化後的描述 -> (流入時的分類, 流出時的分類)
+        self._memo: Dict[str, Tuple[int, int]] = {}
+
+    # --- Categorization ---
+
+    def _classify(self, normalized: str) -> Tuple[int, int]:
+        cached = self._memo.get(normalized)
+        if cached is not None:
+            return cached
+
+        candidates = set(self._always)
+        for token in normalized.split():
+            candidates.update(self._index.get(token, ()))
+        inflow = outflow = self._uncategorized
+        found_in = found_out = False
+        for position in sorted(candidates):
+            rule = self.rules[position]
+            if rule.pattern is not None and not rule.pattern.search(normalized):
+                continue
+            if not found_in and rule.direction >= 0:
+                inflow, found_in = self._rule_codes[position], True
+            if not found_out and rule.direction <= 0:
+                outflow, found_out = self._rule_codes[position], True
+            if found_in and found_out:
+                break
+
+        if len(self._memo) >= self.memo_max_entries:
+            self._memo.clear()
+        self._memo[normalized] = (inflow, outflow)
+        return inflow, outflow
+
+    def categorize(self, descriptions: Sequence[Any], amounts: np.ndarray) -> np.ndarray:
+        """
+        Category code of every row.
+        """
+        # factorize：每個不同的原始描述只處理一次
+        raw_codes: Dict[Any, int] = {}
+        row_codes = np.array([raw_codes.setdefault(d, len(raw_codes)) for d in descriptions], dtype=np.int64)
+        memo_get = self._memo.get
+        pairs = [memo_get(normalized) or self._classify(normalized) for normalized in normalize_descriptions(list(raw_codes))]
+        inflow, outflow = (np.array(column, dtype=np.int16) for column in zip(*pairs)) if pairs else (np.empty(0, np.int16),) * 2
+        return np.where(amounts >= 0, inflow[row_codes], outflow[row_codes])
+
+    # --- Batch recognition ---
+
+    def recognize_cases(self, cases: Mapping[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """
+        Summaries for a batch of loan cases. Each value is either a list of
+        `{"date", "amount", "description"}` rows or the same three keys as
+        parallel lists. Rows without a valid date or amount are skipped and
+        counted as `invalid_count`.
+        """
+        case_ids = list(cases)
+        dates: List[Any] = []
+        amounts: List[Any] = []
+        descriptions: List[Any] = []
+        lengths = []
+        for case_id in case_ids:
+            rows = cases[case_id] or []
+            if isinstance(rows, Mapping):
+                case_dates, case_amounts, case_descriptions = rows["date"], rows["amount"], rows["description"]
+            elif rows:
+                try:
+                    case_dates, case_amounts, case_descriptions = zip(*map(_ROW_FIELDS, rows))
+                except KeyError:
+                    case_dates = [row.get("date") for row in rows]
+                    case_amounts = [row.get("amount") for row in rows]
+                    case_descriptions = [row.get("description") for row in rows]
+            else:
+                case_dates = case_amounts = case_descriptions = ()
+            dates.extend(case_dates)
+            amounts.extend(case_amounts)
+            descriptions.extend(case_descriptions)
+            lengths.append(len(case_dates))
+
+        n_cases = len(case_ids)
+        case_index = np.repeat(np.arange(n_cases, dtype=np.int64), lengths)
+        month = _to_months(dates)
+        amount = _to_amounts(amounts)
+        valid = (month != _NO_MONTH) & np.isfinite(amount)
+        invalid_counts = np.bincount(case_index[~valid], minlength=n_cases)
+
+        case_index, month, amount = case_index[valid], month[valid], amount[valid]
+        descriptions = [d for d, ok in zip(descriptions, valid) if ok] if not valid.all() else descriptions
+        category = self.categorize(descriptions, amount)
+
+        inflow = np.where(amount > 0, amount, 0.0)
+        outflow = np.where(amount < 0, -amount, 0.0)
+
+        # (case, month) 的月彙總：只對實際出現的 key 彙總 (單一離群日期不會放大成 n_cases * 月數的陣列)
+        first_month = int(month.min()) if len(month) else 0
+        span = int(month.max()) - first_month + 1 if len(month) else 1
+        month_keys, month_slot = np.unique(case_index * span + (month - first_month), return_inverse=True)
+        n_keys = len(month_keys)
+        month_counts = np.bincount(month_slot, minlength=n_keys)
+        month_inflow = np.bincount(month_slot, weights=inflow, minlength=n_keys)
+        month_outflow = np.bincount(month_slot, weights=outflow, minlength=n_keys)
+        # key 依 (case, month) 排序：case i 的月份是 month_bounds[i]:month_bounds[i + 1]
+        key_case = month_keys // span
+        month_bounds = np.searchsorted(key_case, np.arange(n_cases + 1)).tolist()
+        month_inflow_total = np.bincount(key_case, weights=month_inflow, minlength=n_cases).round(2).tolist()
+        month_outflow_total = np.bincount(key_case, weights=month_outflow, minlength=n_cases).round(2).tolist()
+
+        # (case, category) 的彙總
+        n_categories = len(self.categories)
+        category_key = case_index * n_categories + category
+        size = n_cases * n_categories
+        category_counts = np.bincount(category_key, minlength=size).reshape(n_cases, n_categories)
+        category_totals = np.bincount(category_key, weights=amount, minlength=size).reshape(n_cases, n_categories)
+
+        # 整批先四捨五入並轉成 Python 型別，避免逐一存取 NumPy scalar
+        month_labels = (month_keys % span + first_month).astype("datetime64[M]").astype(str).tolist()
+        month_net = (month_inflow - month_outflow).round(2).tolist()
+        month_counts_list = month_counts.tolist()
+        month_inflow, month_outflow = month_inflow.round(2).tolist(), month_outflow.round(2).tolist()
+        category_counts_list = category_counts.tolist()
+        category_totals = category_totals.round(2).tolist()
+        bucket_of = [CATEGORY_BUCKETS.get(name, "unclassified") for name in self.categories]
+
+        summaries = {}
+        for i, case_id in enumerate(case_ids):
+            months = [
+                {"month": month_labels[k], "count": month_counts_list[k], "inflow": month_inflow[k],
+                 "outflow": month_outflow[k], "net": month_net[k]}
+                for k in range(month_bounds[i], month_bounds[i + 1])
+            ]
+            categories = {}
+            buckets: Dict[str, float] = {}
+            totals = category_totals[i]
+            for c, count in enumerate(category_counts_list[i]):
+                if not count:
+                    continue
+                categories[self.categories[c]] = {"count": count, "total": totals[c]}
+                buckets[bucket_of[c]] = round(buckets.get(bucket_of[c], 0.0) + totals[c], 2)
+            summaries[case_id] = {
+                "transaction_count": sum(month_counts_list[month_bounds[i]:month_bounds[i + 1]]),
+                "invalid_count": int(invalid_counts[i]),
+                "uncategorized_count": category_counts_list[i][self._uncategorized],
+                "total_inflow": month_inflow_total[i],
+                "total_outflow": month_outflow_total[i],
+                "net": round(month_inflow_total[i] - month_outflow_total[i], 2),
+                "months": months,
+                "categories": categories,
+                "buckets": buckets,
+            }
+        return summaries
+
+
+_NO_MONTH = np.iinfo(np.int64).min
+_ROW_FIELDS = itemgetter("date", "amount", "description")
+
+
+def _to_months(dates: Sequence[Any]) -> np.ndarray:
+    """
+    Months since 1970-01 as int64; unparsable dates become `_NO_MONTH`.
+    """
+    try:
+        days = np.array(dates, dtype="datetime64[D]")
+    except (ValueError, TypeError):
+        days = np.array([_parse_date(value) for value in dates], dtype="datetime64[D]")
+    # NaT 轉成 int64 即為最小值，正好等於 _NO_MONTH
+    return days.astype("datetime64[M]").astype(np.int64)
+
+
+def _parse_date(value: Any) -> Any:
+    try:
+        return np.datetime64(str(value)[:10], "D")
+    except ValueError:
+        return np.datetime64("NaT")
+
+
+def _to_amounts(amounts: Sequence[Any]) -> np.ndarray:
+    try:
+        return np.array(amounts, dtype=np.float64)
+    except (ValueError, TypeError):
+        return np.fromiter((_parse_amount(value) for value in amounts), dtype=np.float64, count=len(amounts))
+
+
+def _parse_amount(value: Any) -> float:
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return float("nan")
+
+
+def load_rules(path: Optional[str] = RECOGNITION_RULES_PATH) -> List[CategoryRule]:
+    """
+    Rules from a JSON file of `{"category", "direction", "keywords",
+    "pattern"}` objects, or the built-in rules.
+    """
+    if not path:
+        return [CategoryRule(*rule) for rule in DEFAULT_RULES]
+    with open(path, encoding="utf-8") as f:
+        specs = json.load(f)
+    return [
+        CategoryRule(spec["category"], spec.get("direction", "any"), spec.get("keywords", ()), spec.get("pattern"))
+        for spec in specs
+    ]
+
+
+_engine: Optional[RecognitionEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> RecognitionEngine:
+    """
+    Engine of the current process; each process-pool worker compiles the
+    rules once and keeps its description memo across tasks.
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = RecognitionEngine(load_rules())
+                logger.info("Transaction recognition engine ready with %d rules", len(_engine.rules))
+    return _engine
@@ -0,0 +1,6 @@
+# a2a_cash_flow_demo/services/remote-agent-1/tests/conftest.py
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
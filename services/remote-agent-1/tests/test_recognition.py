@@ -0,0 +1,40 @@
+# a2a_cash_flow_demo/services/remote-agent-1/tests/test_recognition.py
+
+from recognition import RecognitionEngine, load_rules
+
+
+def engine() -> RecognitionEngine:
+    return RecognitionEngine(load_rules())
+
+
+def test_monthly_and_category_totals():
+    summary = engine().recognize_cases({
+        "case-1": [
+            {"date": "2025-01-05", "amount": 5000, "description": "SALARY ACME PTE"},
+            {"date": "2025-01-20", "amount": -1200, "description": "RENT JAN"},
+            {"date": "2025-02-03", "amount": -50.5, "description": "POS 7-ELEVEN 123"},
+            {"date": "not a date", "amount": 1, "description": "x"},
+        ],
+        "case-2": [],
+    })
+
+    case = summary["case-1"]
+    assert case["transaction_count"] == 3
+    assert case["invalid_count"] == 1
+    assert [m["month"] for m in case["months"]] == ["2025-01", "2025-02"]
+    assert case["months"][0]["net"] == 3800.0
+    assert case["categories"]["rent"] == {"count": 1, "total": -1200.0}
+    assert summary["case-2"]["transaction_count"] == 0
+    assert summary["case-2"]["months"] == []
+
+
+def test_outlier_dates_do_not_blow_up_the_batch():
+    cases = {f"case-{i}": [{"date": "2025-03-01", "amount": 10, "description": "SALARY"}] for i in range(2000)}
+    cases["case-0"].append({"date": "0001-01-01", "amount": 1, "description": "x"})
+    cases["case-1"].append({"date": "9999-12-31", "amount": 1, "description": "x"})
+
+    summary = engine().recognize_cases(cases)
+
+    assert [m["month"] for m in summary["case-0"]["months"]] == ["0001-01", "2025-03"]
+    assert [m["month"] for m in summary["case-1"]["months"]] == ["2025-03", "9999-12"]
+    assert summary["case-1999"]["transaction_count"] == 1
@@ -0,0 +1,32 @@
+# a2a_cash_flow_demo/services/remote-agent-2/app/handlers.py
+
+import logging
+from typing import Any, Dict
+
+from a2a_worker.runtime import TaskHandler
+
+logger = logging.getLogger(__name__)
+
+
+async def draft_response(task: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Task.DraftResponse: drafts the reply for the loan case. I/O-bound (an
+    LLM or template service call), so it runs on the worker's event loop.
+    """
+    loan_case_id = task.get("loan_case_id")
+    logger.info("Drafting response for loan case %s", loan_case_id)
+    return {
+        "loan_case_id": loan_case_id,
+        "draft": f"Cash-flow review for loan case {loan_case_id} is complete.",
+    }
+
+
+HANDLERS = [
+    TaskHandler(
+        "Task.DraftResponse",
+        draft_response,
+        source="remote-agent-b",
+        succeeded_status="response_drafted",
+        failed_status="error_dispatch_b",
+    ),
+]
@@ -0,0 +1,104 @@
+# a2a_cash_flow_demo/services/remote-agent-common/a2a_worker/batching.py
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List, Optional, Sequence, Tuple
+
+# SendMessageBatch / DeleteMessageBatch / ChangeMessageVisibilityBatch 一次最多 10 筆
+MAX_SQS_BATCH = 10
+
+logger = logging.getLogger(__name__)
+
+# Flushes a batch; returns one result (or exception instance) per item, in order
+BatchFlush = Callable[[List[Any]], Awaitable[Sequence[Any]]]
+
+_STOP = object()
+
+
+class AsyncBatcher:
+    """
+    asyncio counterpart of the root agent's BatchCollector: callers `submit`
+    single items and get a Future back; one task groups them into batches of
+    up to `batch_size`, waiting at most `linger_ms` after the first item, and
+    resolves every Future from the result `flush` returns for it.
+    """
+
+    def __init__(self, flush: BatchFlush, batch_size: int = MAX_SQS_BATCH, linger_ms: float = 50, name: str = "batcher"):
+        self.flush = flush
+        self.batch_size = batch_size
+        self.linger = linger_ms / 1000.0
+        self.name = name
+
+        self._queue: "asyncio.Queue[Any]" = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name=self.name)
+
+    def submit(self, item: Any) -> "asyncio.Future[Any]":
+        if self._closed:
+            raise RuntimeError(f"{self.name} is closed.")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((item, future))
+        return future
+
+    async def close(self) -> None:
+        """
+        Flushes everything already submitted and stops the batching task.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put_nowait(_STOP)
+        if self._task is not None:
+            await self._task
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            first = await self._queue.get()
+            if first is _STOP:
+                break
+
+            batch = [first]
+            deadline = loop.time() + self.linger
+            while len(batch) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._safe_flush(batch)
+
+        # close() 之前送進來的項目
+        leftovers = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not _STOP:
+                leftovers.append(item)
+        for start in range(0, len(leftovers), self.batch_size):
+            await self._safe_flush(leftovers[start:start + self.batch_size])
+
+    async def _safe_flush(self, batch: List[Tuple[Any, "asyncio.Future[Any]"]]) -> None:
+        try:
+            results: Sequence[Any] = await self.flush([item for item, _ in batch])
+        except Exception as e:
+            logger.error("%s flush of %d items failed: %s", self.name, len(batch), e)
+            results = [e] * len(batch)
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
@@ -0,0 +1,153 @@
+# a2a_cash_flow_demo/services/remote-agent-common/a2a_worker/fakes.py
+
+"""
+In-memory stand-in for the SQS client used by the remote-agent worker, so
+the task -> callback loop can run locally without an AWS account.
+"""
+
+import time
+import uuid
+import threading
+from typing import Any, Dict, List, Optional
+
+
+class _FakeMessage:
+    __slots__ = ("message_id", "body", "receipt_handle", "visible_at", "receive_count")
+
+    def __init__(self, body: str):
+        self.message_id = str(uuid.uuid4())
+        self.body = body
+        self.receipt_handle: Optional[str] = None
+        self.visible_at = 0.0
+        self.receive_count = 0
+
+
+class FakeSQSClient:
+    """
+    Mimics the subset of `boto3.client("sqs")` the worker uses: send, batch
+    send, long-poll receive, batch delete and (batch) visibility changes.
+    Queue URLs are arbitrary strings; queues are created on first use.
+    """
+
+    def __init__(self, default_visibility_timeout: int = 30):
+        self.default_visibility_timeout = default_visibility_timeout
+        self._queues: Dict[str, Dict[str, _FakeMessage]] = {}
+        self._by_receipt: Dict[str, _FakeMessage] = {}
+        self._cond = threading.Condition()
+        self.calls: Dict[str, int] = {}
+
+    def _count(self, name: str) -> None:
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def _queue(self, url: str) -> Dict[str, _FakeMessage]:
+        return self._queues.setdefault(url, {})
+
+    def send_message(self, QueueUrl: str, MessageBody: str, **_: Any) -> Dict[str, Any]:
+        with self._cond:
+            self._count("send_message")
+            message = _FakeMessage(MessageBody)
+            self._queue(QueueUrl)[message.message_id] = message
+            self._cond.notify_all()
+        return {"MessageId": message.message_id}
+
+    def send_message_batch(self, QueueUrl: str, Entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        if not 1 <= len(Entries) <= 10:
+            raise ValueError("SendMessageBatch accepts between 1 and 10 entries.")
+        successful = []
+        with self._cond:
+            self._count("send_message_batch")
+            queue = self._queue(QueueUrl)
+            for entry in Entries:
+                message = _FakeMessage(entry["MessageBody"])
+                queue[message.message_id] = message
+                successful.append({"Id": entry["Id"], "MessageId": message.message_id})
+            self._cond.notify_all()
+        return {"Successful": successful, "Failed": []}
+
+    def receive_message(
+        self,
+        QueueUrl: str,
+        MaxNumberOfMessages: int = 1,
+        WaitTimeSeconds: int = 0,
+        VisibilityTimeout: Optional[int] = None,
+        **_: Any,
+    ) -> Dict[str, Any]:
+        visibility = self.default_visibility_timeout if VisibilityTimeout is None else VisibilityTimeout
+        deadline = time.monotonic() + WaitTimeSeconds
+        with self._cond:
+            self._count("receive_message")
+            while True:
+                now = time.monotonic()
+                received = []
+                for message in self._queue(QueueUrl).values():
+                    if message.visible_at > now:
+                        continue
+                    message.visible_at = now + visibility
+                    message.receive_count += 1
+                    if message.receipt_handle:
+                        self._by_receipt.pop(message.receipt_handle, None)
+                    message.receipt_handle = str(uuid.uuid4())
+                    self._by_receipt[message.receipt_handle] = message
+                    received.append({
+                        "MessageId": message.message_id,
+                        "ReceiptHandle": message.receipt_handle,
+                        "Body": message.body,
+                        "Attributes": {"ApproximateReceiveCount": str(message.receive_count)},
+                    })
+                    if len(received) >= MaxNumberOfMessages:
+                        break
+
+                remaining = deadline - now
+                if received or remaining <= 0:
+                    return {"Messages": received} if received else {}
+                # 等待新訊息或下一個訊息重新可見
+                self._cond.wait(timeout=min(remaining, 0.05))
+
+    def delete_message_batch(self, QueueUrl: str, Entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        if not 1 <= len(Entries) <= 10:
+            raise ValueError("DeleteMessageBatch accepts between 1 and 10 entries.")
+        successful, failed = [], []
+        with self._cond:
+            self._count("delete_message_batch")
+            queue = self._queue(QueueUrl)
+            for entry in Entries:
+                message = self._by_receipt.pop(entry["ReceiptHandle"], None)
+                if message is None:
+                    failed.append({"Id": entry["Id"], "Code": "ReceiptHandleIsInvalid", "SenderFault": True})
+                    continue
+                queue.pop(message.message_id, None)
+                successful.append({"Id": entry["Id"]})
+        return {"Successful": successful, "Failed": failed}
+
+    def change_message_visibility_batch(self, QueueUrl: str, Entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        if not 1 <= len(Entries) <= 10:
+            raise ValueError("ChangeMessageVisibilityBatch accepts between 1 and 10 entries.")
+        successful, failed = [], []
+        with self._cond:
+            self._count("change_message_visibility_batch")
+            now = time.monotonic()
+            for entry in Entries:
+                message = self._by_receipt.get(entry["ReceiptHandle"])
+                if message is None:
+                    failed.append({"Id": entry["Id"], "Code": "ReceiptHandleIsInvalid", "SenderFault": True})
+                    continue
+                message.visible_at = now + entry["VisibilityTimeout"]
+                successful.append({"Id": entry["Id"]})
+            self._cond.notify_all()
+        return {"Successful": successful, "Failed": failed}
+
+    def approximate_size(self, QueueUrl: str) -> int:
+        with self._cond:
+            return len(self._queue(QueueUrl))
+
+    def drain(self, QueueUrl: str) -> List[str]:
+        """
+        Removes and returns every message body on a queue (for inspecting
+        the callback queue in local runs).
+        """
+        with self._cond:
+            messages = self._queues.pop(QueueUrl, {})
+            for message in messages.values():
+                if message.receipt_handle:
+                    self._by_receipt.pop(message.receipt_handle, None)
+            return [message.body for message in messages.values()]
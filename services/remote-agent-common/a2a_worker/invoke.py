@@ -0,0 +1,195 @@
+# a2a_cash_flow_demo/services/remote-agent-common/a2a_worker/invoke.py
+
+import os
+import time
+import uuid
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from fastapi import APIRouter, Body, Header
+from fastapi.responses import JSONResponse
+
+from .runtime import WORKER_TASK_TIMEOUT_SECONDS, HandlerRunner, TaskHandler, build_callback
+
+# --- Configuration ---
+# POST /a2a/invoke 等待結果的時間，超過就回 202 + ticket；需小於 root agent 的 REMOTE_HTTP_TIMEOUT
+A2A_INLINE_WAIT_SECONDS = float(os.getenv("A2A_INLINE_WAIT_SECONDS", "2"))
+# 202 時回給 root agent 的預估完成時間 (第一次輪詢的時間點)
+A2A_RESULT_ETA_SECONDS = float(os.getenv("A2A_RESULT_ETA_SECONDS", "1"))
+# 完成的結果保留多久 (同一個 idempotency key 重送直接回此結果；ticket 可輪詢)
+A2A_RESULT_TTL_SECONDS = float(os.getenv("A2A_RESULT_TTL_SECONDS", "3600"))
+
+logger = logging.getLogger(__name__)
+
+ReportCallback = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class Invocation:
+    __slots__ = ("key", "ticket", "handler", "task", "job", "status", "output", "needs_info", "error",
+                 "finished_at", "notify")
+
+    def __init__(self, key: str, handler: TaskHandler, task: Dict[str, Any]):
+        self.key = key
+        self.ticket = str(uuid.uuid4())
+        self.handler = handler
+        self.task = task
+        self.job: Optional[asyncio.Task] = None
+        self.status = "RUNNING"
+        self.output: Optional[Dict[str, Any]] = None
+        self.needs_info: Optional[list] = None
+        self.error: Optional[str] = None
+        self.finished_at: Optional[float] = None
+        # 已回 202 且 root agent 要求以 callback 取得結果
+        self.notify = False
+
+    def body(self) -> Dict[str, Any]:
+        if self.status == "RUNNING":
+            return {"status": "RUNNING", "ticket": self.ticket, "eta": A2A_RESULT_ETA_SECONDS}
+        if self.status == "FAILED":
+            return {"status": "FAILED", "ticket": self.ticket, "error": self.error}
+        return {"status": "SUCCEEDED", "ticket": self.ticket, "output": self.output, "needs_info": self.needs_info}
+
+
+class InvokeService:
+    """
+    The A2A HTTP API of a remote agent: `POST /a2a/invoke` runs a task
+    handler and answers `200` with its result when it finishes within
+    `inline_wait` seconds, otherwise `202` with a ticket for
+    `GET /a2a/result`.
+
+    Invocations are deduplicated on their idempotency key (per replica, for
+    `result_ttl` seconds after they finish): a repeated request joins the
+    running invocation or gets its stored result instead of running the
+    handler again. A failed invocation is not kept, so the same key can run
+    again. When the caller asked for `result_delivery: "callback"`, the
+    result of an invocation answered with 202 is reported like an SQS task's,
+    through `report` (the worker's callback queue).
+    """
+
+    def __init__(
+        self,
+        handlers: Iterable[TaskHandler],
+        runner: HandlerRunner,
+        report: Optional[ReportCallback] = None,
+        inline_wait: float = A2A_INLINE_WAIT_SECONDS,
+        task_timeout_seconds: float = WORKER_TASK_TIMEOUT_SECONDS,
+        result_ttl: float = A2A_RESULT_TTL_SECONDS,
+    ):
+        self.handlers = {handler.detail_type: handler for handler in handlers}
+        self.runner = runner
+        self.report = report
+        self.inline_wait = inline_wait
+        self.task_timeout_seconds = task_timeout_seconds
+        self.result_ttl = result_ttl
+        self.stats: Dict[str, int] = {"invoked": 0, "deduplicated": 0, "inline": 0, "accepted": 0}
+        self._by_key: Dict[str, Invocation] = {}
+        self._by_ticket: Dict[str, Invocation] = {}
+
+    async def invoke(self, envelope: Dict[str, Any], idempotency_key: Optional[str] = None) -> Tuple[int, Dict[str, Any]]:
+        handler = self.handlers.get(envelope.get("task_type", ""))
+        if handler is None or "task_id" not in envelope:
+            return 400, {"error": f"No handler for task_type {envelope.get('task_type')!r}."}
+        callback = envelope.get("result_delivery") == "callback"
+        if callback and self.report is None:
+            # 沒有 callback queue 就無法事後回報，不受理 (尚未執行任何東西)
+            return 400, {"error": "result_delivery=callback is not available: CALLBACK_QUEUE_URL is not set."}
+
+        self._evict_expired()
+        key = idempotency_key or envelope.get("idempotency_key") or f"{envelope['task_id']}:{handler.detail_type}"
+        invocation = self._by_key.get(key)
+        if invocation is not None and invocation.status != "FAILED":
+            self.stats["deduplicated"] += 1
+            logger.info("Invocation %s is already %s; not running it again.", key, invocation.status)
+        else:
+            invocation = Invocation(key, handler, envelope)
+            invocation.job = asyncio.create_task(self._run(invocation), name=f"a2a-invoke-{key}")
+            self._by_key[key] = invocation
+            self._by_ticket[invocation.ticket] = invocation
+            self.stats["invoked"] += 1
+
+        # asyncio.wait 不會取消 handler，逾時後繼續在背景執行
+        await asyncio.wait({invocation.job}, timeout=self.inline_wait)
+        if invocation.status != "RUNNING":
+            self.stats["inline"] += 1
+            return 200, invocation.body()
+
+        self.stats["accepted"] += 1
+        if callback and not invocation.notify:
+            invocation.notify = True
+            invocation.job.add_done_callback(lambda _: asyncio.ensure_future(self._deliver(invocation)))
+        return 202, {"ticket": invocation.ticket, "eta": A2A_RESULT_ETA_SECONDS}
+
+    def result(self, ticket: str) -> Optional[Dict[str, Any]]:
+        self._evict_expired()
+        invocation = self._by_ticket.get(ticket)
+        return invocation.body() if invocation is not None else None
+
+    async def close(self) -> None:
+        jobs = [invocation.job for invocation in self._by_ticket.values() if invocation.job and not invocation.job.done()]
+        for job in jobs:
+            job.cancel()
+        await asyncio.gather(*jobs, return_exceptions=True)
+
+    async def _run(self, invocation: Invocation) -> None:
+        try:
+            result = await self.runner.run(invocation.handler, invocation.task, timeout=self.task_timeout_seconds)
+        except asyncio.CancelledError:
+            invocation.status, invocation.error = "FAILED", "cancelled"
+            raise
+        except Exception as e:
+            invocation.status, invocation.error = "FAILED", str(e) or type(e).__name__
+            logger.error("Invocation %s failed: %s", invocation.key, invocation.error)
+        else:
+            output = dict(result or {})
+            invocation.needs_info = output.pop("needs_info", None) or None
+            invocation.status, invocation.output = "SUCCEEDED", output
+        finally:
+            invocation.finished_at = time.monotonic()
+
+    async def _deliver(self, invocation: Invocation) -> None:
+        if invocation.error == "cancelled":
+            return
+        result = dict(invocation.output or {})
+        if invocation.needs_info:
+            result["needs_info"] = invocation.needs_info
+        callback = build_callback(
+            invocation.handler,
+            invocation.task,
+            f"invoke:{invocation.key}",
+            result=result if invocation.status == "SUCCEEDED" else None,
+            error=invocation.error if invocation.status == "FAILED" else None,
+        )
+        try:
+            await self.report(callback)
+        except Exception as e:
+            logger.error("Failed to report the result of invocation %s: %s", invocation.key, e)
+
+    def _evict_expired(self) -> None:
+        cutoff = time.monotonic() - self.result_ttl
+        for ticket, invocation in list(self._by_ticket.items()):
+            if invocation.finished_at is not None and invocation.finished_at < cutoff:
+                self._by_ticket.pop(ticket, None)
+                if self._by_key.get(invocation.key) is invocation:
+                    self._by_key.pop(invocation.key, None)
+
+
+def build_router(service: InvokeService) -> APIRouter:
+    """
+    FastAPI routes for `service`: POST /a2a/invoke and GET /a2a/result.
+    """
+    router = APIRouter()
+
+    @router.post("/a2a/invoke")
+    async def invoke(envelope: Dict[str, Any] = Body(...), idempotency_key: Optional[str] = Header(None)):
+        status_code, body = await service.invoke(envelope, idempotency_key)
+        return JSONResponse(body, status_code=status_code)
+
+    @router.get("/a2a/result")
+    async def result(ticket: str):
+        body = service.result(ticket)
+        if body is None:
+            return JSONResponse({"error": "unknown ticket"}, status_code=404)
+        return JSONResponse(body)
+
+    return router
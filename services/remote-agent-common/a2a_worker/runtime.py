@@ -0,0 +1,523 @@
+# a2a_cash_flow_demo/services/remote-agent-common/a2a_worker/runtime.py
+
+import os
+import json
+import time
+import signal
+import asyncio
+import inspect
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from .batching import MAX_SQS_BATCH, AsyncBatcher
+
+# --- Configuration ---
+AWS_REGION = os.getenv("AWS_REGION", "ap-southeast-1")
+# 派工佇列 (SQS.remote-a / SQS.remote-b)，未設定時不啟動 worker
+TASK_QUEUE_URL = os.getenv("TASK_QUEUE_URL")
+# 結果回報給 Root Agent 的佇列 (SQS.callback)
+CALLBACK_QUEUE_URL = os.getenv("CALLBACK_QUEUE_URL")
+# 同時處理中的任務數上限 (asyncio handler 與送進 process pool 的都算)
+WORKER_MAX_IN_FLIGHT = int(os.getenv("WORKER_MAX_IN_FLIGHT", "20"))
+# CPU-bound handler 使用的 process 數，預設為 CPU 數
+WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", str(os.cpu_count() or 1)))
+WORKER_WAIT_SECONDS = int(os.getenv("WORKER_WAIT_SECONDS", "20"))
+WORKER_VISIBILITY_TIMEOUT = int(os.getenv("WORKER_VISIBILITY_TIMEOUT", "60"))
+# 單一任務的處理時間上限，超過視為失敗 (避免卡住的任務被無限延長 visibility)
+WORKER_TASK_TIMEOUT_SECONDS = float(os.getenv("WORKER_TASK_TIMEOUT_SECONDS", "600"))
+# CPU-bound handler 在子 process 內逾時未返回 (例如卡在 C 擴充)，再等這段時間後回收整個 process pool
+WORKER_TIMEOUT_GRACE_SECONDS = float(os.getenv("WORKER_TIMEOUT_GRACE_SECONDS", "5"))
+# 第幾次收到仍失敗時，回報失敗狀態並刪除訊息
+WORKER_MAX_RECEIVES = int(os.getenv("WORKER_MAX_RECEIVES", "5"))
+# 關閉時等待處理中任務的時間，應小於 k8s 的 terminationGracePeriodSeconds
+WORKER_DRAIN_SECONDS = float(os.getenv("WORKER_DRAIN_SECONDS", "20"))
+# 批次送出結果 / 刪除訊息時等待湊滿的時間 (毫秒)
+WORKER_BATCH_LINGER_MS = float(os.getenv("WORKER_BATCH_LINGER_MS", "50"))
+WORKER_SEND_MAX_RETRIES = int(os.getenv("WORKER_SEND_MAX_RETRIES", "3"))
+
+# 需要人工補資料時回報的狀態，Root Agent 會轉到 human_in_the_loop_node
+HITL_STATUS = "awaiting_human_input"
+
+logger = logging.getLogger(__name__)
+
+
+class TaskHandler:
+    """
+    Binds an EventBridge detail-type to the function that does the work.
+
+    `func` receives the task detail (`task_id`, `loan_case_id`, ...) and
+    returns the result dict sent back to the root agent; a `needs_info` list
+    in it turns the callback into a human-in-the-loop request. I/O-bound
+    handlers are coroutines (or plain functions, run on a thread); with
+    `cpu_bound=True`, `func` runs in the worker's process pool and must be a
+    picklable module-level function.
+    """
+
+    __slots__ = ("detail_type", "func", "source", "succeeded_status", "failed_status", "cpu_bound")
+
+    def __init__(
+        self,
+        detail_type: str,
+        func: Callable[[Dict[str, Any]], Any],
+        source: str,
+        succeeded_status: str,
+        failed_status: str,
+        cpu_bound: bool = False,
+    ):
+        self.detail_type = detail_type
+        self.func = func
+        self.source = source
+        self.succeeded_status = succeeded_status
+        self.failed_status = failed_status
+        self.cpu_bound = cpu_bound
+
+
+class HandlerTimeout(TimeoutError):
+    """
+    A handler ran past its deadline.
+    """
+
+
+def _call_with_deadline(func: Callable[[Dict[str, Any]], Any], task: Dict[str, Any], seconds: Optional[float]) -> Any:
+    """
+    Runs `func` in a pool process with SIGALRM set to interrupt it after
+    `seconds`, so a timed-out handler stops and frees its process.
+    """
+    if not seconds or not hasattr(signal, "setitimer"):
+        return func(task)
+
+    def expired(signum: int, frame: Any) -> None:
+        raise HandlerTimeout(f"Handler exceeded {seconds:g}s.")
+
+    previous = signal.signal(signal.SIGALRM, expired)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        return func(task)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+class HandlerRunner:
+    """
+    Runs TaskHandlers: coroutines on the loop, plain functions on a thread,
+    `cpu_bound` ones in a process pool of `processes` workers, created on
+    first use. Shared by the SQS worker and the HTTP invoke API, so both
+    draw on the same processes.
+
+    With a `timeout`, a cpu_bound handler is interrupted inside its process
+    when the deadline passes. If the process does not come back within
+    `grace_seconds` after that (stuck in native code), the pool is replaced
+    and its processes are terminated, so hung handlers cannot hold every
+    slot; other tasks that were running in the old pool fail and are retried.
+    """
+
+    def __init__(self, processes: int = WORKER_PROCESSES, grace_seconds: float = WORKER_TIMEOUT_GRACE_SECONDS):
+        self.processes = processes
+        self.grace_seconds = grace_seconds
+        self.recycled = 0
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    async def run(self, handler: TaskHandler, task: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        if handler.cpu_bound:
+            return await self._run_in_pool(handler, task, timeout)
+        if inspect.iscoroutinefunction(handler.func):
+            return await asyncio.wait_for(handler.func(task), timeout=timeout)
+        return await asyncio.wait_for(asyncio.to_thread(handler.func, task), timeout=timeout)
+
+    async def _run_in_pool(self, handler: TaskHandler, task: Dict[str, Any], timeout: Optional[float]) -> Dict[str, Any]:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.processes)
+        pool = self._pool
+        future = asyncio.get_running_loop().run_in_executor(pool, _call_with_deadline, handler.func, task, timeout)
+        # HandlerTimeout 本身也是 TimeoutError，所以用 asyncio.wait 分辨是子 process 自行逾時還是卡住
+        done, _ = await asyncio.wait({future}, timeout=None if timeout is None else timeout + self.grace_seconds)
+        if not done:
+            # 被回收的 future 會以 BrokenProcessPool 結束，沒有人等它
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+            self._recycle(pool)
+            raise HandlerTimeout(f"Handler {handler.detail_type} did not return within {timeout:g}s; process pool recycled.")
+        return future.result()
+
+    def _recycle(self, pool: ProcessPoolExecutor) -> None:
+        if self._pool is not pool:
+            # 其他逾時的任務已經回收過
+            return
+        self.recycled += 1
+        logger.error("A cpu_bound handler is stuck past its deadline; replacing the process pool.")
+        self._pool = ProcessPoolExecutor(max_workers=self.processes)
+        # ProcessPoolExecutor 沒有公開的 terminate，只能直接結束它的 process
+        for process in list((getattr(pool, "_processes", None) or {}).values()):
+            process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+
+def parse_task_message(message: Dict[str, Any]) -> Tuple[str, str, Dict[str, Any]]:
+    """
+    Returns (detail_type, event_id, detail) of a task message. EventBridge
+    delivers the whole event envelope to the queue; a bare detail carrying
+    its own `detail_type` is accepted too, keyed on the SQS MessageId.
+    """
+    payload = json.loads(message["Body"])
+    if isinstance(payload.get("detail"), dict):
+        return payload.get("detail-type", ""), payload.get("id") or message["MessageId"], payload["detail"]
+    return payload.get("detail_type", ""), payload.get("event_id") or message["MessageId"], payload
+
+
+def build_callback(
+    handler: TaskHandler,
+    task: Dict[str, Any],
+    event_id: str,
+    result: Optional[Dict[str, Any]] = None,
+    error: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Callback message in the shape the root agent's CallbackRequest expects.
+    The task's event ID is reused, so redelivered tasks produce callbacks the
+    root agent drops as duplicates.
+    """
+    if error is not None:
+        status, output, needs_info = handler.failed_status, {"error": error}, None
+    else:
+        output = dict(result or {})
+        needs_info = output.pop("needs_info", None) or None
+        status = HITL_STATUS if needs_info else handler.succeeded_status
+    return {
+        "task_id": task["task_id"],
+        "source": handler.source,
+        "status": status,
+        "result": output,
+        "needs_info": needs_info,
+        "event_id": event_id,
+    }
+
+
+class TaskWorker:
+    """
+    Consumes a remote agent's task queue and reports results to the
+    callback queue.
+
+    Messages are long-polled in batches of up to 10, only as many as there
+    are free slots out of `max_in_flight`. Coroutine handlers run on the
+    loop, CPU-bound ones in a process pool of `processes` workers. One
+    heartbeat task extends the visibility of every in-flight message with
+    ChangeMessageVisibilityBatch. Results are sent with SendMessageBatch and
+    a task message is deleted (again batched) only once its callback is on
+    the callback queue; a failed attempt is released for a quick retry
+    until the message's receive count reaches `max_receives`, after which
+    the failure itself is reported.
+
+    `stop` drains: it stops receiving, waits up to `drain_seconds` for the
+    in-flight tasks, makes the unfinished ones visible again for another
+    replica, and flushes pending sends and deletes.
+    """
+
+    def __init__(
+        self,
+        sqs_client: Any,
+        queue_url: str,
+        callback_queue_url: str,
+        handlers: Iterable[TaskHandler],
+        max_in_flight: int = WORKER_MAX_IN_FLIGHT,
+        processes: int = WORKER_PROCESSES,
+        wait_time_seconds: int = WORKER_WAIT_SECONDS,
+        visibility_timeout: int = WORKER_VISIBILITY_TIMEOUT,
+        task_timeout_seconds: float = WORKER_TASK_TIMEOUT_SECONDS,
+        max_receives: int = WORKER_MAX_RECEIVES,
+        drain_seconds: float = WORKER_DRAIN_SECONDS,
+        batch_linger_ms: float = WORKER_BATCH_LINGER_MS,
+        send_max_retries: int = WORKER_SEND_MAX_RETRIES,
+        runner: Optional[HandlerRunner] = None,
+    ):
+        self.sqs = sqs_client
+        self.queue_url = queue_url
+        self.callback_queue_url = callback_queue_url
+        self.handlers = {handler.detail_type: handler for handler in handlers}
+        self.max_in_flight = max_in_flight
+        self.processes = processes
+        self.wait_time_seconds = wait_time_seconds
+        self.visibility_timeout = visibility_timeout
+        self.task_timeout_seconds = task_timeout_seconds
+        self.max_receives = max_receives
+        self.drain_seconds = drain_seconds
+        self.batch_linger_ms = batch_linger_ms
+        self.send_max_retries = send_max_retries
+
+        self.stats: Dict[str, int] = {"received": 0, "succeeded": 0, "failed": 0, "retried": 0, "released": 0}
+        # 未指定 runner 時自己建立，並在 stop 時關閉
+        self._owns_runner = runner is None
+        self._runner = runner or HandlerRunner(processes)
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._in_flight: Set[asyncio.Task] = set()
+        # receipt handle -> 收到的時間
+        self._receipts: Dict[str, float] = {}
+        self._results: Optional[AsyncBatcher] = None
+        self._deletes: Optional[AsyncBatcher] = None
+        self._poller: Optional[asyncio.Task] = None
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._running = False
+
+    # --- Lifecycle ---
+
+    def start(self) -> None:
+        if self._running:
+            return
+        self._running = True
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        self._results = AsyncBatcher(self._send_batch, linger_ms=self.batch_linger_ms, name="worker-results")
+        self._deletes = AsyncBatcher(self._delete_batch, linger_ms=self.batch_linger_ms, name="worker-deletes")
+        self._results.start()
+        self._deletes.start()
+        self._poller = asyncio.create_task(self._poll_loop(), name="worker-poller")
+        self._heartbeat = asyncio.create_task(self._heartbeat_loop(), name="worker-heartbeat")
+        logger.info("Task worker started on %s (detail types: %s, max_in_flight=%d, processes=%s)",
+                    self.queue_url, ", ".join(self.handlers), self.max_in_flight,
+                    self._runner.processes if any(h.cpu_bound for h in self.handlers.values()) else 0)
+
+    async def stop(self) -> None:
+        if not self._running:
+            return
+        self._running = False
+        self._poller.cancel()
+        await asyncio.gather(self._poller, return_exceptions=True)
+
+        if self._in_flight:
+            logger.info("Draining %d in-flight tasks (up to %.0fs)", len(self._in_flight), self.drain_seconds)
+            _, pending = await asyncio.wait(set(self._in_flight), timeout=self.drain_seconds)
+            unfinished = list(self._receipts)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            if unfinished:
+                # 讓其他 replica 立刻接手，而不是等 visibility timeout
+                await self._change_visibility(unfinished, 0)
+                self.stats["released"] += len(unfinished)
+                logger.warning("Released %d unfinished tasks back to %s", len(unfinished), self.queue_url)
+
+        self._heartbeat.cancel()
+        await asyncio.gather(self._heartbeat, return_exceptions=True)
+        await self._results.close()
+        await self._deletes.close()
+        if self._owns_runner:
+            self._runner.shutdown()
+        logger.info("Task worker stopped: %s", self.stats)
+
+    # --- Receiving ---
+
+    async def _poll_loop(self) -> None:
+        while self._running:
+            # 至少要有一個空位才去 long-poll
+            await self._slots.acquire()
+            free = 1
+            while free < MAX_SQS_BATCH and not self._slots.locked():
+                await self._slots.acquire()
+                free += 1
+
+            try:
+                response = await asyncio.to_thread(
+                    self.sqs.receive_message,
+                    QueueUrl=self.queue_url,
+                    MaxNumberOfMessages=free,
+                    WaitTimeSeconds=self.wait_time_seconds,
+                    VisibilityTimeout=self.visibility_timeout,
+                    AttributeNames=["ApproximateReceiveCount"],
+                )
+            except asyncio.CancelledError:
+                for _ in range(free):
+                    self._slots.release()
+                raise
+            except Exception as e:
+                logger.error("ReceiveMessage failed on %s: %s", self.queue_url, e)
+                for _ in range(free):
+                    self._slots.release()
+                await asyncio.sleep(1)
+                continue
+
+            messages = response.get("Messages", [])
+            for _ in range(free - len(messages)):
+                self._slots.release()
+
+            self.stats["received"] += len(messages)
+            for message in messages:
+                self._receipts[message["ReceiptHandle"]] = time.monotonic()
+                task = asyncio.create_task(self._process(message))
+                self._in_flight.add(task)
+                task.add_done_callback(self._in_flight.discard)
+
+    # --- Processing ---
+
+    async def _process(self, message: Dict[str, Any]) -> None:
+        receipt_handle = message["ReceiptHandle"]
+        try:
+            try:
+                detail_type, event_id, task = parse_task_message(message)
+            except (ValueError, KeyError) as e:
+                # 永遠無法處理的訊息，重送也沒有意義
+                logger.error("Dropping malformed task message %s: %s", message.get("MessageId"), e)
+                self._delete(receipt_handle)
+                return
+            handler = self.handlers.get(detail_type)
+            if handler is None or "task_id" not in task:
+                logger.error("Dropping task message %s: no handler for detail-type %r",
+                             message.get("MessageId"), detail_type)
+                self._delete(receipt_handle)
+                return
+
+            try:
+                result = await self._runner.run(handler, task, timeout=self.task_timeout_seconds)
+                callback = build_callback(handler, task, event_id, result=result)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                error = str(e) or type(e).__name__
+                receives = int(message.get("Attributes", {}).get("ApproximateReceiveCount", "1"))
+                if receives < self.max_receives:
+                    self.stats["retried"] += 1
+                    logger.warning("Task %s (%s) failed on attempt %d, retrying: %s",
+                                   task["task_id"], detail_type, receives, error)
+                    # 以指數退避的 visibility 放回佇列，而不是等滿整個 timeout
+                    await self._change_visibility([receipt_handle], min(2 ** receives, self.visibility_timeout))
+                    return
+                logger.error("Task %s (%s) failed after %d attempts, reporting %s: %s",
+                             task["task_id"], detail_type, receives, handler.failed_status, error)
+                callback = build_callback(handler, task, event_id, error=error)
+
+            try:
+                await self._results.submit(callback)
+            except Exception as e:
+                # 結果沒送出就不刪除，任務會重新被處理
+                logger.error("Failed to send the result of task %s, leaving it for redelivery: %s",
+                             task["task_id"], e)
+                return
+            self.stats["failed" if callback["status"] == handler.failed_status else "succeeded"] += 1
+            self._delete(receipt_handle)
+        finally:
+            self._receipts.pop(receipt_handle, None)
+            self._slots.release()
+
+    async def report(self, callback: Dict[str, Any]) -> None:
+        """
+        Puts a callback on the callback queue (batched with the worker's own
+        results). Used for results of tasks received over HTTP.
+        """
+        await self._results.submit(callback)
+
+    def _delete(self, receipt_handle: str) -> None:
+        # 刪除失敗只會造成重送，由 Root Agent 的去重擋下
+        self._deletes.submit(receipt_handle).add_done_callback(_log_delete_failure)
+
+    # --- Heartbeat ---
+
+    async def _heartbeat_loop(self) -> None:
+        """
+        Keeps every in-flight message invisible while its handler runs,
+        ten receipts per ChangeMessageVisibilityBatch call.
+        """
+        interval = max(self.visibility_timeout / 3, 1)
+        while True:
+            await asyncio.sleep(interval)
+            cutoff = time.monotonic() - interval
+            due = [handle for handle, received_at in list(self._receipts.items()) if received_at <= cutoff]
+            if due:
+                await self._change_visibility(due, self.visibility_timeout)
+
+    async def _change_visibility(self, receipt_handles: List[str], timeout: int) -> None:
+        for start in range(0, len(receipt_handles), MAX_SQS_BATCH):
+            chunk = receipt_handles[start:start + MAX_SQS_BATCH]
+            entries = [
+                {"Id": str(i), "ReceiptHandle": handle, "VisibilityTimeout": int(timeout)}
+                for i, handle in enumerate(chunk)
+            ]
+            try:
+                response = await asyncio.to_thread(
+                    self.sqs.change_message_visibility_batch,
+                    QueueUrl=self.queue_url,
+                    Entries=entries,
+                )
+            except Exception as e:
+                logger.warning("ChangeMessageVisibilityBatch failed for %d messages: %s", len(entries), e)
+                continue
+            for failure in response.get("Failed", []):
+                logger.debug("Visibility change failed: %s", failure)
+
+    # --- Batched SQS writes ---
+
+    async def _send_batch(self, callbacks: List[Dict[str, Any]]) -> Sequence[Any]:
+        results: List[Any] = [None] * len(callbacks)
+        pending = list(range(len(callbacks)))
+        for attempt in range(self.send_max_retries + 1):
+            if attempt:
+                await asyncio.sleep(0.05 * (2 ** (attempt - 1)))
+            entries = [
+                {"Id": str(i), "MessageBody": json.dumps(callbacks[i], ensure_ascii=False, default=str)}
+                for i in pending
+            ]
+            try:
+                response = await asyncio.to_thread(
+                    self.sqs.send_message_batch,
+                    QueueUrl=self.callback_queue_url,
+                    Entries=entries,
+                )
+            except Exception as e:
+                logger.warning("SendMessageBatch of %d results failed (attempt %d): %s", len(entries), attempt + 1, e)
+                error: Exception = e
+                continue
+            for success in response.get("Successful", []):
+                results[int(success["Id"])] = success["MessageId"]
+            retry = []
+            for failure in response.get("Failed", []):
+                index = int(failure["Id"])
+                error = RuntimeError(f"SendMessageBatch entry failed: {failure.get('Code')} {failure.get('Message', '')}")
+                if failure.get("SenderFault"):
+                    results[index] = error
+                else:
+                    retry.append(index)
+            pending = retry
+            if not pending:
+                return results
+        for index in pending:
+            results[index] = error
+        return results
+
+    async def _delete_batch(self, receipt_handles: List[str]) -> Sequence[Any]:
+        entries = [{"Id": str(i), "ReceiptHandle": handle} for i, handle in enumerate(receipt_handles)]
+        response = await asyncio.to_thread(
+            self.sqs.delete_message_batch,
+            QueueUrl=self.queue_url,
+            Entries=entries,
+        )
+        results: List[Any] = [None] * len(entries)
+        for failure in response.get("Failed", []):
+            results[int(failure["Id"])] = RuntimeError(f"DeleteMessageBatch entry failed: {failure.get('Code')}")
+        return results
+
+
+def _log_delete_failure(future: "asyncio.Future[Any]") -> None:
+    if not future.cancelled() and future.exception() is not None:
+        logger.warning("Failed to delete task message: %s", future.exception())
+
+
+def build_worker(
+    handlers: Iterable[TaskHandler],
+    sqs_client: Any = None,
+    runner: Optional[HandlerRunner] = None,
+) -> Optional[TaskWorker]:
+    """
+    Worker for the queues named in the environment, or None when
+    TASK_QUEUE_URL / CALLBACK_QUEUE_URL are not set (e.g. local runs of the
+    HTTP app only).
+    """
+    if not TASK_QUEUE_URL or not CALLBACK_QUEUE_URL:
+        logger.warning("TASK_QUEUE_URL or CALLBACK_QUEUE_URL is not set; the task worker is disabled.")
+        return None
+    if sqs_client is None:
+        import boto3
+
+        sqs_client = boto3.client("sqs", region_name=AWS_REGION)
+    return TaskWorker(sqs_client, TASK_QUEUE_URL, CALLBACK_QUEUE_URL, handlers, runner=runner)
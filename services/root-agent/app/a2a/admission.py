@@ -0,0 +1,271 @@
+# a2a_cash_flow_demo/services/root-agent/app/a2a/admission.py
+
+import os
+import math
+import time
+import asyncio
+import logging
+import threading
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+from .metrics import (
+    ADMISSION_DECISIONS,
+    ADMISSION_IN_FLIGHT,
+    ADMISSION_LIMIT,
+    ADMISSION_QUEUE_DEPTH,
+    ADMISSION_RATE,
+    ADMISSION_WAIT,
+    DOWNSTREAM_THROTTLES,
+)
+from .ratelimit import AdaptiveTokenBucket
+
+# --- Configuration ---
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+# 同時進行中的任務啟動數 (graph run + checkpoint 寫入 + put_events)
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "64"))
+# 超過上限時最多排隊的請求數；0 = 不排隊，直接回 429
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "256"))
+# 單一請求排隊 (等 slot + 等下游額度) 的上限，逾時回 429
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "2"))
+# 每個 replica 每秒對下游的呼叫額度上限；遇到 throttling 自動調降後再慢慢回復
+ADMISSION_EVENTBRIDGE_RATE = float(os.getenv("ADMISSION_EVENTBRIDGE_RATE", "200"))
+ADMISSION_DYNAMODB_WRITE_RATE = float(os.getenv("ADMISSION_DYNAMODB_WRITE_RATE", "1000"))
+# 一次任務啟動對各下游的呼叫數：start_node 派送一次；checkpoint put 3 次 + put_writes 2 次
+ADMISSION_EVENTBRIDGE_COST = float(os.getenv("ADMISSION_EVENTBRIDGE_COST", "1"))
+ADMISSION_DYNAMODB_WRITE_COST = float(os.getenv("ADMISSION_DYNAMODB_WRITE_COST", "5"))
+# throttling 時額度乘上此係數 (同一波錯誤在 cooldown 內只算一次)
+ADMISSION_DECREASE_FACTOR = float(os.getenv("ADMISSION_DECREASE_FACTOR", "0.7"))
+ADMISSION_DECREASE_COOLDOWN_SECONDS = float(os.getenv("ADMISSION_DECREASE_COOLDOWN_SECONDS", "1"))
+# 沒有 throttling 時，每秒回復上限的比例 (0.05 = 約 20 秒從最低回到上限)
+ADMISSION_RECOVERY_PER_SECOND = float(os.getenv("ADMISSION_RECOVERY_PER_SECOND", "0.05"))
+# 佇列已滿 / 排隊逾時時回給客戶端的 Retry-After
+ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "1"))
+
+# AWS error codes meaning "slow down" (EventBridge, DynamoDB and the SDK's own)
+THROTTLING_ERROR_CODES = {
+    "ThrottlingException",
+    "Throttling",
+    "ThrottledException",
+    "TooManyRequestsException",
+    "RequestLimitExceeded",
+    "ProvisionedThroughputExceededException",
+}
+DYNAMODB_OPERATIONS = {
+    "PutItem",
+    "UpdateItem",
+    "DeleteItem",
+    "GetItem",
+    "Query",
+    "BatchWriteItem",
+    "BatchGetItem",
+    "TransactWriteItems",
+}
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """
+    A task start was turned away; the client should retry after `retry_after` seconds.
+    """
+
+    def __init__(self, message: str, outcome: str, retry_after: int):
+        super().__init__(message)
+        self.outcome = outcome
+        self.retry_after = retry_after
+
+
+def _error_code(error: BaseException) -> Optional[str]:
+    code = getattr(error, "error_code", None)
+    if code:
+        return code
+    response = getattr(error, "response", None)
+    if isinstance(response, dict):
+        return response.get("Error", {}).get("Code")
+    return None
+
+
+def is_throttling_error(error: BaseException) -> bool:
+    return _error_code(error) in THROTTLING_ERROR_CODES
+
+
+def throttled_downstream(error: BaseException) -> Optional[str]:
+    """
+    The downstream ("eventbridge" / "dynamodb") that throttled, if `error`
+    or anything in its cause chain is a throttling error; otherwise None.
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if is_throttling_error(error):
+            operation = getattr(error, "operation_name", None)
+            if operation in DYNAMODB_OPERATIONS:
+                return "dynamodb"
+            # DispatchError (per-entry PutEvents errors) 沒有 operation_name
+            return "eventbridge"
+        error = error.__cause__ or error.__context__
+    return None
+
+
+class AdmissionController:
+    """
+    Admission for task starts, so a burst cannot open unbounded graph runs,
+    checkpoint writes and put_events calls.
+
+    A start first needs one of `max_in_flight` slots; when none is free it
+    waits in a FIFO queue of at most `queue_size`. It then takes its cost
+    from each downstream's token bucket, waiting for tokens when the budget
+    is spent. Whatever would take longer than `timeout` - a full queue, no
+    slot in time, not enough budget in time - is rejected with a retry hint
+    instead of queueing without bound.
+
+    Each bucket lowers its rate when its downstream reports throttling and
+    recovers gradually, so the admitted rate follows what AWS accepts.
+    """
+
+    def __init__(
+        self,
+        buckets: Dict[str, Tuple[AdaptiveTokenBucket, float]],
+        max_in_flight: int = ADMISSION_MAX_IN_FLIGHT,
+        queue_size: int = ADMISSION_QUEUE_SIZE,
+        retry_after: int = ADMISSION_RETRY_AFTER_SECONDS,
+    ):
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+        self.buckets = buckets
+        self.max_in_flight = max_in_flight
+        self.queue_size = queue_size
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.waiting = 0
+        self._slots = asyncio.Semaphore(max_in_flight)
+
+        ADMISSION_LIMIT.labels(limit="in_flight").set(max_in_flight)
+        ADMISSION_LIMIT.labels(limit="queue").set(queue_size)
+        ADMISSION_IN_FLIGHT.set_function(lambda: self.in_flight)
+        ADMISSION_QUEUE_DEPTH.set_function(lambda: self.waiting)
+        for downstream, (bucket, _) in buckets.items():
+            ADMISSION_RATE.labels(downstream=downstream).set_function(lambda bucket=bucket: bucket.rate)
+
+    @asynccontextmanager
+    async def admit(self, timeout: Optional[float] = ADMISSION_QUEUE_TIMEOUT_SECONDS) -> AsyncIterator[None]:
+        """
+        Holds an admission slot for the body. Raises AdmissionRejected when
+        the start cannot begin within `timeout` seconds (None = no limit,
+        the queue bound still applies).
+        """
+        started = time.monotonic()
+        await self._take_slot(timeout)
+        self.in_flight += 1
+        try:
+            remaining = None if timeout is None else max(0.0, timeout - (time.monotonic() - started))
+            await self._pace(remaining)
+            ADMISSION_DECISIONS.labels(outcome="admitted").inc()
+            ADMISSION_WAIT.observe(time.monotonic() - started)
+            yield
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+    async def _take_slot(self, timeout: Optional[float]) -> None:
+        if not self._slots.locked() and not self.waiting:
+            await self._slots.acquire()
+            return
+        if self.waiting >= self.queue_size:
+            self._reject("queue_full", f"Too many task starts in progress ({self.in_flight} running, {self.waiting} queued).")
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout)
+        except asyncio.TimeoutError:
+            self._reject("queue_timeout", f"No capacity to start the task within {timeout:.1f}s.")
+        finally:
+            self.waiting -= 1
+
+    async def _pace(self, max_wait: Optional[float]) -> None:
+        taken = []
+        delay = 0.0
+        for downstream, (bucket, cost) in self.buckets.items():
+            wait = bucket.reserve(cost, max_wait)
+            if wait is None:
+                for other, other_cost in taken:
+                    other.refund(other_cost)
+                self._reject(
+                    "rate_limited",
+                    f"The {downstream} budget ({bucket.rate:.0f}/s) is used up.",
+                    math.ceil(bucket.wait_time(cost)),
+                )
+            taken.append((bucket, cost))
+            delay = max(delay, wait)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _reject(self, outcome: str, message: str, retry_after: Optional[int] = None) -> None:
+        ADMISSION_DECISIONS.labels(outcome=outcome).inc()
+        raise AdmissionRejected(message, outcome, max(retry_after or 0, self.retry_after))
+
+    def throttled(self, downstream: str) -> None:
+        entry = self.buckets.get(downstream)
+        if entry is not None and entry[0].throttled():
+            logger.warning("%s is throttling; lowering its admission budget to %.0f/s", downstream, entry[0].rate)
+
+
+class _Unlimited:
+    """
+    Stand-in when ADMISSION_ENABLED=false: admits everything.
+    """
+
+    @asynccontextmanager
+    async def admit(self, timeout: Optional[float] = None) -> AsyncIterator[None]:
+        yield
+
+    def throttled(self, downstream: str) -> None:
+        pass
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def _bucket(max_rate: float) -> AdaptiveTokenBucket:
+    return AdaptiveTokenBucket(
+        max_rate,
+        decrease_factor=ADMISSION_DECREASE_FACTOR,
+        cooldown_seconds=ADMISSION_DECREASE_COOLDOWN_SECONDS,
+        recovery_per_second=ADMISSION_RECOVERY_PER_SECOND,
+    )
+
+
+def get_admission_controller():
+    global _controller
+    if _controller is None:
+        with _controller_lock:
+            if _controller is None:
+                if not ADMISSION_ENABLED:
+                    _controller = _Unlimited()
+                else:
+                    _controller = AdmissionController({
+                        "eventbridge": (_bucket(ADMISSION_EVENTBRIDGE_RATE), ADMISSION_EVENTBRIDGE_COST),
+                        "dynamodb": (_bucket(ADMISSION_DYNAMODB_WRITE_RATE), ADMISSION_DYNAMODB_WRITE_COST),
+                    })
+    return _controller
+
+
+def report_throttle(downstream: str) -> None:
+    """
+    Feedback from the clients: `downstream` answered with a throttling
+    error. Safe to call from any thread.
+    """
+    DOWNSTREAM_THROTTLES.labels(downstream=downstream).inc()
+    get_admission_controller().throttled(downstream)
+
+
+def record_throttling(error: BaseException) -> Optional[str]:
+    """
+    Reports `error` if it is a throttling error and returns the downstream
+    that throttled, or None.
+    """
+    downstream = throttled_downstream(error)
+    if downstream is not None:
+        report_throttle(downstream)
+    return downstream
@@ -0,0 +1,157 @@
+# a2a_cash_flow_demo/services/root-agent/app/a2a/batching.py
+
+import time
+import heapq
+import queue
+import logging
+import itertools
+import threading
+from concurrent.futures import Future
+from typing import Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class PendingItem:
+    __slots__ = ("payload", "future", "attempts")
+
+    def __init__(self, payload: Any):
+        self.payload = payload
+        self.future: Future = Future()
+        self.attempts = 0
+
+
+class BatchCollector:
+    """
+    Base class for background batchers: callers `submit` single items from any
+    thread and get a Future back; a worker thread groups items into batches of
+    up to `batch_size`, waiting at most `linger_ms` after the first item, and
+    hands each batch to `_flush`, which must resolve every item's Future.
+
+    An item whose Future was cancelled before its batch is flushed is skipped,
+    so a caller that gave up waiting can be sure it was never sent. Once
+    flushed the Future is running and can no longer be cancelled. `_flush`
+    may hand items to `_retry_later` instead of resolving them; they are
+    flushed again after the backoff while the queue keeps draining.
+    """
+
+    def __init__(self, batch_size: int, linger_ms: float, retry_backoff_ms: float, name: str):
+        self.batch_size = batch_size
+        self.linger = linger_ms / 1000.0
+        self.retry_backoff = retry_backoff_ms / 1000.0
+
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        # (due, seq, items) waiting for a retry; only touched by the worker thread
+        self._delayed: List[Tuple[float, int, List[PendingItem]]] = []
+        self._delayed_seq = itertools.count()
+        self._closed = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, payload: Any) -> Future:
+        pending = PendingItem(payload)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError(f"{type(self).__name__} is closed.")
+            self._queue.put(pending)
+        return pending.future
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """
+        Flushes everything already submitted and stops the background thread.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join(timeout=timeout)
+
+    def _flush(self, batch: List[PendingItem]) -> None:
+        raise NotImplementedError
+
+    def _safe_flush(self, batch: List[PendingItem]) -> None:
+        # 第一次送出前略過已被呼叫端取消的項目；重試中的項目已是 running
+        batch = [item for item in batch if item.attempts or item.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        try:
+            self._flush(batch)
+        except Exception as e:
+            logger.exception("%s flush failed: %s", type(self).__name__, e)
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(e)
+
+    def _backoff_delay(self, attempts: int) -> float:
+        return self.retry_backoff * (2 ** (attempts - 1))
+
+    def _retry_later(self, items: List[PendingItem]) -> None:
+        """
+        Flushes `items` again after the backoff for their attempt count,
+        without blocking the batches queued behind them.
+        """
+        due = time.monotonic() + self._backoff_delay(max(item.attempts for item in items))
+        heapq.heappush(self._delayed, (due, next(self._delayed_seq), items))
+
+    def _flush_due_retries(self) -> Optional[float]:
+        """
+        Flushes every retry that is due; returns the seconds until the next
+        one, or None when none is waiting.
+        """
+        while self._delayed:
+            due, _, items = self._delayed[0]
+            remaining = due - time.monotonic()
+            if remaining > 0:
+                return remaining
+            heapq.heappop(self._delayed)
+            self._safe_flush([item for item in items if not item.future.done()])
+        return None
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            try:
+                first = self._queue.get(timeout=self._flush_due_retries())
+            except queue.Empty:
+                continue
+            if first is _STOP:
+                break
+
+            batch = [first]
+            deadline = time.monotonic() + self.linger
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._safe_flush(batch)
+
+        # Drain whatever was submitted before close()
+        leftovers = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                leftovers.append(item)
+        for start in range(0, len(leftovers), self.batch_size):
+            self._safe_flush(leftovers[start:start + self.batch_size])
+        # 關閉時仍等候尚未用完次數的重試
+        while True:
+            remaining = self._flush_due_retries()
+            if remaining is None:
+                break
+            time.sleep(remaining)
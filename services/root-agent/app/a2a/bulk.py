@@ -0,0 +1,127 @@
+# a2a_cash_flow_demo/services/root-agent/app/a2a/bulk.py
+
+import os
+import json
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+from .ratelimit import TokenBucket
+
+# --- Configuration ---
+# 同時進行中的 graph 啟動數
+BULK_SUBMIT_CONCURRENCY = int(os.getenv("BULK_SUBMIT_CONCURRENCY", "32"))
+# 每秒最多啟動的任務數，避免灌爆下游 SQS
+BULK_SUBMIT_RATE_PER_SECOND = float(os.getenv("BULK_SUBMIT_RATE_PER_SECOND", "50"))
+BULK_MAX_CASES_PER_REQUEST = int(os.getenv("BULK_MAX_CASES_PER_REQUEST", "50000"))
+
+logger = logging.getLogger(__name__)
+
+StartTask = Callable[[str], Awaitable[str]]
+
+_rate_limiter: Optional[TokenBucket] = None
+
+
+def get_rate_limiter() -> TokenBucket:
+    """
+    Shared across bulk requests, so parallel uploads together stay under the rate.
+    """
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = TokenBucket(BULK_SUBMIT_RATE_PER_SECOND)
+    return _rate_limiter
+
+
+async def read_ndjson_case_ids(chunks: AsyncIterator[bytes], max_cases: int = BULK_MAX_CASES_PER_REQUEST) -> List[str]:
+    """
+    Parses a streamed NDJSON upload line by line, without buffering the raw
+    body. Each line is either `{"loan_case_id": "..."}` or a bare JSON string.
+    Raises ValueError on a malformed line or when more than `max_cases` arrive.
+
+    The upload is read completely before the response starts streaming, since
+    the response side also reads from the ASGI receive channel.
+    """
+    case_ids: List[str] = []
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            _append_line(case_ids, line, max_cases)
+    _append_line(case_ids, buffer, max_cases)
+    return case_ids
+
+
+def _append_line(case_ids: List[str], line: bytes, max_cases: int) -> None:
+    case_id = _parse_line(line)
+    if case_id is None:
+        return
+    if len(case_ids) >= max_cases:
+        raise ValueError(f"Request exceeds {max_cases} loan cases.")
+    case_ids.append(case_id)
+
+
+def _parse_line(line: bytes) -> Optional[str]:
+    line = line.strip()
+    if not line:
+        return None
+    value = json.loads(line)
+    if isinstance(value, dict):
+        value = value.get("loan_case_id")
+    if not isinstance(value, str) or not value:
+        raise ValueError(f"Invalid NDJSON line: {line[:100]!r}")
+    return value
+
+
+async def submit_bulk(
+    case_ids: Iterable[str],
+    start_task: StartTask,
+    concurrency: int = BULK_SUBMIT_CONCURRENCY,
+    rate_limiter: Optional[TokenBucket] = None,
+) -> AsyncIterator[str]:
+    """
+    Starts a task per loan case with at most `concurrency` graph starts in
+    flight and at most `rate_limiter.rate` starts per second, yielding one
+    NDJSON line per case as soon as its task has been created.
+    """
+    rate_limiter = rate_limiter or get_rate_limiter()
+    results: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue()
+    slots = asyncio.Semaphore(concurrency)
+    running: Set[asyncio.Task] = set()
+
+    async def start_one(case_id: str) -> None:
+        try:
+            task_id = await start_task(case_id)
+            line = {"loan_case_id": case_id, "task_id": task_id, "status": "accepted"}
+        except Exception as e:
+            detail = getattr(e, "detail", str(e))
+            line = {"loan_case_id": case_id, "status": "error", "detail": detail}
+        finally:
+            slots.release()
+        await results.put(line)
+
+    async def feed() -> None:
+        try:
+            for case_id in case_ids:
+                await rate_limiter.acquire()
+                await slots.acquire()
+                task = asyncio.create_task(start_one(case_id))
+                running.add(task)
+                task.add_done_callback(running.discard)
+        finally:
+            if running:
+                await asyncio.gather(*list(running), return_exceptions=True)
+            await results.put(None)
+
+    feeder = asyncio.create_task(feed())
+    try:
+        while True:
+            line = await results.get()
+            if line is None:
+                break
+            yield json.dumps(line) + "\n"
+    finally:
+        # 客戶端中斷時停止送出新的案件
+        if not feeder.done():
+            feeder.cancel()
+            await asyncio.gather(feeder, return_exceptions=True)
@@ -0,0 +1,625 @@
+# a2a_cash_flow_demo/services/root-agent/app/a2a/checkpoint.py
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+)
+
+from .metrics import (
+    CHECKPOINT_CACHE_ERRORS,
+    CHECKPOINT_CACHE_REQUESTS,
+    CHECKPOINT_FENCED_WRITES,
+    CHECKPOINT_WRITE_BEHIND_FAILURES,
+)
+from .serde import S3BlobStore, spill_scope
+
+# --- Configuration ---
+CHECKPOINT_CACHE_TTL_SECONDS = int(os.getenv("CHECKPOINT_CACHE_TTL_SECONDS", "900"))
+# true: 先寫 Redis，DynamoDB 由背景執行緒依序寫入
+CHECKPOINT_WRITE_BEHIND = os.getenv("CHECKPOINT_WRITE_BEHIND", "false").lower() == "true"
+# 背景寫入 DynamoDB 失敗時的重試次數與間隔；用完後該 thread 下次存取時拋錯
+CHECKPOINT_WRITE_BEHIND_RETRIES = int(os.getenv("CHECKPOINT_WRITE_BEHIND_RETRIES", "3"))
+CHECKPOINT_WRITE_BEHIND_BACKOFF_SECONDS = float(os.getenv("CHECKPOINT_WRITE_BEHIND_BACKOFF_SECONDS", "0.2"))
+# Redis 出錯後多久再嘗試使用
+CHECKPOINT_CACHE_RETRY_SECONDS = float(os.getenv("CHECKPOINT_CACHE_RETRY_SECONDS", "5"))
+
+logger = logging.getLogger(__name__)
+
+
+class CheckpointWriteLost(Exception):
+    """
+    Raised on the next access to a thread whose write-behind checkpoint write
+    never reached the durable saver. The thread continues from its last
+    durable checkpoint after that.
+    """
+
+
+class CachedCheckpointSaver(BaseCheckpointSaver):
+    """
+    Layered checkpointer: Redis holds the latest checkpoint per thread,
+    the wrapped saver (DynamoDBSaver) stays the durable store.
+
+    Reads of the latest checkpoint are served from Redis when present and
+    populated from the durable saver on a miss. Writes go to the durable saver
+    first (write-through) or, with `write_behind=True`, to Redis first and to
+    the durable saver on an ordered background thread. Any Redis error turns
+    the cache off for `retry_seconds` and every call falls back to the durable
+    saver. A write that reaches the durable saver but cannot refresh the
+    cached entry queues the entry's deletion; until the queue is drained the
+    cache is not read, so an older checkpoint is never served.
+
+    A background write is retried `write_retries` times. When it still fails,
+    the thread's cache entry is evicted, its later queued writes are skipped,
+    and the next call for that thread raises CheckpointWriteLost instead of
+    carrying on from a checkpoint that was never stored.
+    """
+
+    def __init__(
+        self,
+        durable: BaseCheckpointSaver,
+        redis_client: Any = None,
+        ttl_seconds: int = CHECKPOINT_CACHE_TTL_SECONDS,
+        write_behind: bool = CHECKPOINT_WRITE_BEHIND,
+        retry_seconds: float = CHECKPOINT_CACHE_RETRY_SECONDS,
+        key_prefix: str = "a2a:ckpt",
+        write_retries: int = CHECKPOINT_WRITE_BEHIND_RETRIES,
+        write_backoff_seconds: float = CHECKPOINT_WRITE_BEHIND_BACKOFF_SECONDS,
+    ):
+        super().__init__(serde=durable.serde)
+        self.durable = durable
+        self.redis = redis_client
+        self.ttl_seconds = ttl_seconds
+        self.write_behind = write_behind and redis_client is not None
+        self.retry_seconds = retry_seconds
+        self.key_prefix = key_prefix
+        self.write_retries = write_retries
+        self.write_backoff_seconds = write_backoff_seconds
+
+        self._retry_at = 0.0
+        self._update_lock = threading.Lock()
+        self._writer: Optional[ThreadPoolExecutor] = None
+        self._pending: Set[Future] = set()
+        self._pending_lock = threading.Lock()
+        # cache key -> 背景寫入最終失敗的錯誤，下次存取該 thread 時拋出
+        self._lost: Dict[str, Exception] = {}
+        # 已落地 durable 但無法更新 Redis 的 cache key；刪除前不讀快取
+        self._stale: Set[str] = set()
+        if self.write_behind:
+            self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="checkpoint-write-behind")
+
+    # --- Redis helpers ---
+
+    def _key(self, config: RunnableConfig) -> str:
+        configurable = config["configurable"]
+        return f"{self.key_prefix}:{configurable['thread_id']}:{configurable.get('checkpoint_ns', '')}"
+
+    def _cache_enabled(self) -> bool:
+        return self.redis is not None and time.monotonic() >= self._retry_at
+
+    def _cache_failed(self, operation: str, error: Exception) -> None:
+        CHECKPOINT_CACHE_ERRORS.labels(operation=operation).inc()
+        if time.monotonic() >= self._retry_at:
+            logger.warning("Checkpoint cache unavailable (%s): %s. Falling back to DynamoDB.", operation, error)
+        self._retry_at = time.monotonic() + self.retry_seconds
+
+    def _cache_get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self._cache_enabled() or not self._drain_stale():
+            return None
+        try:
+            raw = self.redis.get(key)
+        except Exception as e:
+            self._cache_failed("get", e)
+            return None
+        if raw is None:
+            return None
+        try:
+            type_, _, data = raw.partition(b"\n")
+            return self.serde.loads_typed((type_.decode(), data))
+        except Exception as e:
+            logger.warning("Discarding unreadable cached checkpoint %s: %s", key, e)
+            self._cache_delete(key)
+            return None
+
+    def _cache_set(self, key: str, entry: Dict[str, Any]) -> bool:
+        if not self._cache_enabled() or not self._drain_stale():
+            return False
+        type_, data = self.serde.dumps_typed(entry)
+        try:
+            self.redis.set(key, type_.encode() + b"\n" + data, ex=self.ttl_seconds)
+            return True
+        except Exception as e:
+            self._cache_failed("set", e)
+            return False
+
+    def _cache_delete(self, key: str) -> None:
+        if self.redis is None:
+            return
+        try:
+            self.redis.delete(key)
+        except Exception as e:
+            self._cache_failed("delete", e)
+
+    def _invalidate(self, key: str) -> None:
+        """
+        Drops `key`'s cached entry after a durable write that could not
+        refresh it. While Redis is unavailable the deletion is queued.
+        """
+        if self.redis is None:
+            return
+        with self._pending_lock:
+            self._stale.add(key)
+        if self._cache_enabled():
+            self._drain_stale()
+
+    def _drain_stale(self) -> bool:
+        """
+        Deletes the queued stale entries; True when none are left.
+        """
+        with self._pending_lock:
+            keys = list(self._stale)
+        if not keys:
+            return True
+        try:
+            self.redis.delete(*keys)
+        except Exception as e:
+            self._cache_failed("delete", e)
+            return False
+        with self._pending_lock:
+            self._stale.difference_update(keys)
+        return True
+
+    @staticmethod
+    def _to_tuple(entry: Dict[str, Any]) -> CheckpointTuple:
+        return CheckpointTuple(
+            config=entry["config"],
+            checkpoint=entry["checkpoint"],
+            metadata=entry["metadata"],
+            parent_config=entry["parent_config"],
+            pending_writes=[(task_id, channel, value) for task_id, channel, value, _ in entry["pending_writes"]],
+        )
+
+    @staticmethod
+    def _from_tuple(checkpoint_tuple: CheckpointTuple) -> Dict[str, Any]:
+        return {
+            "config": checkpoint_tuple.config,
+            "checkpoint": checkpoint_tuple.checkpoint,
+            "metadata": checkpoint_tuple.metadata,
+            "parent_config": checkpoint_tuple.parent_config,
+            "pending_writes": [
+                [task_id, channel, value, idx]
+                for idx, (task_id, channel, value) in enumerate(checkpoint_tuple.pending_writes or [])
+            ],
+        }
+
+    # --- Write-behind helpers ---
+
+    def _submit(self, key: str, fn: Any, *args: Any) -> None:
+        future = self._writer.submit(self._write_durable, key, fn, *args)
+        with self._pending_lock:
+            self._pending.add(future)
+        future.add_done_callback(self._write_done)
+
+    def _write_durable(self, key: str, fn: Any, *args: Any) -> None:
+        with self._pending_lock:
+            if key in self._lost:
+                # 前一筆寫入已遺失，後續寫入接不上，不再寫入
+                CHECKPOINT_WRITE_BEHIND_FAILURES.labels(outcome="skipped").inc()
+                return
+        for attempt in range(self.write_retries + 1):
+            try:
+                fn(*args)
+                return
+            except Exception as e:
+                if attempt < self.write_retries:
+                    CHECKPOINT_WRITE_BEHIND_FAILURES.labels(outcome="retried").inc()
+                    logger.warning("Write-behind checkpoint write for %s failed (attempt %d): %s", key, attempt + 1, e)
+                    time.sleep(self.write_backoff_seconds * (2 ** attempt))
+                    continue
+                CHECKPOINT_WRITE_BEHIND_FAILURES.labels(outcome="lost").inc()
+                logger.error("Write-behind checkpoint write for %s lost after %d attempts: %s", key, attempt + 1, e)
+                with self._pending_lock:
+                    self._lost[key] = e
+                self._invalidate(key)
+
+    def _write_done(self, future: Future) -> None:
+        with self._pending_lock:
+            self._pending.discard(future)
+
+    def _raise_if_lost(self, key: str) -> None:
+        with self._pending_lock:
+            error = self._lost.pop(key, None)
+        if error is not None:
+            raise CheckpointWriteLost(f"A checkpoint write for {key} never reached DynamoDB: {error}") from error
+
+    def flush(self) -> None:
+        """
+        Blocks until all queued write-behind writes reached the durable saver.
+        """
+        with self._pending_lock:
+            pending = list(self._pending)
+        if pending:
+            wait(pending)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self.flush()
+            self._writer.shutdown(wait=True)
+            self._writer = None
+            self.write_behind = False
+
+    # --- BaseCheckpointSaver ---
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        key = self._key(config)
+        wanted_id = get_checkpoint_id(config)
+        self._raise_if_lost(key)
+
+        if not self._cache_enabled():
+            CHECKPOINT_CACHE_REQUESTS.labels(result="bypass").inc()
+        else:
+            entry = self._cache_get(key)
+            if entry is not None and (wanted_id is None or entry["checkpoint"]["id"] == wanted_id):
+                CHECKPOINT_CACHE_REQUESTS.labels(result="hit").inc()
+                return self._to_tuple(entry)
+            CHECKPOINT_CACHE_REQUESTS.labels(result="miss").inc()
+
+        # 快取沒有時，確保背景寫入已落地再讀 DynamoDB
+        self.flush()
+        self._raise_if_lost(key)
+        checkpoint_tuple = self.durable.get_tuple(config)
+        if checkpoint_tuple is not None and wanted_id is None:
+            self._cache_set(key, self._from_tuple(checkpoint_tuple))
+        return checkpoint_tuple
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        self.flush()
+        return self.durable.list(config, filter=filter, before=before, limit=limit)
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        configurable = config["configurable"]
+        next_config = {
+            "configurable": {
+                "thread_id": configurable["thread_id"],
+                "checkpoint_ns": configurable.get("checkpoint_ns", ""),
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+        parent_config = None
+        if configurable.get("checkpoint_id"):
+            parent_config = {
+                "configurable": {
+                    "thread_id": configurable["thread_id"],
+                    "checkpoint_ns": configurable.get("checkpoint_ns", ""),
+                    "checkpoint_id": configurable["checkpoint_id"],
+                }
+            }
+        entry = {
+            "config": next_config,
+            "checkpoint": checkpoint,
+            "metadata": metadata,
+            "parent_config": parent_config,
+            "pending_writes": [],
+        }
+        key = self._key(config)
+        self._raise_if_lost(key)
+
+        if self.write_behind and self._cache_set(key, entry):
+            self._submit(key, self.durable.put, config, checkpoint, metadata, new_versions)
+            return next_config
+
+        self.flush()
+        saved_config = self.durable.put(config, checkpoint, metadata, new_versions)
+        entry["config"] = saved_config
+        if not self._cache_set(key, entry):
+            # Redis 仍是舊的 checkpoint，不能再從快取讀
+            self._invalidate(key)
+        return saved_config
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        key = self._key(config)
+        self._raise_if_lost(key)
+
+        if self.write_behind and self._update_cached_writes(key, config, writes, task_id):
+            self._submit(key, self.durable.put_writes, config, writes, task_id, task_path)
+            return
+
+        self.flush()
+        self.durable.put_writes(config, writes, task_id, task_path)
+        if not self._update_cached_writes(key, config, writes, task_id):
+            # 快取與 DynamoDB 可能不一致，直接失效
+            self._invalidate(key)
+
+    def _update_cached_writes(
+        self,
+        key: str,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+    ) -> bool:
+        if not self._cache_enabled():
+            return False
+        with self._update_lock:
+            entry = self._cache_get(key)
+            if entry is None or entry["checkpoint"]["id"] != get_checkpoint_id(config):
+                return False
+            existing = {(w[0], w[3]) for w in entry["pending_writes"]}
+            for idx, (channel, value) in enumerate(writes):
+                write_idx = WRITES_IDX_MAP.get(channel, idx)
+                if write_idx >= 0 and (task_id, write_idx) in existing:
+                    continue
+                entry["pending_writes"].append([task_id, channel, value, write_idx])
+            return self._cache_set(key, entry)
+
+    def delete_thread(self, thread_id: str) -> None:
+        self.flush()
+        self.durable.delete_thread(thread_id)
+        key = self._key({"configurable": {"thread_id": thread_id}})
+        with self._pending_lock:
+            self._lost.pop(key, None)
+        self._invalidate(key)
+
+    def get_next_version(self, current: Optional[Any], channel: Any) -> Any:
+        return self.durable.get_next_version(current, channel)
+
+    # --- Async variants (the root agent drives the graph from a thread pool) ---
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items: List[CheckpointTuple] = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+class SpillScopedSaver(BaseCheckpointSaver):
+    """
+    Innermost wrapper around the durable saver when checkpoint blobs spill
+    to S3: its writes serialize inside `spill_scope(thread_id)`, so spilled
+    blobs are stored under their thread, and deleting a thread deletes its
+    blobs as well. Pruning (compaction.prune_thread) removes the blobs of
+    the checkpoints it deletes.
+    """
+
+    def __init__(self, saver: BaseCheckpointSaver, store: S3BlobStore):
+        super().__init__(serde=saver.serde)
+        self.saver = saver
+        self.store = store
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return self.saver.get_tuple(config)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        return self.saver.list(config, filter=filter, before=before, limit=limit)
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        with spill_scope(config["configurable"]["thread_id"]):
+            return self.saver.put(config, checkpoint, metadata, new_versions)
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        with spill_scope(config["configurable"]["thread_id"]):
+            self.saver.put_writes(config, writes, task_id, task_path)
+
+    def delete_thread(self, thread_id: str) -> None:
+        self.saver.delete_thread(thread_id)
+        self.store.delete_thread(thread_id)
+
+    def get_next_version(self, current: Optional[Any], channel: Any) -> Any:
+        return self.saver.get_next_version(current, channel)
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items: List[CheckpointTuple] = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+class FencedCheckpointSaver(BaseCheckpointSaver):
+    """
+    Outer wrapper that calls `fence(thread_id)` before every write, so a
+    handler whose thread lease expired or was taken over mid-run cannot
+    overwrite the checkpoint of the worker that now holds the thread.
+    """
+
+    def __init__(self, saver: BaseCheckpointSaver, fence: Callable[[str], None]):
+        super().__init__(serde=saver.serde)
+        self.saver = saver
+        self.fence = fence
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return self.saver.get_tuple(config)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        return self.saver.list(config, filter=filter, before=before, limit=limit)
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        self._fence(config)
+        return self.saver.put(config, checkpoint, metadata, new_versions)
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        self._fence(config)
+        self.saver.put_writes(config, writes, task_id, task_path)
+
+    def _fence(self, config: RunnableConfig) -> None:
+        try:
+            self.fence(config["configurable"]["thread_id"])
+        except Exception:
+            CHECKPOINT_FENCED_WRITES.inc()
+            raise
+
+    def delete_thread(self, thread_id: str) -> None:
+        self.saver.delete_thread(thread_id)
+
+    def get_next_version(self, current: Optional[Any], channel: Any) -> Any:
+        return self.saver.get_next_version(current, channel)
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items: List[CheckpointTuple] = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
@@ -0,0 +1,243 @@
+# a2a_cash_flow_demo/services/root-agent/app/a2a/compaction.py
+
+import os
+import time
+import queue
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+from langchain_core.messages import BaseMessage
+
+from .serde import S3BlobStore, get_spill_store, spilled_ref
+
+# --- Configuration ---
+AWS_REGION = os.getenv("AWS_REGION", "ap-southeast-1")
+DDB_TABLE_NAME = os.getenv("DDB_A2A_TASKS_TABLE_NAME", "ds_demo_a2a_tasks")
+# 完整訊息歷史寫入 Audit 表，未設定則不封存
+DDB_AUDIT_TABLE_NAME = os.getenv("DDB_A2A_AUDIT_TABLE_NAME")
+# AgentState.messages 在 checkpoint 中保留的最近訊息數 (0 = 不限制)
+MESSAGE_HISTORY_WINDOW = int(os.getenv("MESSAGE_HISTORY_WINDOW", "20"))
+ARCHIVE_FLUSH_INTERVAL_MS = float(os.getenv("ARCHIVE_FLUSH_INTERVAL_MS", "200"))
+# DynamoDB item 上限 400 KB，過長內容截斷
+ARCHIVE_MAX_CONTENT_CHARS = 100_000
+
+# BatchWriteItem 一次最多 25 筆
+MAX_BATCH_WRITE_ITEMS = 25
+
+logger = logging.getLogger(__name__)
+
+
+# --- Bounded message history ---
+
+def bounded_add(left: List[BaseMessage], right: List[BaseMessage]) -> List[BaseMessage]:
+    """
+    Reducer for AgentState.messages: appends like `operator.add` but keeps only
+    the last MESSAGE_HISTORY_WINDOW messages in hot state. Older messages live
+    in the audit table (see MessageArchive).
+    """
+    merged = left + right
+    if MESSAGE_HISTORY_WINDOW > 0 and len(merged) > MESSAGE_HISTORY_WINDOW:
+        return merged[-MESSAGE_HISTORY_WINDOW:]
+    return merged
+
+
+# --- Message archive (audit table) ---
+
+class MessageArchive:
+    """
+    Appends every message added to a task to the audit table, off the request
+    path: records are queued and written by a background thread with
+    BatchWriteItem, so the checkpoint only has to keep a recent window.
+    """
+
+    def __init__(self, table: Any, flush_interval_ms: float = ARCHIVE_FLUSH_INTERVAL_MS):
+        self.table = table
+        self.flush_interval = flush_interval_ms / 1000.0
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        self._last_ts = 0
+        self._ts_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="message-archive", daemon=True)
+        self._thread.start()
+
+    def _next_ts(self) -> int:
+        # 微秒時間戳，保證同一 process 內遞增 (ts 是 range key)
+        with self._ts_lock:
+            ts = max(time.time_ns() // 1000, self._last_ts + 1)
+            self._last_ts = ts
+            return ts
+
+    def record(self, task_id: str, messages: Sequence[BaseMessage]) -> None:
+        for message in messages:
+            content = message.content if isinstance(message.content, str) else str(message.content)
+            item = {
+                "task_id": task_id,
+                "ts": self._next_ts(),
+                "kind": "message",
+                "message_type": message.type,
+                "content": content[:ARCHIVE_MAX_CONTENT_CHARS],
+            }
+            if message.name:
+                item["name"] = message.name
+            self._queue.put(item)
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < MAX_BATCH_WRITE_ITEMS:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._write(batch)
+
+    def _write(self, items: List[Dict[str, Any]]) -> None:
+        try:
+            # batch_writer 會自動重送 UnprocessedItems
+            with self.table.batch_writer() as writer:
+                for item in items:
+                    writer.put_item(Item=item)
+        except Exception as e:
+            logger.error("Failed to archive %d messages to audit table: %s", len(items), e)
+
+
+_archive: Optional[MessageArchive] = None
+_archive_lock = threading.Lock()
+
+
+def get_archive() -> Optional[MessageArchive]:
+    global _archive
+    if _archive is None and DDB_AUDIT_TABLE_NAME:
+        with _archive_lock:
+            if _archive is None:
+                import boto3
+
+                table = boto3.resource("dynamodb", region_name=AWS_REGION).Table(DDB_AUDIT_TABLE_NAME)
+                _archive = MessageArchive(table)
+    return _archive
+
+
+def archive_messages(task_id: str, messages: Sequence[BaseMessage]) -> None:
+    """
+    Records messages in the audit table. A no-op when no audit table is configured.
+    """
+    archive = get_archive()
+    if archive is not None:
+        archive.record(task_id, messages)
+
+
+def close_archive() -> None:
+    global _archive
+    with _archive_lock:
+        if _archive is not None:
+            _archive.close()
+            _archive = None
+
+
+# --- Checkpoint pruning ---
+
+_checkpoint_table: Any = None
+
+
+def _get_checkpoint_table() -> Any:
+    global _checkpoint_table
+    if _checkpoint_table is None:
+        import boto3
+
+        _checkpoint_table = boto3.resource("dynamodb", region_name=AWS_REGION).Table(DDB_TABLE_NAME)
+    return _checkpoint_table
+
+
+def _spilled_refs(table: Any, keys: Sequence[Dict[str, str]]) -> Set[str]:
+    """
+    S3 references held by the blobs of the given checkpoint / write items.
+    """
+    refs: Set[str] = set()
+    for key in keys:
+        item = table.get_item(
+            Key={"PK": key["PK"], "SK": key["SK"]},
+            ProjectionExpression="#type, #checkpoint, #metadata, #value",
+            ExpressionAttributeNames={"#type": "type", "#checkpoint": "checkpoint", "#metadata": "metadata", "#value": "value"},
+        ).get("Item") or {}
+        for attribute in ("checkpoint", "metadata", "value"):
+            if attribute in item:
+                ref = spilled_ref(item.get("type", ""), item[attribute])
+                if ref is not None:
+                    refs.add(ref)
+    return refs
+
+
+def prune_thread(thread_id: str, checkpoint_ns: str = "", table: Any = None, spill_store: Optional[S3BlobStore] = None) -> int:
+    """
+    Deletes every checkpoint and pending write of a finished thread except the
+    latest checkpoint and its writes. Uses the DynamoDBSaver key layout:
+    PK = thread_id, SK = "{ns}#checkpoint#{id}" / "{ns}#write#{id}#{task}#{idx}".
+
+    Blobs spilled to S3 for the thread are then deleted unless a remaining
+    item still references them (checkpoints of one thread can share a blob).
+
+    Returns the number of deleted items.
+    """
+    from boto3.dynamodb.conditions import Key
+
+    table = table or _get_checkpoint_table()
+    checkpoint_prefix = f"{checkpoint_ns}#checkpoint#"
+    write_prefix = f"{checkpoint_ns}#write#"
+
+    # 只取 key，避免讀回整包 checkpoint
+    keys: List[Dict[str, str]] = []
+    query_kwargs: Dict[str, Any] = {
+        "KeyConditionExpression": Key("PK").eq(thread_id),
+        "ProjectionExpression": "PK, SK",
+    }
+    while True:
+        response = table.query(**query_kwargs)
+        keys.extend(response.get("Items", []))
+        if "LastEvaluatedKey" not in response:
+            break
+        query_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    checkpoint_ids = [k["SK"][len(checkpoint_prefix):] for k in keys if k["SK"].startswith(checkpoint_prefix)]
+    if len(checkpoint_ids) <= 1:
+        return 0
+    # checkpoint id 是時間有序的 uuid6，字典序最大者即最新
+    latest_id = max(checkpoint_ids)
+    keep = {f"{checkpoint_prefix}{latest_id}"}
+    latest_write_prefix = f"{write_prefix}{latest_id}#"
+
+    stale = [
+        k for k in keys
+        if (k["SK"].startswith(checkpoint_prefix) or k["SK"].startswith(write_prefix))
+        and k["SK"] not in keep
+        and not k["SK"].startswith(latest_write_prefix)
+    ]
+    with table.batch_writer() as writer:
+        for k in stale:
+            writer.delete_item(Key={"PK": k["PK"], "SK": k["SK"]})
+    logger.info("Pruned %d superseded checkpoint items for thread %s", len(stale), thread_id)
+
+    # item 先刪，blob 後刪：失敗時只會留下沒有 reference 的 blob，不會留下指向已刪 blob 的 item
+    spill_store = spill_store or get_spill_store()
+    if spill_store is not None:
+        stale_keys = {k["SK"] for k in stale}
+        remaining = [k for k in keys if k["SK"] not in stale_keys]
+        deleted = spill_store.delete_thread(thread_id, keep=_spilled_refs(table, remaining))
+        if deleted:
+            logger.info("Deleted %d spilled checkpoint blobs for thread %s", deleted, thread_id)
+    return len(stale)
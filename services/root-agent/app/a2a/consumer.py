@@ -0,0 +1,228 @@
+# a2a_cash_flow_demo/services/root-agent/app/a2a/consumer.py
+
+import os
+import json
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+# --- Configuration ---
+# SQS.callback 的 Queue URL，未設定時不啟動 consumer
+CALLBACK_QUEUE_URL = os.getenv("CALLBACK_QUEUE_URL")
+CALLBACK_CONSUMER_MAX_IN_FLIGHT = int(os.getenv("CALLBACK_CONSUMER_MAX_IN_FLIGHT", "20"))
+CALLBACK_CONSUMER_WAIT_SECONDS = int(os.getenv("CALLBACK_CONSUMER_WAIT_SECONDS", "20"))
+CALLBACK_VISIBILITY_TIMEOUT = int(os.getenv("CALLBACK_VISIBILITY_TIMEOUT", "60"))
+# 批次刪除等待湊滿的時間 (毫秒)
+CALLBACK_DELETE_LINGER_MS = float(os.getenv("CALLBACK_DELETE_LINGER_MS", "100"))
+
+# ReceiveMessage / DeleteMessageBatch 一次最多 10 筆
+MAX_SQS_BATCH = 10
+
+logger = logging.getLogger(__name__)
+
+MessageHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+def parse_message_body(body: str) -> Dict[str, Any]:
+    """
+    Decodes a callback message. EventBridge-delivered messages wrap the
+    payload in an envelope, in which case the `detail` field is returned,
+    tagged with the envelope's event ID. Raises ValueError when the body is
+    not a JSON object.
+    """
+    payload = json.loads(body)
+    if not isinstance(payload, dict):
+        raise ValueError(f"Expected a JSON object, got {type(payload).__name__}.")
+    if "task_id" not in payload and isinstance(payload.get("detail"), dict):
+        detail = payload["detail"]
+        if payload.get("id"):
+            detail.setdefault("event_id", payload["id"])
+        return detail
+    return payload
+
+
+class SQSCallbackConsumer:
+    """
+    Long-polls an SQS queue and resumes graphs from the messages in-process.
+
+    Up to `max_in_flight` messages are handled concurrently; the consumer only
+    asks SQS for as many messages as it has free slots. Messages that are still
+    being processed get their visibility extended periodically, and finished
+    messages are removed with DeleteMessageBatch. A message whose handler raises
+    is left on the queue so SQS redelivers it after the visibility timeout (the
+    queue's redrive policy moves it to the DLQ after maxReceiveCount); a body
+    that cannot be decoded is deleted right away.
+    """
+
+    def __init__(
+        self,
+        sqs_client: Any,
+        queue_url: str,
+        handler: MessageHandler,
+        max_in_flight: int = CALLBACK_CONSUMER_MAX_IN_FLIGHT,
+        wait_time_seconds: int = CALLBACK_CONSUMER_WAIT_SECONDS,
+        visibility_timeout: int = CALLBACK_VISIBILITY_TIMEOUT,
+        delete_linger_ms: float = CALLBACK_DELETE_LINGER_MS,
+    ):
+        self.sqs = sqs_client
+        self.queue_url = queue_url
+        self.handler = handler
+        self.max_in_flight = max_in_flight
+        self.wait_time_seconds = wait_time_seconds
+        self.visibility_timeout = visibility_timeout
+        self.delete_linger = delete_linger_ms / 1000.0
+
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._in_flight: Set[asyncio.Task] = set()
+        self._deletes: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+        self._poller: Optional[asyncio.Task] = None
+        self._deleter: Optional[asyncio.Task] = None
+        self._running = False
+
+    # --- Lifecycle ---
+
+    def start(self) -> None:
+        if self._running:
+            return
+        self._running = True
+        self._poller = asyncio.create_task(self._poll_loop(), name="sqs-callback-poller")
+        self._deleter = asyncio.create_task(self._delete_loop(), name="sqs-callback-deleter")
+        logger.info("SQS callback consumer started for %s (max_in_flight=%d)", self.queue_url, self.max_in_flight)
+
+    async def stop(self) -> None:
+        """
+        Stops polling, waits for in-flight messages and flushes pending deletes.
+        """
+        if not self._running:
+            return
+        self._running = False
+        if self._poller:
+            self._poller.cancel()
+            await asyncio.gather(self._poller, return_exceptions=True)
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+        await self._deletes.put(None)
+        if self._deleter:
+            await self._deleter
+        logger.info("SQS callback consumer stopped")
+
+    # --- Receiving ---
+
+    async def _poll_loop(self) -> None:
+        while self._running:
+            # 至少要有一個空位才去 long-poll
+            await self._slots.acquire()
+            free = 1
+            while free < MAX_SQS_BATCH and not self._slots.locked():
+                await self._slots.acquire()
+                free += 1
+
+            try:
+                response = await asyncio.to_thread(
+                    self.sqs.receive_message,
+                    QueueUrl=self.queue_url,
+                    MaxNumberOfMessages=free,
+                    WaitTimeSeconds=self.wait_time_seconds,
+                    VisibilityTimeout=self.visibility_timeout,
+                )
+            except asyncio.CancelledError:
+                for _ in range(free):
+                    self._slots.release()
+                raise
+            except Exception as e:
+                logger.error("ReceiveMessage failed on %s: %s", self.queue_url, e)
+                for _ in range(free):
+                    self._slots.release()
+                await asyncio.sleep(1)
+                continue
+
+            messages = response.get("Messages", [])
+            for _ in range(free - len(messages)):
+                self._slots.release()
+
+            for message in messages:
+                task = asyncio.create_task(self._process(message))
+                self._in_flight.add(task)
+                task.add_done_callback(self._in_flight.discard)
+
+    async def _process(self, message: Dict[str, Any]) -> None:
+        receipt_handle = message["ReceiptHandle"]
+        heartbeat = asyncio.create_task(self._heartbeat(receipt_handle))
+        try:
+            try:
+                payload = parse_message_body(message["Body"])
+            except ValueError as e:
+                # 重送也不會變成合法訊息，直接刪除
+                logger.error("Dropping undecodable callback message %s: %s", message.get("MessageId"), e)
+                await self._deletes.put(receipt_handle)
+                return
+            # SQS 重送時 MessageId 不變，作為去重 key
+            if message.get("MessageId"):
+                payload.setdefault("event_id", message["MessageId"])
+            await self.handler(payload)
+        except Exception as e:
+            logger.error("Callback message %s failed, leaving it for redelivery: %s", message.get("MessageId"), e)
+        else:
+            await self._deletes.put(receipt_handle)
+        finally:
+            heartbeat.cancel()
+            self._slots.release()
+
+    async def _heartbeat(self, receipt_handle: str) -> None:
+        """
+        Keeps a slow message invisible while its graph is still resuming.
+        """
+        interval = max(self.visibility_timeout / 2, 1)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(
+                    self.sqs.change_message_visibility,
+                    QueueUrl=self.queue_url,
+                    ReceiptHandle=receipt_handle,
+                    VisibilityTimeout=self.visibility_timeout,
+                )
+            except Exception as e:
+                logger.warning("ChangeMessageVisibility failed: %s", e)
+
+    # --- Deleting ---
+
+    async def _delete_loop(self) -> None:
+        stopping = False
+        while not stopping:
+            first = await self._deletes.get()
+            if first is None:
+                break
+
+            batch: List[str] = [first]
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self.delete_linger
+            while len(batch) < MAX_SQS_BATCH:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._deletes.get(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._delete_batch(batch)
+
+    async def _delete_batch(self, receipt_handles: List[str]) -> None:
+        entries = [{"Id": str(i), "ReceiptHandle": handle} for i, handle in enumerate(receipt_handles)]
+        try:
+            response = await asyncio.to_thread(
+                self.sqs.delete_message_batch,
+                QueueUrl=self.queue_url,
+                Entries=entries,
+            )
+        except Exception as e:
+            logger.error("DeleteMessageBatch failed for %d messages: %s", len(entries), e)
+            return
+
+        for failure in response.get("Failed", []):
+            logger.warning("Failed to delete callback message: %s", failure)
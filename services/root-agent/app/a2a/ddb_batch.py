@@ -0,0 +1,139 @@
+# a2a_cash_flow_demo/services/root-agent/app/a2a/ddb_batch.py
+
+import os
+import logging
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, List, Optional
+
+from .admission import is_throttling_error
+from .batching import BatchCollector, PendingItem
+
+# --- Configuration ---
+# BatchWriteItem 一次最多 25 筆
+MAX_BATCH_WRITE_ITEMS = 25
+DDB_WRITE_LINGER_MS = float(os.getenv("DDB_WRITE_LINGER_MS", "5"))
+DDB_WRITE_MAX_RETRIES = int(os.getenv("DDB_WRITE_MAX_RETRIES", "5"))
+DDB_WRITE_RETRY_BACKOFF_MS = float(os.getenv("DDB_WRITE_RETRY_BACKOFF_MS", "25"))
+# put_item 等待批次寫入結果的上限，逾時拋 TimeoutError 交由 saver 的呼叫端處理
+DDB_WRITE_TIMEOUT_SECONDS = float(os.getenv("DDB_WRITE_TIMEOUT_SECONDS", "10"))
+
+logger = logging.getLogger(__name__)
+
+
+class DynamoDBPutBatcher(BatchCollector):
+    """
+    Coalesces concurrent single-item PutItem calls on one table into
+    BatchWriteItem requests. UnprocessedItems and failed batches are queued
+    for a retry after backoff (`_retry_later`), so a throttled batch does not
+    hold up the batches behind it; each caller's Future resolves once its own
+    item has been written or its retries ran out.
+    `on_throttle` is called for each write that came back throttled
+    (UnprocessedItems or a throughput error).
+    """
+
+    def __init__(
+        self,
+        table: Any,
+        linger_ms: float = DDB_WRITE_LINGER_MS,
+        max_retries: int = DDB_WRITE_MAX_RETRIES,
+        retry_backoff_ms: float = DDB_WRITE_RETRY_BACKOFF_MS,
+        on_throttle: Optional[Callable[[], None]] = None,
+    ):
+        self.table = table
+        self.table_name = table.name
+        self.key_names = [k["AttributeName"] for k in table.key_schema]
+        self.max_retries = max_retries
+        self.on_throttle = on_throttle
+        super().__init__(MAX_BATCH_WRITE_ITEMS, linger_ms, retry_backoff_ms, name="ddb-put-batcher")
+
+    def _key_of(self, item: Dict[str, Any]) -> tuple:
+        return tuple(item.get(name) for name in self.key_names)
+
+    def _flush(self, batch: List[PendingItem]) -> None:
+        # BatchWriteItem 不允許同一批出現重複 key，遇到重複就拆成下一批
+        while batch:
+            seen = set()
+            current, rest = [], []
+            for item in batch:
+                key = self._key_of(item.payload)
+                if key in seen:
+                    rest.append(item)
+                else:
+                    seen.add(key)
+                    current.append(item)
+            self._write(current)
+            batch = rest
+
+    def _write(self, batch: List[PendingItem]) -> None:
+        pending = {self._key_of(item.payload): item for item in batch}
+        for item in pending.values():
+            item.attempts += 1
+        try:
+            # resource client 接受原生 Python 型別 (與 batch_writer 相同)
+            response = self.table.meta.client.batch_write_item(
+                RequestItems={
+                    self.table_name: [{"PutRequest": {"Item": item.payload}} for item in pending.values()]
+                }
+            )
+        except Exception as e:
+            logger.warning("BatchWriteItem failed for %s items: %s", len(pending), e)
+            unprocessed_keys = set(pending)
+            error: Optional[Exception] = e
+            throttled = is_throttling_error(e)
+        else:
+            unprocessed = response.get("UnprocessedItems", {}).get(self.table_name, [])
+            unprocessed_keys = {self._key_of(request["PutRequest"]["Item"]) for request in unprocessed}
+            error = None
+            # BatchWriteItem 遇到容量不足時不拋錯，而是回 UnprocessedItems
+            throttled = bool(unprocessed)
+        if throttled and self.on_throttle is not None:
+            self.on_throttle()
+
+        retry = []
+        for key, item in pending.items():
+            if key not in unprocessed_keys:
+                item.future.set_result(None)
+            elif item.attempts > self.max_retries:
+                item.future.set_exception(error or RuntimeError(f"Item still unprocessed after {self.max_retries} retries."))
+            else:
+                retry.append(item)
+        if retry:
+            self._retry_later(retry)
+
+
+class BatchingTable:
+    """
+    Proxy for a boto3 `Table` whose unconditional `put_item` calls go through a
+    DynamoDBPutBatcher. Everything else is passed to the wrapped table, so it
+    can replace `DynamoDBSaver.table` transparently.
+    """
+
+    def __init__(
+        self,
+        table: Any,
+        batcher: Optional[DynamoDBPutBatcher] = None,
+        on_throttle: Optional[Callable[[], None]] = None,
+        timeout: float = DDB_WRITE_TIMEOUT_SECONDS,
+    ):
+        self._table = table
+        self._batcher = batcher or DynamoDBPutBatcher(table, on_throttle=on_throttle)
+        self._timeout = timeout
+
+    def put_item(self, Item: Dict[str, Any], **kwargs: Any) -> Dict[str, Any]:
+        if kwargs:
+            # ConditionExpression 等參數無法批次處理
+            return self._table.put_item(Item=Item, **kwargs)
+        future = self._batcher.submit(Item)
+        try:
+            future.result(timeout=self._timeout)
+        except FutureTimeoutError:
+            # 還沒送出就取消；已在重試中的項目仍可能稍後寫入 (同 key 覆寫，無副作用)
+            future.cancel()
+            raise
+        return {}
+
+    def close(self) -> None:
+        self._batcher.close()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._table, name)
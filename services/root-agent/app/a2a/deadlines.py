@@ -0,0 +1,348 @@
+# a2a_cash_flow_demo/services/root-agent/app/a2a/deadlines.py
+
+import os
+import time
+import heapq
+import zlib
+import asyncio
+import logging
+import threading
+from decimal import Decimal
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .executor import run_blocking
+from .metrics import TASK_DEADLINE_ERRORS, TASK_DEADLINES_EXPIRED
+from .redis_client import REDIS_HOST, get_redis_client
+
+# --- Configuration ---
+# memory: 單一 replica 的 heap；redis: sorted set；dynamodb: tasks table 上的 sparse GSI
+TASK_DEADLINE_BACKEND = os.getenv("TASK_DEADLINE_BACKEND", "redis" if REDIS_HOST else "memory").lower()
+# 派送後等待 remote agent 結果的時間；<= 0 表示停用
+TASK_DEADLINE_SECONDS = float(os.getenv("TASK_DEADLINE_SECONDS", "900"))
+# 逾時後重新派送同一階段的次數，用完就轉給人工 (HITL)
+TASK_DEADLINE_MAX_RETRIES = int(os.getenv("TASK_DEADLINE_MAX_RETRIES", "1"))
+TASK_DEADLINE_SWEEP_INTERVAL = float(os.getenv("TASK_DEADLINE_SWEEP_INTERVAL", "15"))
+TASK_DEADLINE_SWEEP_BATCH = int(os.getenv("TASK_DEADLINE_SWEEP_BATCH", "100"))
+# 被某個 sweeper 取走的 deadline 在這段時間內其他 replica 看不到；處理失敗時會在之後重試
+TASK_DEADLINE_LEASE_SECONDS = float(os.getenv("TASK_DEADLINE_LEASE_SECONDS", "120"))
+# 同時處理的逾時任務數
+TASK_DEADLINE_CONCURRENCY = int(os.getenv("TASK_DEADLINE_CONCURRENCY", "8"))
+TASK_DEADLINE_REDIS_KEY = os.getenv("TASK_DEADLINE_REDIS_KEY", "a2a:task_deadlines")
+AWS_REGION = os.getenv("AWS_REGION", "ap-southeast-1")
+DDB_TASK_DEADLINE_TABLE_NAME = os.getenv(
+    "DDB_A2A_TASK_DEADLINE_TABLE_NAME",
+    os.getenv("DDB_A2A_TASKS_TABLE_NAME", "ds_demo_a2a_tasks"),
+)
+DDB_TASK_DEADLINE_INDEX_NAME = os.getenv("DDB_A2A_TASK_DEADLINE_INDEX_NAME", "deadline_shard-due_at-index")
+# GSI partition 數；把寫入分散開，避免單一 hot partition
+TASK_DEADLINE_SHARDS = int(os.getenv("TASK_DEADLINE_SHARDS", "4"))
+
+# Statuses in which a task waits for a remote-agent result, mapped to the
+# status the router dispatches that stage from, the agent it waits on, and
+# the `source` that agent's callbacks carry.
+WAITING_STATUSES: Dict[str, Tuple[str, str, str]] = {
+    "recognizing_transactions": ("new", "Remote Agent A", "remote-agent-a"),
+    "drafting_response": ("transactions_recognized", "Remote Agent B", "remote-agent-b"),
+}
+
+TASK_PK_PREFIX = "task#"
+DEADLINE_SK = "deadline"
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryDeadlineStore:
+    """
+    Min-heap of (due_at, task_id) with lazy deletion; only sees the tasks
+    dispatched by this replica.
+    """
+
+    backend = "memory"
+
+    def __init__(self, lease_seconds: float = TASK_DEADLINE_LEASE_SECONDS):
+        self.lease_seconds = lease_seconds
+        self._due: Dict[str, float] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def schedule(self, task_id: str, due_at: float) -> None:
+        with self._lock:
+            self._due[task_id] = due_at
+            heapq.heappush(self._heap, (due_at, task_id))
+
+    def cancel(self, task_id: str) -> None:
+        with self._lock:
+            self._due.pop(task_id, None)
+
+    def claim_expired(self, now: float, limit: int) -> List[str]:
+        claimed = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now and len(claimed) < limit:
+                due_at, task_id = heapq.heappop(self._heap)
+                # 已取消或已重新排程的舊 entry
+                if self._due.get(task_id) != due_at:
+                    continue
+                claimed.append(task_id)
+                self._due[task_id] = now + self.lease_seconds
+                heapq.heappush(self._heap, (now + self.lease_seconds, task_id))
+        return claimed
+
+
+class RedisDeadlineStore:
+    """
+    One sorted set scored by due time. Expired members are found with
+    ZRANGEBYSCORE and claimed with a ZINCRBY that moves the score read to
+    `now + lease`: the increment lands exactly there only if nobody changed
+    the score in between, so a replica that lost the race sees a different
+    result and leaves the entry (pushed a bit later) to the winner. A member
+    cancelled in between is re-created by the increment; it expires again
+    and is dropped as stale by the sweeper.
+    """
+
+    backend = "redis"
+
+    def __init__(self, client: Any, key: str = TASK_DEADLINE_REDIS_KEY, lease_seconds: float = TASK_DEADLINE_LEASE_SECONDS):
+        self.client = client
+        self.key = key
+        self.lease_seconds = lease_seconds
+
+    def schedule(self, task_id: str, due_at: float) -> None:
+        self.client.zadd(self.key, {task_id: due_at})
+
+    def cancel(self, task_id: str) -> None:
+        self.client.zrem(self.key, task_id)
+
+    def claim_expired(self, now: float, limit: int) -> List[str]:
+        claimed = []
+        lease_until = now + self.lease_seconds
+        entries = self.client.zrangebyscore(self.key, "-inf", now, start=0, num=limit, withscores=True)
+        for member, seen in entries:
+            score = self.client.zincrby(self.key, lease_until - seen, member)
+            if abs(score - lease_until) < 1e-3:
+                claimed.append(member.decode() if isinstance(member, bytes) else member)
+        return claimed
+
+
+class DynamoDBDeadlineStore:
+    """
+    `task#<id>` / `deadline` items carrying `deadline_shard` and `due_at`,
+    indexed by a sparse GSI on (deadline_shard, due_at): a sweep queries each
+    shard for `due_at <= now` and claims an item with a PutItem conditioned
+    on the `due_at` it read.
+    """
+
+    backend = "dynamodb"
+
+    def __init__(
+        self,
+        table: Any,
+        index_name: str = DDB_TASK_DEADLINE_INDEX_NAME,
+        shards: int = TASK_DEADLINE_SHARDS,
+        lease_seconds: float = TASK_DEADLINE_LEASE_SECONDS,
+    ):
+        self.table = table
+        self.index_name = index_name
+        self.shards = max(1, shards)
+        self.lease_seconds = lease_seconds
+
+    def _shard(self, task_id: str) -> str:
+        return f"deadline#{zlib.crc32(task_id.encode()) % self.shards}"
+
+    def _item(self, task_id: str, due_at: Any) -> Dict[str, Any]:
+        return {
+            "PK": f"{TASK_PK_PREFIX}{task_id}",
+            "SK": DEADLINE_SK,
+            "deadline_shard": self._shard(task_id),
+            "due_at": due_at if isinstance(due_at, Decimal) else Decimal(str(round(due_at, 3))),
+        }
+
+    def schedule(self, task_id: str, due_at: float) -> None:
+        self.table.put_item(Item=self._item(task_id, due_at))
+
+    def cancel(self, task_id: str) -> None:
+        self.table.delete_item(Key={"PK": f"{TASK_PK_PREFIX}{task_id}", "SK": DEADLINE_SK})
+
+    def claim_expired(self, now: float, limit: int) -> List[str]:
+        from boto3.dynamodb.conditions import Attr, Key
+        from botocore.exceptions import ClientError
+
+        claimed = []
+        lease_until = Decimal(str(round(now + self.lease_seconds, 3)))
+        for shard in range(self.shards):
+            if len(claimed) >= limit:
+                break
+            response = self.table.query(
+                IndexName=self.index_name,
+                KeyConditionExpression=Key("deadline_shard").eq(f"deadline#{shard}") & Key("due_at").lte(Decimal(str(now))),
+                Limit=limit - len(claimed),
+            )
+            for item in response.get("Items", []):
+                # KEYS_ONLY 的 GSI：task_id 從 PK 取得
+                task_id = item["PK"][len(TASK_PK_PREFIX):]
+                try:
+                    self.table.put_item(
+                        Item=self._item(task_id, lease_until),
+                        ConditionExpression=Attr("due_at").eq(item["due_at"]),
+                    )
+                except ClientError as e:
+                    if e.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+                        continue
+                    raise
+                claimed.append(task_id)
+        return claimed
+
+
+ExpiredHandler = Callable[[str], Awaitable[str]]
+
+
+class DeadlineSweeper:
+    """
+    Finds tasks whose remote-agent result is overdue.
+
+    Every dispatch that leaves a task waiting records a due time in the
+    store's sortable index; each sweep claims only the entries already
+    expired, `batch_size` at a time, so its cost follows the number of
+    overdue tasks rather than the number of tasks in flight. A claimed entry
+    is leased, not removed: `on_expired` decides what happens (it returns
+    the action taken, for the metrics) and the next committed status
+    reschedules or cancels the deadline. If it fails the lease runs out and
+    a later sweep tries again.
+    """
+
+    def __init__(
+        self,
+        store: Any,
+        on_expired: ExpiredHandler,
+        interval: float = TASK_DEADLINE_SWEEP_INTERVAL,
+        batch_size: int = TASK_DEADLINE_SWEEP_BATCH,
+        concurrency: int = TASK_DEADLINE_CONCURRENCY,
+    ):
+        self.store = store
+        self.on_expired = on_expired
+        self.interval = interval
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await self.sweep()
+            await asyncio.sleep(self.interval)
+
+    async def sweep(self) -> int:
+        """
+        Handles every deadline expired by now; returns how many were claimed.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        total = 0
+        while True:
+            try:
+                task_ids = await run_blocking(self.store.claim_expired, time.time(), self.batch_size)
+            except Exception as e:
+                TASK_DEADLINE_ERRORS.labels(backend=self.store.backend, operation="claim").inc()
+                logger.warning("Claiming expired task deadlines from %s failed: %s", self.store.backend, e)
+                return total
+            total += len(task_ids)
+            await asyncio.gather(*(self._handle(task_id, semaphore) for task_id in task_ids))
+            if len(task_ids) < self.batch_size:
+                return total
+
+    async def _handle(self, task_id: str, semaphore: asyncio.Semaphore) -> None:
+        async with semaphore:
+            try:
+                action = await self.on_expired(task_id)
+            except Exception as e:
+                logger.error("Handling the expired deadline of task %s failed, retrying after the lease: %s", task_id, e)
+                action = "error"
+        TASK_DEADLINES_EXPIRED.labels(action=action).inc()
+
+
+_store: Optional[Any] = None
+_store_lock = threading.Lock()
+_sweeper: Optional[DeadlineSweeper] = None
+
+
+def _build_store() -> Optional[Any]:
+    if TASK_DEADLINE_SECONDS <= 0:
+        return None
+    if TASK_DEADLINE_BACKEND == "redis":
+        client = get_redis_client()
+        if client is None:
+            logger.warning("TASK_DEADLINE_BACKEND=redis but REDIS_HOST is not set; using the in-memory heap.")
+            return MemoryDeadlineStore()
+        return RedisDeadlineStore(client)
+    if TASK_DEADLINE_BACKEND == "dynamodb":
+        import boto3
+
+        return DynamoDBDeadlineStore(boto3.resource("dynamodb", region_name=AWS_REGION).Table(DDB_TASK_DEADLINE_TABLE_NAME))
+    return MemoryDeadlineStore()
+
+
+def get_deadline_store() -> Optional[Any]:
+    """
+    The shared deadline store, or None when TASK_DEADLINE_SECONDS <= 0.
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = _build_store()
+    return _store
+
+
+def track_task_deadline(values: Optional[Dict[str, Any]]) -> None:
+    """
+    Schedules a deadline when a committed state waits on a remote agent and
+    cancels it otherwise. Failures are logged, not raised.
+    """
+    if not values or not values.get("task_id"):
+        return
+    store = get_deadline_store()
+    if store is None:
+        return
+    task_id = values["task_id"]
+    waiting = values.get("status") in WAITING_STATUSES
+    try:
+        if waiting:
+            store.schedule(task_id, time.time() + TASK_DEADLINE_SECONDS)
+        else:
+            store.cancel(task_id)
+    except Exception as e:
+        TASK_DEADLINE_ERRORS.labels(backend=store.backend, operation="schedule" if waiting else "cancel").inc()
+        logger.warning("Failed to update the deadline of task %s: %s", task_id, e)
+
+
+def cancel_task_deadline(task_id: str) -> None:
+    track_task_deadline({"task_id": task_id, "status": None})
+
+
+async def start_deadline_sweeper(on_expired: ExpiredHandler) -> Optional[DeadlineSweeper]:
+    global _sweeper
+    store = get_deadline_store()
+    if store is None:
+        return None
+    with _store_lock:
+        if _sweeper is None:
+            _sweeper = DeadlineSweeper(store, on_expired)
+            _sweeper.start()
+    return _sweeper
+
+
+async def stop_deadline_sweeper() -> None:
+    global _sweeper
+    with _store_lock:
+        sweeper, _sweeper = _sweeper, None
+    if sweeper is not None:
+        await sweeper.stop()
@@ -0,0 +1,150 @@
+# a2a_cash_flow_demo/services/root-agent/app/a2a/dispatcher.py
+
+import os
+import logging
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, List, Optional
+
+from .admission import is_throttling_error
+from .batching import BatchCollector, PendingItem
+from .metrics import PUT_EVENTS_BATCH_SIZE
+
+# --- Configuration ---
+# PutEvents 一次最多 10 筆 entries
+MAX_PUT_EVENTS_ENTRIES = 10
+EVENTBRIDGE_BATCH_SIZE = min(int(os.getenv("EVENTBRIDGE_BATCH_SIZE", "10")), MAX_PUT_EVENTS_ENTRIES)
+# 等待湊滿一批的最長時間 (毫秒)
+EVENTBRIDGE_LINGER_MS = float(os.getenv("EVENTBRIDGE_LINGER_MS", "20"))
+EVENTBRIDGE_MAX_RETRIES = int(os.getenv("EVENTBRIDGE_MAX_RETRIES", "3"))
+EVENTBRIDGE_RETRY_BACKOFF_MS = float(os.getenv("EVENTBRIDGE_RETRY_BACKOFF_MS", "50"))
+
+# Entry-level error codes that are worth sending again
+RETRYABLE_ERROR_CODES = {
+    "ThrottlingException",
+    "InternalFailure",
+    "InternalException",
+    "ServiceUnavailable",
+}
+
+logger = logging.getLogger(__name__)
+
+
+class DispatchError(Exception):
+    """Raised on a caller's future when its entry could not be delivered."""
+
+    def __init__(self, message: str, error_code: Optional[str] = None):
+        super().__init__(message)
+        self.error_code = error_code
+
+
+class DispatchOutcomeUnknown(Exception):
+    """
+    Raised by `put_event` when the wait timed out after the entry was handed
+    to PutEvents: it may still be (or have been) delivered.
+    """
+
+
+class EventBridgeDispatcher(BatchCollector):
+    """
+    Gathers PutEvents entries from concurrent callers into batches.
+
+    A background thread flushes a batch once it holds `batch_size` entries or
+    `linger_ms` has passed since its first entry. Only the entries that failed
+    (per the response's `Entries` list) are retried, and every caller gets its
+    own EventId or DispatchError through the Future returned by `submit`.
+    Retries wait on the background thread's schedule, so a backoff does not
+    hold up the entries queued behind it.
+    `on_throttle` is called once per PutEvents call that was throttled.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        batch_size: int = EVENTBRIDGE_BATCH_SIZE,
+        linger_ms: float = EVENTBRIDGE_LINGER_MS,
+        max_retries: int = EVENTBRIDGE_MAX_RETRIES,
+        retry_backoff_ms: float = EVENTBRIDGE_RETRY_BACKOFF_MS,
+        on_throttle: Optional[Callable[[], None]] = None,
+    ):
+        if not 1 <= batch_size <= MAX_PUT_EVENTS_ENTRIES:
+            raise ValueError(f"batch_size must be between 1 and {MAX_PUT_EVENTS_ENTRIES}")
+        self.client = client
+        self.max_retries = max_retries
+        self.on_throttle = on_throttle
+        super().__init__(batch_size, linger_ms, retry_backoff_ms, name="eventbridge-dispatcher")
+
+    # --- Public API ---
+
+    def put_event(self, entry: Dict[str, Any], timeout: Optional[float] = None) -> str:
+        """
+        Blocking helper: submits an entry and waits for its EventId.
+
+        When `timeout` runs out before the entry was sent, it is cancelled and
+        DispatchError is raised: it will never be delivered. When it was
+        already sent (or is between retries), DispatchOutcomeUnknown is raised.
+        """
+        future = self.submit(entry)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            if future.cancel():
+                raise DispatchError(f"Entry was not sent within {timeout}s; cancelled.", "Timeout")
+            raise DispatchOutcomeUnknown(f"No PutEvents result within {timeout}s; the entry may still be delivered.")
+
+    # --- Background flushing ---
+
+    def _flush(self, batch: List[PendingItem]) -> None:
+        for item in batch:
+            item.attempts += 1
+
+        PUT_EVENTS_BATCH_SIZE.observe(len(batch))
+        try:
+            response = self.client.put_events(Entries=[item.payload for item in batch])
+        except Exception as e:
+            logger.warning("put_events call failed for %d entries: %s", len(batch), e)
+            if is_throttling_error(e):
+                self._throttled()
+            self._retry_or_fail(batch, str(e), None)
+            return
+
+        results = response.get("Entries", [])
+        failed: List[PendingItem] = []
+        for item, result in zip(batch, results):
+            event_id = result.get("EventId")
+            if event_id:
+                item.future.set_result(event_id)
+                continue
+
+            error_code = result.get("ErrorCode")
+            error_message = result.get("ErrorMessage", "Unknown PutEvents error")
+            if error_code in RETRYABLE_ERROR_CODES and item.attempts <= self.max_retries:
+                failed.append(item)
+            else:
+                item.future.set_exception(DispatchError(f"{error_code}: {error_message}", error_code))
+
+        # A malformed response without per-entry results fails the rest outright
+        for item in batch[len(results):]:
+            item.future.set_exception(DispatchError("PutEvents returned no result for entry."))
+
+        if any(result.get("ErrorCode") == "ThrottlingException" for result in results):
+            self._throttled()
+        if failed:
+            logger.warning(
+                "PutEvents reported FailedEntryCount=%s; retrying %d entries",
+                response.get("FailedEntryCount", 0), len(failed),
+            )
+            self._retry_later(failed)
+
+    def _throttled(self) -> None:
+        if self.on_throttle is not None:
+            self.on_throttle()
+
+    def _retry_or_fail(self, pending: List[PendingItem], message: str, error_code: Optional[str]) -> None:
+        retry = []
+        for item in pending:
+            if item.attempts <= self.max_retries:
+                retry.append(item)
+            else:
+                item.future.set_exception(DispatchError(message, error_code))
+        if retry:
+            self._retry_later(retry)
@@ -0,0 +1,240 @@
+# a2a_cash_flow_demo/services/root-agent/app/a2a/events.py
+
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from langchain_core.messages import AIMessage
+
+from .instrumentation import TERMINAL_STATUSES
+from .metrics import TASK_EVENT_SUBSCRIBERS, TASK_EVENTS_DROPPED, TASK_EVENTS_PUBLISHED
+from .redis_client import REDIS_HOST, get_redis_client
+
+# --- Configuration ---
+# memory | redis；多個 replica 時用 redis pub/sub 讓每個 replica 都收到事件
+TASK_EVENTS_BACKEND = os.getenv("TASK_EVENTS_BACKEND", "redis" if REDIS_HOST else "memory").lower()
+TASK_EVENTS_CHANNEL = os.getenv("TASK_EVENTS_CHANNEL", "a2a:task-events")
+# 每個 SSE 連線最多暫存的事件數，滿了丟棄最舊的
+TASK_EVENTS_SUBSCRIBER_QUEUE = int(os.getenv("TASK_EVENTS_SUBSCRIBER_QUEUE", "100"))
+TASK_EVENTS_HEARTBEAT_SECONDS = float(os.getenv("TASK_EVENTS_HEARTBEAT_SECONDS", "15"))
+# 單一 SSE 連線的最長時間，之後由 client 重新連線
+TASK_EVENTS_MAX_STREAM_SECONDS = float(os.getenv("TASK_EVENTS_MAX_STREAM_SECONDS", "3600"))
+
+logger = logging.getLogger(__name__)
+
+Subscription = Tuple[asyncio.AbstractEventLoop, "asyncio.Queue[Dict[str, Any]]"]
+
+
+# --- Events ---
+
+def events_from_update(task_id: str, update: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Task events for a state update: one `status` event when the status
+    changed and one `message` event per new AIMessage.
+    """
+    now = time.time()
+    events = []
+    if update.get("status"):
+        event = {"type": "status", "task_id": task_id, "status": update["status"], "ts": now}
+        if update.get("needs_info"):
+            event["needs_info"] = list(update["needs_info"])
+        events.append(event)
+    for message in update.get("messages") or []:
+        if isinstance(message, AIMessage):
+            content = message.content if isinstance(message.content, str) else str(message.content)
+            events.append({"type": "message", "task_id": task_id, "content": content, "ts": now})
+    return events
+
+
+def format_sse(event: Dict[str, Any]) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False, default=str)}\n\n"
+
+
+# --- Broker ---
+
+class TaskEventBroker:
+    """
+    Fans task events out to the SSE streams waiting on that task.
+
+    Each stream owns a bounded asyncio.Queue on the event loop; `publish` may
+    be called from any thread (graph runs happen on the executor). With a
+    Redis client, events are published to one channel and every replica
+    delivers them to its local streams from a single subscriber thread, so a
+    waiting client costs one idle connection and no checkpoint reads.
+    """
+
+    def __init__(
+        self,
+        redis_client: Any = None,
+        channel: str = TASK_EVENTS_CHANNEL,
+        queue_size: int = TASK_EVENTS_SUBSCRIBER_QUEUE,
+    ):
+        self.redis = redis_client
+        self.channel = channel
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._listener: Optional[threading.Thread] = None
+        if redis_client is not None:
+            self._listener = threading.Thread(target=self._listen, name="task-events-redis", daemon=True)
+            self._listener.start()
+
+    # --- Subscriptions ---
+
+    def subscribe(self, task_id: str) -> Subscription:
+        """
+        Must be called on the event loop that will consume the queue.
+        """
+        subscription = (asyncio.get_running_loop(), asyncio.Queue(maxsize=self.queue_size))
+        with self._lock:
+            self._subscribers.setdefault(task_id, set()).add(subscription)
+        TASK_EVENT_SUBSCRIBERS.inc()
+        return subscription
+
+    def unsubscribe(self, task_id: str, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(task_id)
+            if subscribers is None or subscription not in subscribers:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[task_id]
+        TASK_EVENT_SUBSCRIBERS.dec()
+
+    # --- Publishing ---
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        TASK_EVENTS_PUBLISHED.labels(type=event["type"]).inc()
+        if self.redis is not None:
+            try:
+                self.redis.publish(self.channel, json.dumps(event, default=str))
+                return
+            except Exception as e:
+                # Redis 不可用時至少送給本 replica 的連線
+                logger.warning("Failed to publish task event to Redis, delivering locally: %s", e)
+        self._deliver(event)
+
+    def _deliver(self, event: Dict[str, Any]) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(event["task_id"], ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._enqueue, queue, event)
+            except RuntimeError:
+                # 事件迴圈已關閉
+                pass
+
+    @staticmethod
+    def _enqueue(queue: "asyncio.Queue[Dict[str, Any]]", event: Dict[str, Any]) -> None:
+        if queue.full():
+            queue.get_nowait()
+            TASK_EVENTS_DROPPED.inc()
+        queue.put_nowait(event)
+
+    def _listen(self) -> None:
+        backoff = 0.5
+        while not self._stopping.is_set():
+            pubsub = None
+            try:
+                pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                backoff = 0.5
+                while not self._stopping.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message and message.get("type") == "message":
+                        self._deliver(json.loads(message["data"]))
+            except Exception as e:
+                logger.warning("Task event subscription to Redis failed, retrying in %.1fs: %s", backoff, e)
+                self._stopping.wait(backoff)
+                backoff = min(backoff * 2, 30.0)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+
+    def close(self) -> None:
+        self._stopping.set()
+        if self._listener is not None:
+            self._listener.join(timeout=5)
+
+    # --- Streaming ---
+
+    async def stream(
+        self,
+        task_id: str,
+        snapshot: Any,
+        heartbeat_seconds: float = TASK_EVENTS_HEARTBEAT_SECONDS,
+        max_seconds: float = TASK_EVENTS_MAX_STREAM_SECONDS,
+    ) -> AsyncIterator[str]:
+        """
+        SSE body for one task: the current status first, then live events
+        until the task reaches a terminal status, with comment heartbeats in
+        between. `snapshot` is an awaitable returning the current status
+        event (or None); it is awaited after subscribing so nothing published
+        in between is missed.
+        """
+        subscription = self.subscribe(task_id)
+        _, queue = subscription
+        deadline = time.monotonic() + max_seconds
+        try:
+            current = await snapshot
+            if current is not None:
+                yield format_sse(current)
+                if current.get("status") in TERMINAL_STATUSES:
+                    return
+
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=min(heartbeat_seconds, remaining))
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(event)
+                if event["type"] == "status" and event.get("status") in TERMINAL_STATUSES:
+                    return
+        finally:
+            self.unsubscribe(task_id, subscription)
+
+
+_broker: Optional[TaskEventBroker] = None
+_broker_lock = threading.Lock()
+
+
+def get_event_broker() -> TaskEventBroker:
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                redis_client = get_redis_client() if TASK_EVENTS_BACKEND == "redis" else None
+                _broker = TaskEventBroker(redis_client)
+    return _broker
+
+
+def publish_update(task_id: str, update: Dict[str, Any]) -> None:
+    """
+    Publishes the events of one committed state update. Never raises.
+    """
+    try:
+        broker = get_event_broker()
+        for event in events_from_update(task_id, update):
+            broker.publish(event)
+    except Exception as e:
+        logger.warning("Failed to publish task events for %s: %s", task_id, e)
+
+
+def close_event_broker() -> None:
+    global _broker
+    with _broker_lock:
+        if _broker is not None:
+            _broker.close()
+            _broker = None
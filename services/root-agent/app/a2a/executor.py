@@ -0,0 +1,53 @@
+# a2a_cash_flow_demo/services/root-agent/app/a2a/executor.py
+
+import os
+import asyncio
+import logging
+import functools
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+# --- Configuration ---
+# LangGraph 的 invoke/get_state/update_state 會同步呼叫 DynamoDB / EventBridge，
+# 放到固定大小的 thread pool 執行，避免卡住 uvicorn 的 event loop
+GRAPH_EXECUTOR_WORKERS = int(os.getenv("GRAPH_EXECUTOR_WORKERS", "16"))
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Returns the shared, bounded executor used for blocking graph calls.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=GRAPH_EXECUTOR_WORKERS,
+            thread_name_prefix="graph-worker",
+        )
+        logger.info(f"Graph executor started with {GRAPH_EXECUTOR_WORKERS} workers")
+    return _executor
+
+
+async def run_blocking(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Runs a blocking callable on the graph executor and awaits its result,
+    in a copy of the caller's context (like asyncio.to_thread).
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(get_executor(), functools.partial(context.run, func, *args, **kwargs))
+
+
+def shutdown_executor(wait: bool = True) -> None:
+    """
+    Stops the executor, optionally waiting for in-flight graph runs to finish.
+    """
+    global _executor
+    if _executor is not None:
+        logger.info("Shutting down graph executor...")
+        _executor.shutdown(wait=wait)
+        _executor = None
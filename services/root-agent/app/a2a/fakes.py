@@ -0,0 +1,747 @@
+# a2a_cash_flow_demo/services/root-agent/app/a2a/fakes.py
+
+"""
+In-memory stand-ins for the AWS clients used by the root agent.
+
+They implement only the calls and response shapes the root agent relies on,
+so the dispatcher and consumers can run locally without an AWS account.
+"""
+
+import time
+import uuid
+import queue
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+
+class FakeEventBridgeClient:
+    """
+    Mimics `boto3.client("events").put_events`.
+
+    `fail_entry` can be set to a callable returning an ErrorCode (or None) for
+    each entry, to simulate partial batch failures such as throttling.
+    """
+
+    def __init__(self, fail_entry: Optional[Callable[[Dict[str, Any]], Optional[str]]] = None):
+        self.fail_entry = fail_entry
+        self.calls: List[List[Dict[str, Any]]] = []
+        self.events: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def put_events(self, Entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        if not 1 <= len(Entries) <= 10:
+            raise ValueError("PutEvents accepts between 1 and 10 entries.")
+
+        results = []
+        failed = 0
+        with self._lock:
+            self.calls.append(list(Entries))
+            for entry in Entries:
+                error_code = self.fail_entry(entry) if self.fail_entry else None
+                if error_code:
+                    failed += 1
+                    results.append({"ErrorCode": error_code, "ErrorMessage": f"Simulated {error_code}"})
+                else:
+                    event_id = str(uuid.uuid4())
+                    self.events.append({**entry, "EventId": event_id})
+                    results.append({"EventId": event_id})
+
+        return {"FailedEntryCount": failed, "Entries": results}
+
+
+class _FakeMessage:
+    __slots__ = ("message_id", "body", "receipt_handle", "visible_at", "receive_count")
+
+    def __init__(self, body: str):
+        self.message_id = str(uuid.uuid4())
+        self.body = body
+        self.receipt_handle: Optional[str] = None
+        self.visible_at = 0.0
+        self.receive_count = 0
+
+
+class FakeSQSClient:
+    """
+    Mimics the subset of `boto3.client("sqs")` used by the consumers:
+    send, batch send, long-poll receive, batch delete and visibility changes.
+    Queue URLs are arbitrary strings; queues are created on first use.
+    """
+
+    def __init__(self, default_visibility_timeout: int = 30):
+        self.default_visibility_timeout = default_visibility_timeout
+        self._queues: Dict[str, Dict[str, _FakeMessage]] = {}
+        self._by_receipt: Dict[str, _FakeMessage] = {}
+        self._cond = threading.Condition()
+        self.calls: Dict[str, int] = {}
+
+    def _count(self, name: str) -> None:
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def _queue(self, url: str) -> Dict[str, _FakeMessage]:
+        return self._queues.setdefault(url, {})
+
+    def send_message(self, QueueUrl: str, MessageBody: str, **_: Any) -> Dict[str, Any]:
+        with self._cond:
+            self._count("send_message")
+            message = _FakeMessage(MessageBody)
+            self._queue(QueueUrl)[message.message_id] = message
+            self._cond.notify_all()
+        return {"MessageId": message.message_id}
+
+    def send_message_batch(self, QueueUrl: str, Entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        if not 1 <= len(Entries) <= 10:
+            raise ValueError("SendMessageBatch accepts between 1 and 10 entries.")
+        successful = []
+        with self._cond:
+            self._count("send_message_batch")
+            queue = self._queue(QueueUrl)
+            for entry in Entries:
+                message = _FakeMessage(entry["MessageBody"])
+                queue[message.message_id] = message
+                successful.append({"Id": entry["Id"], "MessageId": message.message_id})
+            self._cond.notify_all()
+        return {"Successful": successful, "Failed": []}
+
+    def receive_message(
+        self,
+        QueueUrl: str,
+        MaxNumberOfMessages: int = 1,
+        WaitTimeSeconds: int = 0,
+        VisibilityTimeout: Optional[int] = None,
+        **_: Any,
+    ) -> Dict[str, Any]:
+        visibility = self.default_visibility_timeout if VisibilityTimeout is None else VisibilityTimeout
+        deadline = time.monotonic() + WaitTimeSeconds
+        with self._cond:
+            self._count("receive_message")
+            while True:
+                now = time.monotonic()
+                received = []
+                for message in self._queue(QueueUrl).values():
+                    if message.visible_at > now:
+                        continue
+                    message.visible_at = now + visibility
+                    message.receive_count += 1
+                    if message.receipt_handle:
+                        self._by_receipt.pop(message.receipt_handle, None)
+                    message.receipt_handle = str(uuid.uuid4())
+                    self._by_receipt[message.receipt_handle] = message
+                    received.append({
+                        "MessageId": message.message_id,
+                        "ReceiptHandle": message.receipt_handle,
+                        "Body": message.body,
+                        "Attributes": {"ApproximateReceiveCount": str(message.receive_count)},
+                    })
+                    if len(received) >= MaxNumberOfMessages:
+                        break
+
+                remaining = deadline - now
+                if received or remaining <= 0:
+                    return {"Messages": received} if received else {}
+                # 等待新訊息或下一個訊息重新可見
+                self._cond.wait(timeout=min(remaining, 0.05))
+
+    def delete_message(self, QueueUrl: str, ReceiptHandle: str) -> Dict[str, Any]:
+        with self._cond:
+            self._count("delete_message")
+            message = self._by_receipt.pop(ReceiptHandle, None)
+            if message:
+                self._queue(QueueUrl).pop(message.message_id, None)
+        return {}
+
+    def delete_message_batch(self, QueueUrl: str, Entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        if not 1 <= len(Entries) <= 10:
+            raise ValueError("DeleteMessageBatch accepts between 1 and 10 entries.")
+        successful, failed = [], []
+        with self._cond:
+            self._count("delete_message_batch")
+            queue = self._queue(QueueUrl)
+            for entry in Entries:
+                message = self._by_receipt.pop(entry["ReceiptHandle"], None)
+                if message is None:
+                    failed.append({"Id": entry["Id"], "Code": "ReceiptHandleIsInvalid", "SenderFault": True})
+                    continue
+                queue.pop(message.message_id, None)
+                successful.append({"Id": entry["Id"]})
+        return {"Successful": successful, "Failed": failed}
+
+    def change_message_visibility(self, QueueUrl: str, ReceiptHandle: str, VisibilityTimeout: int) -> Dict[str, Any]:
+        with self._cond:
+            self._count("change_message_visibility")
+            message = self._by_receipt.get(ReceiptHandle)
+            if message is None:
+                raise ValueError("ReceiptHandleIsInvalid")
+            message.visible_at = time.monotonic() + VisibilityTimeout
+            self._cond.notify_all()
+        return {}
+
+    def approximate_size(self, QueueUrl: str) -> int:
+        with self._cond:
+            return len(self._queue(QueueUrl))
+
+
+class _FakePubSub:
+    def __init__(self, redis: "FakeRedis"):
+        self._redis = redis
+        self._messages: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        self.channels: List[str] = []
+
+    def subscribe(self, *channels: str) -> None:
+        self._redis._check()
+        with self._redis._lock:
+            for channel in channels:
+                self.channels.append(channel)
+                self._redis._subscribers.setdefault(channel, []).append(self)
+
+    def get_message(self, timeout: float = 0.0) -> Optional[Dict[str, Any]]:
+        self._redis._check()
+        try:
+            return self._messages.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self) -> None:
+        with self._redis._lock:
+            for channel in self.channels:
+                subscribers = self._redis._subscribers.get(channel, [])
+                if self in subscribers:
+                    subscribers.remove(self)
+        self.channels = []
+
+
+class _FakeLock:
+    """
+    Mirrors `redis.lock.Lock`: a random token stored under `name` with a
+    TTL of `timeout` seconds, released or extended only by its owner.
+    """
+
+    def __init__(
+        self,
+        redis: "FakeRedis",
+        name: str,
+        timeout: Optional[float] = None,
+        sleep: float = 0.1,
+        blocking: bool = True,
+        blocking_timeout: Optional[float] = None,
+        thread_local: bool = True,
+    ):
+        self.redis = redis
+        self.name = name
+        self.timeout = timeout
+        self.sleep = sleep
+        self.blocking = blocking
+        self.blocking_timeout = blocking_timeout
+        self.token: Optional[bytes] = None
+
+    def acquire(
+        self,
+        sleep: Optional[float] = None,
+        blocking: Optional[bool] = None,
+        blocking_timeout: Optional[float] = None,
+        token: Optional[str] = None,
+    ) -> bool:
+        sleep = self.sleep if sleep is None else sleep
+        blocking = self.blocking if blocking is None else blocking
+        blocking_timeout = self.blocking_timeout if blocking_timeout is None else blocking_timeout
+        token = self.redis._encode(token) if token is not None else uuid.uuid4().hex.encode()
+        stop_at = None if blocking_timeout is None else time.monotonic() + blocking_timeout
+        while True:
+            if self.redis.set(self.name, token, nx=True, ex=self.timeout):
+                self.token = token
+                return True
+            if not blocking or (stop_at is not None and time.monotonic() >= stop_at):
+                return False
+            time.sleep(sleep)
+
+    def _held(self) -> bool:
+        return self.token is not None and self.redis._alive(self.name) and self.redis._data[self.name] == self.token
+
+    def owned(self) -> bool:
+        self.redis._check()
+        with self.redis._lock:
+            return self._held()
+
+    def reacquire(self) -> bool:
+        from redis.exceptions import LockNotOwnedError
+
+        self.redis._check()
+        with self.redis._lock:
+            if not self._held():
+                raise LockNotOwnedError("Cannot reacquire a lock that's no longer owned")
+            if self.timeout is not None:
+                self.redis._expires[self.name] = time.monotonic() + self.timeout
+        return True
+
+    def release(self) -> None:
+        from redis.exceptions import LockNotOwnedError
+
+        self.redis._check()
+        with self.redis._lock:
+            held = self._held()
+            self.token = None
+            if not held:
+                raise LockNotOwnedError("Cannot release a lock that's no longer owned")
+            self.redis._data.pop(self.name, None)
+            self.redis._expires.pop(self.name, None)
+
+
+class FakeRedis:
+    """
+    Minimal in-process Redis with key expiry, pub/sub, sorted sets and
+    locks, covering the commands used by the checkpoint cache, callback
+    dedupe, task events, task deadlines and thread locks.
+    `fail` can be flipped to simulate an outage.
+    """
+
+    def __init__(self):
+        self._data: Dict[str, Any] = {}
+        self._expires: Dict[str, float] = {}
+        self._subscribers: Dict[str, List[_FakePubSub]] = {}
+        self._lock = threading.Lock()
+        self.fail = False
+
+    def _check(self) -> None:
+        if self.fail:
+            raise ConnectionError("Simulated Redis outage")
+
+    def _alive(self, key: str) -> bool:
+        expires_at = self._expires.get(key)
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return key in self._data
+
+    @staticmethod
+    def _encode(value: Any) -> bytes:
+        if isinstance(value, bytes):
+            return value
+        return str(value).encode()
+
+    def ping(self) -> bool:
+        self._check()
+        return True
+
+    def get(self, key: str) -> Optional[bytes]:
+        self._check()
+        with self._lock:
+            return self._data.get(key) if self._alive(key) else None
+
+    def set(self, key: str, value: Any, ex: Optional[int] = None, nx: bool = False) -> Optional[bool]:
+        self._check()
+        with self._lock:
+            if nx and self._alive(key):
+                return None
+            self._data[key] = self._encode(value)
+            if ex is not None:
+                self._expires[key] = time.monotonic() + ex
+            else:
+                self._expires.pop(key, None)
+            return True
+
+    def publish(self, channel: str, message: Any) -> int:
+        self._check()
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, []))
+        for subscriber in subscribers:
+            subscriber._messages.put({"type": "message", "channel": channel.encode(), "data": self._encode(message)})
+        return len(subscribers)
+
+    def pubsub(self, ignore_subscribe_messages: bool = False) -> _FakePubSub:
+        return _FakePubSub(self)
+
+    def lock(self, name: str, **kwargs: Any) -> _FakeLock:
+        return _FakeLock(self, name, **kwargs)
+
+    def delete(self, *keys: str) -> int:
+        self._check()
+        removed = 0
+        with self._lock:
+            for key in keys:
+                if self._alive(key):
+                    removed += 1
+                self._data.pop(key, None)
+                self._expires.pop(key, None)
+        return removed
+
+    def exists(self, key: str) -> int:
+        self._check()
+        with self._lock:
+            return int(self._alive(key))
+
+    # --- Sorted sets (member -> score dict; ordering done on read) ---
+
+    def _zset(self, key: str) -> Dict[bytes, float]:
+        if not self._alive(key):
+            self._data[key] = {}
+        return self._data[key]
+
+    def zadd(self, key: str, mapping: Dict[Any, float]) -> int:
+        self._check()
+        with self._lock:
+            zset = self._zset(key)
+            added = 0
+            for member, score in mapping.items():
+                member = self._encode(member)
+                added += member not in zset
+                zset[member] = float(score)
+            return added
+
+    def zrem(self, key: str, *members: Any) -> int:
+        self._check()
+        with self._lock:
+            zset = self._zset(key)
+            return sum(zset.pop(self._encode(member), None) is not None for member in members)
+
+    def zincrby(self, key: str, amount: float, member: Any) -> float:
+        self._check()
+        with self._lock:
+            zset = self._zset(key)
+            member = self._encode(member)
+            zset[member] = zset.get(member, 0.0) + float(amount)
+            return zset[member]
+
+    def zrangebyscore(
+        self,
+        key: str,
+        min: Any,
+        max: Any,
+        start: Optional[int] = None,
+        num: Optional[int] = None,
+        withscores: bool = False,
+    ) -> List[Any]:
+        self._check()
+        low, high = float(min), float(max)
+        with self._lock:
+            entries = sorted((score, member) for member, score in self._zset(key).items() if low <= score <= high)
+        if start is not None:
+            entries = entries[start:start + num if num is not None and num >= 0 else None]
+        return [(member, score) for score, member in entries] if withscores else [member for _, member in entries]
+
+    def zcard(self, key: str) -> int:
+        self._check()
+        with self._lock:
+            return len(self._zset(key))
+
+
+class _FakeBatchWriter:
+    def __init__(self, table: "FakeDynamoDBTable"):
+        self.table = table
+
+    def __enter__(self) -> "_FakeBatchWriter":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.table.calls["batch_write"] = self.table.calls.get("batch_write", 0) + 1
+
+    def put_item(self, Item: Dict[str, Any]) -> None:
+        self.table._put(Item)
+
+    def delete_item(self, Key: Dict[str, Any]) -> None:
+        self.table._delete(Key)
+
+
+class _FakeTableClient:
+    def __init__(self, table: "FakeDynamoDBTable"):
+        self.table = table
+
+    def batch_write_item(self, RequestItems: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+        requests = RequestItems.get(self.table.name, [])
+        if not 1 <= len(requests) <= 25:
+            raise ValueError("BatchWriteItem accepts between 1 and 25 requests.")
+        self.table._count("batch_write_item")
+        for request in requests:
+            if "PutRequest" in request:
+                self.table._put(request["PutRequest"]["Item"])
+            else:
+                self.table._delete(request["DeleteRequest"]["Key"])
+        return {"UnprocessedItems": {}}
+
+
+class _FakeTableMeta:
+    def __init__(self, table: "FakeDynamoDBTable"):
+        self.client = _FakeTableClient(table)
+
+
+class FakeDynamoDBTable:
+    """
+    Mimics a `boto3.resource("dynamodb").Table` with a hash and range key.
+    `query` understands the key conditions built with
+    `boto3.dynamodb.conditions.Key` (eq, begins_with, lt/lte/gt/gte, between)
+    and, for the names in `indexes` (index -> (hash, range) attribute), the
+    GSI form with `IndexName`. Conditional puts accept
+    `attribute_not_exists(<hash>)` or `boto3.dynamodb.conditions.Attr`
+    comparisons against the stored item.
+    """
+
+    def __init__(
+        self,
+        hash_key: str = "PK",
+        range_key: Optional[str] = "SK",
+        name: str = "fake-table",
+        indexes: Optional[Dict[str, Any]] = None,
+    ):
+        self.name = name
+        self.hash_key = hash_key
+        self.range_key = range_key
+        self.indexes = dict(indexes or {})
+        self.key_schema = [{"AttributeName": hash_key, "KeyType": "HASH"}]
+        if range_key:
+            self.key_schema.append({"AttributeName": range_key, "KeyType": "RANGE"})
+        # 讓 `table.meta.client.batch_write_item` 也能運作
+        self.meta = _FakeTableMeta(self)
+        self._items: Dict[Any, Dict[Any, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self.calls: Dict[str, int] = {}
+
+    def _count(self, name: str) -> None:
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def _put(self, item: Dict[str, Any]) -> None:
+        with self._lock:
+            partition = self._items.setdefault(item[self.hash_key], {})
+            partition[item.get(self.range_key) if self.range_key else None] = dict(item)
+
+    def _delete(self, key: Dict[str, Any]) -> None:
+        with self._lock:
+            partition = self._items.get(key[self.hash_key], {})
+            partition.pop(key.get(self.range_key) if self.range_key else None, None)
+
+    def put_item(self, Item: Dict[str, Any], ConditionExpression: Optional[str] = None, **_: Any) -> Dict[str, Any]:
+        self._count("put_item")
+        if ConditionExpression is None:
+            self._put(Item)
+            return {}
+
+        # `attribute_not_exists(<hash key>)` 字串，或 Attr(...) 的比較條件
+        if isinstance(ConditionExpression, str):
+            if ConditionExpression.replace(" ", "") != f"attribute_not_exists({self.hash_key})":
+                raise NotImplementedError(f"Unsupported ConditionExpression: {ConditionExpression}")
+            conditions = None
+        else:
+            conditions = self._flatten(ConditionExpression)
+        with self._lock:
+            partition = self._items.setdefault(Item[self.hash_key], {})
+            range_value = Item.get(self.range_key) if self.range_key else None
+            existing = partition.get(range_value)
+            if conditions is None:
+                passed = existing is None
+            else:
+                passed = existing is not None and all(
+                    self._matches(existing.get(name), op, values) for name, op, values in conditions
+                )
+            if not passed:
+                from botocore.exceptions import ClientError
+
+                raise ClientError(
+                    {"Error": {"Code": "ConditionalCheckFailedException", "Message": "The conditional request failed"}},
+                    "PutItem",
+                )
+            partition[range_value] = dict(Item)
+        return {}
+
+    def get_item(self, Key: Dict[str, Any], **_: Any) -> Dict[str, Any]:
+        self._count("get_item")
+        with self._lock:
+            partition = self._items.get(Key[self.hash_key], {})
+            item = partition.get(Key.get(self.range_key) if self.range_key else None)
+        return {"Item": dict(item)} if item else {}
+
+    def delete_item(self, Key: Dict[str, Any], **_: Any) -> Dict[str, Any]:
+        self._count("delete_item")
+        self._delete(Key)
+        return {}
+
+    def batch_writer(self) -> _FakeBatchWriter:
+        return _FakeBatchWriter(self)
+
+    def query(
+        self,
+        KeyConditionExpression: Any,
+        ProjectionExpression: Optional[str] = None,
+        ExclusiveStartKey: Optional[Dict[str, Any]] = None,
+        Limit: Optional[int] = None,
+        ScanIndexForward: bool = True,
+        **_: Any,
+    ) -> Dict[str, Any]:
+        self._count("query")
+        conditions = self._flatten(KeyConditionExpression)
+        index_name = _.get("IndexName")
+        if index_name:
+            # GSI：掃過所有 partition，只保留有 index key 的 item (sparse index)
+            hash_key, range_key = self.indexes[index_name]
+            hash_value = next(values[0] for name, op, values in conditions if name == hash_key)
+            with self._lock:
+                items = [
+                    dict(item)
+                    for partition in self._items.values()
+                    for item in partition.values()
+                    if item.get(hash_key) == hash_value and range_key in item
+                ]
+        else:
+            hash_key, range_key = self.hash_key, self.range_key
+            hash_value = next(values[0] for name, op, values in conditions if name == hash_key)
+            with self._lock:
+                items = [dict(item) for item in self._items.get(hash_value, {}).values()]
+        for name, op, values in conditions:
+            if name != hash_key:
+                items = [item for item in items if self._matches(item.get(name), op, values)]
+
+        items.sort(key=lambda item: item.get(range_key), reverse=not ScanIndexForward)
+        if ExclusiveStartKey is not None:
+            start = ExclusiveStartKey[range_key]
+            items = [
+                item for item in items
+                if (item[range_key] > start if ScanIndexForward else item[range_key] < start)
+            ]
+        response: Dict[str, Any] = {}
+        if Limit is not None and len(items) > Limit:
+            items = items[:Limit]
+            last = items[-1]
+            last_key = {self.hash_key: last[self.hash_key], self.range_key: last[self.range_key]}
+            last_key.update({hash_key: last[hash_key], range_key: last[range_key]})
+            response["LastEvaluatedKey"] = last_key
+        if ProjectionExpression:
+            fields = [f.strip() for f in ProjectionExpression.split(",")]
+            items = [{f: item[f] for f in fields if f in item} for item in items]
+        response["Items"] = items
+        response["Count"] = len(items)
+        return response
+
+    @classmethod
+    def _flatten(cls, condition: Any) -> List[Any]:
+        expression = condition.get_expression()
+        if expression["operator"] == "AND":
+            return cls._flatten(expression["values"][0]) + cls._flatten(expression["values"][1])
+        key, *values = expression["values"]
+        return [(key.name, expression["operator"], values)]
+
+    @staticmethod
+    def _matches(value: Any, op: str, values: List[Any]) -> bool:
+        if value is None:
+            return False
+        if op == "=":
+            return value == values[0]
+        if op == "begins_with":
+            return str(value).startswith(values[0])
+        if op == "<":
+            return value < values[0]
+        if op == "<=":
+            return value <= values[0]
+        if op == ">":
+            return value > values[0]
+        if op == ">=":
+            return value >= values[0]
+        if op == "BETWEEN":
+            return values[0] <= value <= values[1]
+        raise ValueError(f"Unsupported key condition: {op}")
+
+
+class _FakeBody:
+    def __init__(self, data: bytes):
+        self.data = data
+
+    def read(self) -> bytes:
+        return self.data
+
+
+class FakeS3Client:
+    """
+    Mimics `boto3.client("s3")` put_object / get_object / list_objects_v2 /
+    delete_objects on in-memory buckets.
+    """
+
+    def __init__(self):
+        self.objects: Dict[Any, bytes] = {}
+        self.calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _count(self, operation: str) -> None:
+        self.calls[operation] = self.calls.get(operation, 0) + 1
+
+    def put_object(self, Bucket: str, Key: str, Body: bytes) -> Dict[str, Any]:
+        with self._lock:
+            self._count("put_object")
+            self.objects[(Bucket, Key)] = bytes(Body)
+        return {}
+
+    def get_object(self, Bucket: str, Key: str) -> Dict[str, Any]:
+        from botocore.exceptions import ClientError
+
+        with self._lock:
+            self._count("get_object")
+            data = self.objects.get((Bucket, Key))
+        if data is None:
+            raise ClientError({"Error": {"Code": "NoSuchKey", "Message": "The specified key does not exist."}}, "GetObject")
+        return {"Body": _FakeBody(data), "ContentLength": len(data)}
+
+    def list_objects_v2(self, Bucket: str, Prefix: str = "", ContinuationToken: Optional[str] = None,
+                        MaxKeys: int = 1000) -> Dict[str, Any]:
+        with self._lock:
+            self._count("list_objects_v2")
+            keys = sorted(key for bucket, key in self.objects if bucket == Bucket and key.startswith(Prefix))
+        start = int(ContinuationToken or 0)
+        page = keys[start:start + MaxKeys]
+        response: Dict[str, Any] = {"Contents": [{"Key": key} for key in page], "KeyCount": len(page)}
+        if start + MaxKeys < len(keys):
+            response.update(IsTruncated=True, NextContinuationToken=str(start + MaxKeys))
+        else:
+            response["IsTruncated"] = False
+        return response
+
+    def delete_objects(self, Bucket: str, Delete: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            self._count("delete_objects")
+            for obj in Delete["Objects"]:
+                self.objects.pop((Bucket, obj["Key"]), None)
+        return {}
+
+
+class StubRemoteAgent:
+    """
+    Local stand-in for a remote agent's A2A HTTP API, usable as the handler
+    of an `httpx.MockTransport`.
+
+    `POST /a2a/invoke` answers `200 SUCCEEDED` with `output` when `inline`
+    is true, otherwise `202` with a ticket and an eta. `GET /a2a/result`
+    reports `RUNNING` with the remaining eta until the ticket is ready, then
+    `SUCCEEDED`. `fail` makes every call return 503.
+    """
+
+    def __init__(self, inline: bool = True, output: Optional[Dict[str, Any]] = None, eta_seconds: float = 1.0):
+        self.inline = inline
+        self.output = output if output is not None else {"ok": True}
+        self.eta_seconds = eta_seconds
+        self.fail = False
+        self.tickets: Dict[str, Dict[str, Any]] = {}
+        self.calls: List[Any] = []
+        self._lock = threading.Lock()
+
+    def __call__(self, request: Any) -> Any:
+        import json
+        import httpx
+
+        with self._lock:
+            self.calls.append((request.method, request.url.path))
+        if self.fail:
+            return httpx.Response(503, json={"error": "unavailable"})
+
+        if request.method == "POST" and request.url.path == "/a2a/invoke":
+            envelope = json.loads(request.content or b"{}")
+            if self.inline:
+                return httpx.Response(200, json={"status": "SUCCEEDED", "output": self.output, "memory_patch": {}})
+            ticket = str(uuid.uuid4())
+            with self._lock:
+                self.tickets[ticket] = {"envelope": envelope, "ready_at": time.monotonic() + self.eta_seconds}
+            return httpx.Response(202, json={"ticket": ticket, "eta": self.eta_seconds})
+
+        if request.method == "GET" and request.url.path == "/a2a/result":
+            with self._lock:
+                entry = self.tickets.get(request.url.params.get("ticket"))
+            if entry is None:
+                return httpx.Response(404, json={"error": "unknown ticket"})
+            remaining = entry["ready_at"] - time.monotonic()
+            if remaining > 0:
+                return httpx.Response(200, json={"status": "RUNNING", "eta": remaining})
+            return httpx.Response(200, json={"status": "SUCCEEDED", "output": self.output})
+
+        return httpx.Response(404, json={"error": "not found"})
@@ -2,48 +2,74 @@
 
 import os
 import logging
-import operator
-from typing import TypedDict, Annotated, List
-from langgraph.graph import StateGraph, END
+import threading
+from typing import Any, TypedDict, Annotated, Dict, List, Optional
+# langgraph.graph 與 DynamoDBSaver 很重，延到 get_graph_app() 才載入
+from langgraph.constants import END
 from langchain_core.messages import BaseMessage, AIMessage
-from langgraph_checkpoint_dynamodb import DynamoDBSaver, DynamoDBConfig, DynamoDBTableConfig
-import redis 
 from . import tools
+from .checkpoint import CachedCheckpointSaver, FencedCheckpointSaver, SpillScopedSaver
+from .compaction import bounded_add, archive_messages
+from .admission import report_throttle
+from .ddb_batch import BatchingTable
+from .serde import build_serializer, get_spill_store
+from .redis_client import get_redis_client
+from .thread_lock import check_thread_lease
+from .logging_config import debug_enabled, summarize_state
+from .instrumentation import InstrumentedCheckpointSaver, InstrumentedSerializer, timed_node, TERMINAL_STATUSES
 
 # --- 從環境變數讀取配置 ---
 AWS_REGION = os.environ.get("AWS_REGION", "ap-southeast-1")
 DDB_TABLE_NAME = os.environ.get("DDB_A2A_TASKS_TABLE_NAME", "ds_demo_a2a_tasks")
+# dynamodb | memory (本機執行與 benchmark 用，重啟後狀態消失)
+CHECKPOINT_BACKEND = os.environ.get("CHECKPOINT_BACKEND", "dynamodb").lower()
 
-# # 短期記憶 Redis
-# REDIS_HOST = os.environ.get("REDIS_HOST")
-# REDIS_PORT = os.environ.get("REDIS_PORT", "6379")
+# 併發的 checkpoint PutItem 合併成 BatchWriteItem
+DDB_BATCH_WRITES = os.environ.get("DDB_BATCH_WRITES", "true").lower() == "true"
 
-# --- Logging Configuration ---
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s'
-)
-logging.getLogger("langgraph").setLevel(logging.DEBUG)
+# 節點直接拿到 remote agent 的 inline 結果後的狀態；
+# graph 停在 interrupt 時若是這些狀態，表示不需等待 callback，可立即繼續
+INLINE_RESULT_STATUSES = {"transactions_recognized", "response_drafted"}
+
+# --- Logging ---
+# 由 logging_config.configure_logging() 統一設定 handler 與等級
 logger = logging.getLogger(__name__)
 
+def _log_node(event: str, state: "AgentState", with_state: bool = True) -> None:
+    # 只有 DEBUG 開啟且該 task 被抽樣時才建立 log record
+    if debug_enabled(logger, state["task_id"]):
+        extra = {"task_id": state["task_id"]}
+        if with_state:
+            extra["state"] = summarize_state(state)
+        logger.debug(event, extra=extra)
+
 # --- State Definition ---
 class AgentState(TypedDict):
     task_id: str
     loan_case_id: str
     status: str
-    messages: Annotated[List[BaseMessage], operator.add]
+    # 只保留最近 MESSAGE_HISTORY_WINDOW 筆，完整歷史封存在 audit table
+    messages: Annotated[List[BaseMessage], bounded_add]
     needs_info: List[str]
     human_answer: str
+    # 進入目前 status 的時間 (epoch 秒)，用來計算各階段耗時
+    status_since: float
+    # 任務建立時間 (epoch 秒)，寫入狀態投影
+    created_at: float
+    # 各等待狀態因逾時重新派送的次數 (status -> 次數)
+    deadline_retries: Dict[str, int]
+    # 轉給人工 (awaiting_human_input) 的階段：收到回覆後 router 從此狀態重新派送
+    resume_status: str
 
 # --- Graph Nodes ---
 
 def start_node(state: AgentState) -> dict:
     """Entry point of the graph. Dispatches the first task."""
-    logging.info(f"[Task: {state['task_id']}] Starting process for loan case: {state['loan_case_id']}")
+    logger.info("[Task: %s] Starting process for loan case: %s", state["task_id"], state["loan_case_id"])
     
-    logger.debug("Enter node=start_node", extra={"state": state})
+    _log_node("Enter node=start_node", state)
 
-    dispatch_result = tools.dispatch_to_remote_agent(
+    dispatch_result = tools.invoke_remote_agent(
         task_id=state["task_id"],
         loan_case_id=state["loan_case_id"],
         agent_name="Remote Agent A",
@@ -53,21 +79,25 @@ def start_node(state: AgentState) -> dict:
     if dispatch_result["status"] == "error":
         new_status = "error_dispatch_a"
         message = AIMessage(content=f"Error: Failed to dispatch task to Remote Agent A. Reason: {dispatch_result['message']}")
+    elif dispatch_result["mode"] == "inline":
+        new_status = "transactions_recognized"
+        message = AIMessage(content=f"Remote Agent A recognized the transactions inline: {dispatch_result['output']}")
     else:
         new_status = "recognizing_transactions"
         message = AIMessage(content="Task has been dispatched to Remote Agent A to recognize transaction details. Awaiting callback.")
 
-    logger.debug("Leave node=start_node")
+    archive_messages(state["task_id"], [message])
+    _log_node("Leave node=start_node", state, with_state=False)
 
     return {"status": new_status, "messages": [message]}
 
 def draft_response_node(state: AgentState) -> dict:
     """Dispatches task to Remote Agent B to draft a customer response."""
-    logging.info(f"[Task: {state['task_id']}] Dispatching to Remote Agent B to draft response.")
+    logger.info("[Task: %s] Dispatching to Remote Agent B to draft response.", state["task_id"])
 
-    logger.debug("Enter node=draft_response_node", extra={"state": state})
+    _log_node("Enter node=draft_response_node", state)
 
-    dispatch_result = tools.dispatch_to_remote_agent(
+    dispatch_result = tools.invoke_remote_agent(
         task_id=state["task_id"],
         loan_case_id=state["loan_case_id"],
         agent_name="Remote Agent B",
@@ -77,35 +107,41 @@ def draft_response_node(state: AgentState) -> dict:
     if dispatch_result["status"] == "error":
         new_status = "error_dispatch_b"
         message = AIMessage(content=f"Error: Failed to dispatch task to Remote Agent B. Reason: {dispatch_result['message']}")
+    elif dispatch_result["mode"] == "inline":
+        new_status = "response_drafted"
+        message = AIMessage(content=f"Remote Agent B drafted the response inline: {dispatch_result['output']}")
     else:
         new_status = "drafting_response"
         message = AIMessage(content="Task has been dispatched to Remote Agent B to draft a response. Awaiting callback.")
 
-    logger.debug("Leave node=draft_response_node")
+    archive_messages(state["task_id"], [message])
+    _log_node("Leave node=draft_response_node", state, with_state=False)
 
     return {"status": new_status, "messages": [message]}
 
 def human_in_the_loop_node(state: AgentState) -> dict:
     """Pauses the graph and waits for human input."""
-    logging.info(f"[Task: {state['task_id']}] Process requires human input.")
+    logger.info("[Task: %s] Process requires human input.", state["task_id"])
 
-    logger.debug("Enter node=human_in_the_loop_node", extra={"state": state})
+    _log_node("Enter node=human_in_the_loop_node", state)
 
     message = AIMessage(content=f"Awaiting human input for the following: {state['needs_info']}")
 
-    logger.debug("Leave node=human_in_the_loop_node")
+    archive_messages(state["task_id"], [message])
+    _log_node("Leave node=human_in_the_loop_node", state, with_state=False)
 
     return {"status": "awaiting_human_input", "messages": [message]}
 
 def finish_node(state: AgentState) -> dict:
     """Marks the task as complete."""
-    logging.info(f"[Task: {state['task_id']}] Process completed for loan case: {state['loan_case_id']}")
+    logger.info("[Task: %s] Process completed for loan case: %s", state["task_id"], state["loan_case_id"])
     
-    logger.debug("Enter node=finish_node", extra={"state": state})
+    _log_node("Enter node=finish_node", state)
 
     message = AIMessage(content="The process has been successfully completed.")
 
-    logger.debug("Leave node=finish_node")
+    archive_messages(state["task_id"], [message])
+    _log_node("Leave node=finish_node", state, with_state=False)
 
     return {"status": "completed", "messages": [message]}
 
@@ -113,7 +149,10 @@ def finish_node(state: AgentState) -> dict:
 
 def router(state: AgentState) -> str:
     """Determines the next step in the workflow."""
-    logging.info(f"[Task: {state['task_id']}] Routing based on status: '{state['status']}'")
+    logger.info("[Task: %s] Routing based on status: '%s'", state["task_id"], state["status"])
+
+    if state["status"] in TERMINAL_STATUSES:
+        return END
 
     if state["status"] == "awaiting_human_input":
         return "human_in_the_loop_node"
@@ -131,26 +170,23 @@ def router(state: AgentState) -> str:
 
 # --- Graph Assembly ---
 
-def get_graph_app():
+def _build_dynamodb_saver() -> Any:
     """
-    Builds and compiles the LangGraph application with a DynamoDB checkpointer.
+    DynamoDBSaver on DDB_A2A_TASKS_TABLE_NAME; checks that the table exists.
     """
-    
-    # -------------------------------------------------------------
-    # 1. 設置 DynamoDB Checkpointer (正確配置)
-    # -------------------------------------------------------------
-    logging.info(f">>> Start get_graph_app()...")
     if not DDB_TABLE_NAME:
         raise ValueError("DDB_A2A_TASKS_TABLE_NAME must be set for LangGraph Checkpoint.")
 
+    from langgraph_checkpoint_dynamodb import DynamoDBSaver, DynamoDBConfig, DynamoDBTableConfig
+
     try:
-        logging.info(f">>> 1. 設定 DynamoDB Table 配置")
+        logger.info(">>> 1. 設定 DynamoDB Table 配置")
         # 1.1 設定 DynamoDB Table 配置
         table_config = DynamoDBTableConfig(
             table_name=DDB_TABLE_NAME,
         )
 
-        logging.info(f">>> 2. 設定 DynamoDB 連接配置")
+        logger.info(">>> 2. 設定 DynamoDB 連接配置")
         # 1.2 設定 DynamoDB 連接配置
         config = DynamoDBConfig(
             table_config=table_config,
@@ -159,54 +195,84 @@ def get_graph_app():
             # aws_access_key_id、aws_secret_access_key、aws_session_token 保持 None
         )
 
-        logging.info(f">>> 3. 初始化 Checkpointer")
+        logger.info(">>> 3. 初始化 Checkpointer")
         # 1.3 初始化 Checkpointer
         # deploy=False: 假設表格已透過 Terraform 創建
         # 如果需要自動創建表格，設置為 deploy=True
         checkpointer = DynamoDBSaver(config, deploy=False)
+        checkpointer.serde = InstrumentedSerializer(build_serializer(checkpointer.serde))
+        if DDB_BATCH_WRITES:
+            checkpointer.table = BatchingTable(checkpointer.table, on_throttle=lambda: report_throttle("dynamodb"))
         
-        logging.info(f"✅ DynamoDBSaver initialized successfully for table: {DDB_TABLE_NAME}")
+        logger.info(f"✅ DynamoDBSaver initialized successfully for table: {DDB_TABLE_NAME}")
 
     except Exception as e:
-        logging.error(f"❌ Failed to initialize DynamoDBSaver: {e}")
-        logging.error("Please check:")
-        logging.error("  - DynamoDB table exists and is accessible")
-        logging.error("  - EKS Pod has correct IAM permissions")
-        logging.error("  - Environment variables are set correctly")
-        raise 
-
-    # # -------------------------------------------------------------
-    # # 2. 初始化 Redis 短期記憶客戶端 (獨立於 LangGraph)
-    # # -------------------------------------------------------------
-    # if REDIS_HOST:
-    #     try:
-    #         redis_client = redis.StrictRedis(host=REDIS_HOST, port=int(REDIS_PORT))
-    #         redis_client.ping()
-    #         logging.info(f"✅ Redis connected successfully at {REDIS_HOST}:{REDIS_PORT}")
-    #     except Exception as e:
-    #         logging.warning(f"⚠️ Redis connection failed: {e}")
-    #         logging.warning("Short-term memory features will be unavailable.")
+        logger.error(f"❌ Failed to initialize DynamoDBSaver: {e}")
+        logger.error("Please check:")
+        logger.error("  - DynamoDB table exists and is accessible")
+        logger.error("  - EKS Pod has correct IAM permissions")
+        logger.error("  - Environment variables are set correctly")
+        raise
+
+    return checkpointer
+
+def get_graph_app():
+    """
+    Builds and compiles the LangGraph application with a DynamoDB checkpointer.
+    """
+    
+    # -------------------------------------------------------------
+    # 1. 設置 DynamoDB Checkpointer (正確配置)
+    # -------------------------------------------------------------
+    logger.info(">>> Start get_graph_app()...")
+    from langgraph.graph import StateGraph
+
+    if CHECKPOINT_BACKEND == "memory":
+        from langgraph.checkpoint.memory import InMemorySaver
+
+        logger.warning("CHECKPOINT_BACKEND=memory: checkpoints are kept in this process only.")
+        checkpointer = InMemorySaver()
+        checkpointer.serde = InstrumentedSerializer(build_serializer(checkpointer.serde))
+    else:
+        checkpointer = _build_dynamodb_saver()
+
+    # 外溢到 S3 的 blob 依 thread 存放，checkpoint 刪除 / prune 時一併刪除
+    spill_store = get_spill_store()
+    if spill_store is not None:
+        checkpointer = SpillScopedSaver(checkpointer, spill_store)
+
+    # -------------------------------------------------------------
+    # 2. Redis 快取最新 checkpoint，DynamoDB 保持為持久層
+    # -------------------------------------------------------------
+    # Redis 未連線時不中斷啟動：CachedCheckpointSaver 會在 Redis 恢復前退回 DynamoDB
+    redis_client = get_redis_client()
+    if redis_client is not None:
+        checkpointer = CachedCheckpointSaver(checkpointer, redis_client)
+
+    # 持有的 thread lease 已過期或被其他 worker 接手時，拒絕寫入 checkpoint
+    checkpointer = FencedCheckpointSaver(checkpointer, check_thread_lease)
+    checkpointer = InstrumentedCheckpointSaver(checkpointer)
 
     # -------------------------------------------------------------
     # 3. 定義與編譯 Graph
     # -------------------------------------------------------------
-    logging.info(f">>> StateGraph(AgentState)")
+    logger.info(">>> StateGraph(AgentState)")
     workflow = StateGraph(AgentState)
     
     # Add nodes
-    logging.info(f">>> Add nodes...")
-    workflow.add_node("start_node", start_node)
-    workflow.add_node("draft_response_node", draft_response_node)
-    workflow.add_node("human_in_the_loop_node", human_in_the_loop_node)
-    workflow.add_node("finish_node", finish_node)
+    logger.info(">>> Add nodes...")
+    workflow.add_node("start_node", timed_node("start_node", start_node))
+    workflow.add_node("draft_response_node", timed_node("draft_response_node", draft_response_node))
+    workflow.add_node("human_in_the_loop_node", timed_node("human_in_the_loop_node", human_in_the_loop_node))
+    workflow.add_node("finish_node", timed_node("finish_node", finish_node))
     
     # Set entry and exit points
-    logging.info(f">>> Set entry and exit points...")
+    logger.info(">>> Set entry and exit points...")
     workflow.set_entry_point("start_node")
     workflow.add_edge("finish_node", END)
     
     # Add conditional edges
-    logging.info(f">>> Add conditional edges...")
+    logger.info(">>> Add conditional edges...")
     workflow.add_conditional_edges("start_node", router)
     workflow.add_conditional_edges("draft_response_node", router)
     workflow.add_conditional_edges("human_in_the_loop_node", router)
@@ -230,4 +296,42 @@ def get_graph_app():
         interrupt_after=["start_node", "draft_response_node", "human_in_the_loop_node"])
     logger.info("✅ LangGraph application compiled successfully")
     
-    return app 
+    return app
+
+def close_checkpointer(checkpointer) -> None:
+    """
+    Flushes write-behind checkpoint writes and stops the batching threads.
+    """
+    while True:
+        if isinstance(checkpointer, CachedCheckpointSaver):
+            checkpointer.close()
+            checkpointer = checkpointer.durable
+        elif isinstance(checkpointer, (InstrumentedCheckpointSaver, FencedCheckpointSaver, SpillScopedSaver)):
+            checkpointer = checkpointer.saver
+        else:
+            break
+    table = getattr(checkpointer, "table", None)
+    if isinstance(table, BatchingTable):
+        table.close()
+
+_graph_app: Optional[Any] = None
+_graph_app_lock = threading.Lock()
+
+def get_shared_graph_app() -> Any:
+    """
+    The process-wide compiled graph, built on first use (normally by the
+    startup warm-up, before the replica reports ready).
+    """
+    global _graph_app
+    if _graph_app is None:
+        with _graph_app_lock:
+            if _graph_app is None:
+                _graph_app = get_graph_app()
+    return _graph_app
+
+def close_shared_graph_app() -> None:
+    global _graph_app
+    with _graph_app_lock:
+        graph_app, _graph_app = _graph_app, None
+    if graph_app is not None:
+        close_checkpointer(graph_app.checkpointer)
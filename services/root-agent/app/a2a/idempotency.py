@@ -0,0 +1,217 @@
+# a2a_cash_flow_demo/services/root-agent/app/a2a/idempotency.py
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from .executor import run_blocking
+from .metrics import CALLBACK_DEDUPE_ERRORS, CALLBACK_DEDUPE_REQUESTS
+from .redis_client import REDIS_HOST, get_redis_client
+
+# --- Configuration ---
+# memory | redis | dynamodb；多個 replica 時需使用共享的 redis 或 dynamodb
+CALLBACK_DEDUPE_BACKEND = os.getenv("CALLBACK_DEDUPE_BACKEND", "redis" if REDIS_HOST else "memory").lower()
+CALLBACK_DEDUPE_MAX_ENTRIES = int(os.getenv("CALLBACK_DEDUPE_MAX_ENTRIES", "100000"))
+# 同一個 event 在這段時間內重送都會被視為重複
+CALLBACK_DEDUPE_TTL_SECONDS = int(os.getenv("CALLBACK_DEDUPE_TTL_SECONDS", "86400"))
+# 共享 store 出錯後多久再嘗試使用
+CALLBACK_DEDUPE_RETRY_SECONDS = float(os.getenv("CALLBACK_DEDUPE_RETRY_SECONDS", "5"))
+DDB_DEDUPE_TABLE_NAME = os.getenv("DDB_A2A_DEDUPE_TABLE_NAME", "ds_demo_a2a_callback_dedupe")
+AWS_REGION = os.getenv("AWS_REGION", "ap-southeast-1")
+
+logger = logging.getLogger(__name__)
+
+
+def callback_key(task_id: str, source: str, event_id: Optional[str], payload: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Idempotency key of a callback delivery. Without an event / message ID
+    the payload fingerprint is used, which is identical across redeliveries.
+    """
+    if not event_id:
+        body = json.dumps(payload or {}, sort_keys=True, default=str).encode()
+        event_id = "sha1:" + hashlib.sha1(body).hexdigest()
+    return f"{task_id}|{source}|{event_id}"
+
+
+class LRUSet:
+    """
+    Bounded, thread-safe set of recently seen keys with a per-key TTL.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, key: str) -> bool:
+        """
+        Adds `key`; returns False if it was already present and not expired.
+        """
+        now = time.monotonic()
+        with self._lock:
+            expires_at = self._entries.get(key)
+            if expires_at is not None and expires_at > now:
+                self._entries.move_to_end(key)
+                return False
+            self._entries[key] = now + self.ttl_seconds
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return True
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class RedisDedupeStore:
+    """
+    Shared claims via `SET key 1 NX EX ttl`.
+    """
+
+    backend = "redis"
+
+    def __init__(self, client: Any, ttl_seconds: int = CALLBACK_DEDUPE_TTL_SECONDS, key_prefix: str = "a2a:dedupe"):
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.key_prefix = key_prefix
+
+    def claim(self, key: str) -> bool:
+        return bool(self.client.set(f"{self.key_prefix}:{key}", b"1", nx=True, ex=self.ttl_seconds))
+
+    def release(self, key: str) -> None:
+        self.client.delete(f"{self.key_prefix}:{key}")
+
+
+class DynamoDBDedupeStore:
+    """
+    Shared claims via a conditional PutItem; expired items are removed by
+    the table's TTL on `expires_at`.
+    """
+
+    backend = "dynamodb"
+
+    def __init__(self, table: Any, ttl_seconds: int = CALLBACK_DEDUPE_TTL_SECONDS):
+        self.table = table
+        self.ttl_seconds = ttl_seconds
+
+    def claim(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            self.table.put_item(
+                Item={"dedupe_key": key, "expires_at": int(time.time()) + self.ttl_seconds},
+                ConditionExpression="attribute_not_exists(dedupe_key)",
+            )
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+                return False
+            raise
+        return True
+
+    def release(self, key: str) -> None:
+        self.table.delete_item(Key={"dedupe_key": key})
+
+
+class CallbackDeduplicator:
+    """
+    Drops redelivered callbacks before they touch the checkpointer.
+
+    A delivery is first checked against the in-process LRU, which answers
+    repeats of deliveries claimed by this replica in O(1) without I/O. A miss
+    is then claimed in the shared store (if any), so a duplicate handled by
+    another replica is caught too. When processing fails the claim is released
+    so the redelivery can run. Errors from the shared store fail open: the
+    delivery is processed and the store is bypassed for `retry_seconds`.
+    """
+
+    def __init__(
+        self,
+        store: Any = None,
+        max_entries: int = CALLBACK_DEDUPE_MAX_ENTRIES,
+        ttl_seconds: int = CALLBACK_DEDUPE_TTL_SECONDS,
+        retry_seconds: float = CALLBACK_DEDUPE_RETRY_SECONDS,
+    ):
+        self.store = store
+        self.retry_seconds = retry_seconds
+        self.seen = LRUSet(max_entries, ttl_seconds)
+        self._store_disabled_until = 0.0
+
+    def _store_enabled(self) -> bool:
+        return self.store is not None and time.monotonic() >= self._store_disabled_until
+
+    def _store_failed(self, operation: str, error: Exception) -> None:
+        CALLBACK_DEDUPE_ERRORS.labels(backend=self.store.backend).inc()
+        self._store_disabled_until = time.monotonic() + self.retry_seconds
+        logger.warning("Callback dedupe %s failed on %s, bypassing it for %.0fs: %s",
+                       operation, self.store.backend, self.retry_seconds, error)
+
+    async def claim(self, key: str) -> bool:
+        """
+        Returns True if this delivery is new and should be processed.
+        """
+        if not self.seen.add(key):
+            CALLBACK_DEDUPE_REQUESTS.labels(result="hit_local").inc()
+            return False
+
+        if self._store_enabled():
+            try:
+                claimed = await run_blocking(self.store.claim, key)
+            except Exception as e:
+                self._store_failed("claim", e)
+                claimed = True
+            if not claimed:
+                # 不留在本地：持有者處理失敗釋放後，重送必須能在這個 replica 執行
+                self.seen.discard(key)
+                CALLBACK_DEDUPE_REQUESTS.labels(result="hit_shared").inc()
+                return False
+
+        CALLBACK_DEDUPE_REQUESTS.labels(result="miss").inc()
+        return True
+
+    async def release(self, key: str) -> None:
+        """
+        Forgets a claim whose processing failed, so a retry is not dropped.
+        """
+        self.seen.discard(key)
+        if self._store_enabled():
+            try:
+                await run_blocking(self.store.release, key)
+            except Exception as e:
+                self._store_failed("release", e)
+
+
+_deduplicator: Optional[CallbackDeduplicator] = None
+_deduplicator_lock = threading.Lock()
+
+
+def _build_store() -> Any:
+    if CALLBACK_DEDUPE_BACKEND == "redis":
+        client = get_redis_client()
+        if client is None:
+            logger.warning("CALLBACK_DEDUPE_BACKEND=redis but REDIS_HOST is not set; using the in-memory LRU only.")
+            return None
+        return RedisDedupeStore(client)
+    if CALLBACK_DEDUPE_BACKEND == "dynamodb":
+        import boto3
+
+        return DynamoDBDedupeStore(boto3.resource("dynamodb", region_name=AWS_REGION).Table(DDB_DEDUPE_TABLE_NAME))
+    return None
+
+
+def get_deduplicator() -> CallbackDeduplicator:
+    global _deduplicator
+    if _deduplicator is None:
+        with _deduplicator_lock:
+            if _deduplicator is None:
+                _deduplicator = CallbackDeduplicator(_build_store())
+    return _deduplicator
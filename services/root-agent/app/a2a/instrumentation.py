@@ -0,0 +1,249 @@
+# a2a_cash_flow_demo/services/root-agent/app/a2a/instrumentation.py
+
+import os
+import time
+import logging
+import functools
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+)
+
+from .metrics import (
+    CHECKPOINT_OPERATION_DURATION,
+    CHECKPOINT_PAYLOAD_BYTES,
+    NODE_DURATION,
+    NODE_ERRORS,
+    STAGE_DURATION,
+)
+
+# --- Configuration ---
+# 設為 true 且有安裝 opentelemetry 時，額外輸出 spans
+OTEL_TRACING_ENABLED = os.getenv("OTEL_TRACING_ENABLED", "false").lower() == "true"
+
+# Statuses the workflow knows about; anything else (e.g. a typo in a
+# remote-agent callback) is reported as "other" to bound label cardinality.
+KNOWN_STATUSES = {
+    "new",
+    "recognizing_transactions",
+    "transactions_recognized",
+    "drafting_response",
+    "response_drafted",
+    "awaiting_human_input",
+    "completed",
+    "error_dispatch_a",
+    "error_dispatch_b",
+}
+
+# Statuses the router ends the graph on for good: no callback or answer
+# resumes the task from them.
+TERMINAL_STATUSES = {"completed", "error_dispatch_a", "error_dispatch_b"}
+
+logger = logging.getLogger(__name__)
+
+_tracer = None
+if OTEL_TRACING_ENABLED:
+    try:
+        from opentelemetry import trace
+
+        _tracer = trace.get_tracer("a2a.root-agent")
+    except ImportError:
+        logger.warning("OTEL_TRACING_ENABLED is set but opentelemetry is not installed; spans are disabled.")
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[None]:
+    """
+    OpenTelemetry span when tracing is enabled, otherwise a no-op.
+    """
+    if _tracer is None:
+        yield
+        return
+    with _tracer.start_as_current_span(name) as current:
+        for key, value in attributes.items():
+            if value is not None:
+                current.set_attribute(key, value)
+        yield
+
+
+# --- Workflow stages ---
+
+def _status_label(status: Optional[str]) -> str:
+    return status if status in KNOWN_STATUSES else "other"
+
+
+def stage_transition(state: Dict[str, Any], new_status: str) -> Dict[str, Any]:
+    """
+    Observes how long the task stayed in its current status and returns the
+    state update that starts the clock for `new_status`.
+    """
+    now = time.time()
+    old_status = state.get("status")
+    since = state.get("status_since")
+    if since and old_status != new_status:
+        STAGE_DURATION.labels(
+            from_status=_status_label(old_status),
+            to_status=_status_label(new_status),
+        ).observe(max(0.0, now - since))
+    if old_status == new_status and since:
+        return {}
+    return {"status_since": now}
+
+
+# --- Graph nodes ---
+
+def timed_node(name: str, fn: Callable[[Dict[str, Any]], Dict[str, Any]]) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Wraps a node to record its execution time and, when it changes the task
+    status, the duration of the stage it leaves.
+    """
+    @functools.wraps(fn)
+    def wrapper(state: Dict[str, Any]) -> Dict[str, Any]:
+        start = time.perf_counter()
+        try:
+            with span(f"node.{name}", task_id=state.get("task_id")):
+                update = fn(state)
+        except Exception:
+            NODE_ERRORS.labels(node=name).inc()
+            raise
+        finally:
+            NODE_DURATION.labels(node=name).observe(time.perf_counter() - start)
+
+        new_status = update.get("status")
+        if new_status:
+            update = {**update, **stage_transition(state, new_status)}
+        return update
+
+    return wrapper
+
+
+# --- Checkpointer ---
+
+class InstrumentedSerializer:
+    """
+    Wraps a checkpoint serializer to record the size of every payload.
+    """
+
+    def __init__(self, serde: Any):
+        self.serde = serde
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        type_, data = self.serde.dumps_typed(obj)
+        CHECKPOINT_PAYLOAD_BYTES.labels(direction="dumps").observe(len(data))
+        return type_, data
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        CHECKPOINT_PAYLOAD_BYTES.labels(direction="loads").observe(len(data[1]))
+        return self.serde.loads_typed(data)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.serde, name)
+
+
+@contextmanager
+def _timed(operation: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        with span(f"checkpoint.{operation}"):
+            yield
+    finally:
+        CHECKPOINT_OPERATION_DURATION.labels(operation=operation).observe(time.perf_counter() - start)
+
+
+class InstrumentedCheckpointSaver(BaseCheckpointSaver):
+    """
+    Delegating checkpointer that records the latency of every operation.
+    """
+
+    def __init__(self, saver: BaseCheckpointSaver):
+        super().__init__(serde=saver.serde)
+        self.saver = saver
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        with _timed("get_tuple"):
+            return self.saver.get_tuple(config)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        with _timed("list"):
+            items = list(self.saver.list(config, filter=filter, before=before, limit=limit))
+        return iter(items)
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        with _timed("put"):
+            return self.saver.put(config, checkpoint, metadata, new_versions)
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        with _timed("put_writes"):
+            self.saver.put_writes(config, writes, task_id, task_path)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with _timed("delete_thread"):
+            self.saver.delete_thread(thread_id)
+
+    def get_next_version(self, current: Optional[Any], channel: Any) -> Any:
+        return self.saver.get_next_version(current, channel)
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        with _timed("get_tuple"):
+            return await self.saver.aget_tuple(config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        async for item in self.saver.alist(config, filter=filter, before=before, limit=limit):
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        with _timed("put"):
+            return await self.saver.aput(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        with _timed("put_writes"):
+            await self.saver.aput_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        with _timed("delete_thread"):
+            await self.saver.adelete_thread(thread_id)
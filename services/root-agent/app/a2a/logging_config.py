@@ -0,0 +1,190 @@
+# a2a_cash_flow_demo/services/root-agent/app/a2a/logging_config.py
+
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import zlib
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+# --- Configuration ---
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LANGGRAPH_LOG_LEVEL = os.getenv("LANGGRAPH_LOG_LEVEL", "WARNING").upper()
+# json | text
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+# 只有被抽樣到的 task 會輸出 DEBUG log (0-100)
+LOG_DEBUG_SAMPLE_PERCENT = float(os.getenv("LOG_DEBUG_SAMPLE_PERCENT", "1"))
+# 單一欄位輸出的最大字元數
+LOG_MAX_FIELD_CHARS = int(os.getenv("LOG_MAX_FIELD_CHARS", "512"))
+
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s"
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "taskName"}
+
+_listener: Optional[QueueListener] = None
+
+
+# --- Helpers used at call sites ---
+
+def summarize_state(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Small, log-friendly view of an AgentState instead of the full message list.
+    """
+    messages = state.get("messages") or []
+    summary = {
+        "task_id": state.get("task_id"),
+        "loan_case_id": state.get("loan_case_id"),
+        "status": state.get("status"),
+        "messages": len(messages),
+    }
+    if messages:
+        summary["last_message_type"] = getattr(messages[-1], "type", type(messages[-1]).__name__)
+    return summary
+
+
+def is_task_sampled(task_id: str, percent: float = LOG_DEBUG_SAMPLE_PERCENT) -> bool:
+    # 以 task_id 的穩定 hash 決定，同一 task 的 DEBUG log 會完整保留
+    return zlib.crc32(task_id.encode()) % 10000 < int(percent * 100)
+
+
+def debug_enabled(logger: logging.Logger, task_id: Optional[str]) -> bool:
+    """
+    Call-site guard for per-task DEBUG logging. Checking before the call
+    skips building the LogRecord (and any `extra`) for unsampled tasks,
+    which is most of the cost of a debug line.
+    """
+    if not logger.isEnabledFor(logging.DEBUG):
+        return False
+    return task_id is None or is_task_sampled(str(task_id))
+
+
+def truncate(value: Any, limit: int = LOG_MAX_FIELD_CHARS) -> Any:
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value
+    text = value if isinstance(value, str) else repr(value)
+    if len(text) > limit:
+        return f"{text[:limit]}...<{len(text) - limit} more chars>"
+    return text
+
+
+# --- Filters / formatters ---
+
+class TaskSamplingFilter(logging.Filter):
+    """
+    Drops DEBUG records that carry a `task_id` unless that task is sampled,
+    for call sites that do not guard with `debug_enabled`. Same decision as
+    `is_task_sampled`, so a sampled task keeps its complete debug trail.
+    """
+
+    def __init__(self, percent: float = LOG_DEBUG_SAMPLE_PERCENT):
+        super().__init__()
+        self.percent = percent
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+        task_id = getattr(record, "task_id", None)
+        if task_id is None:
+            state = getattr(record, "state", None)
+            task_id = state.get("task_id") if isinstance(state, dict) else None
+        return task_id is None or is_task_sampled(str(task_id), self.percent)
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line. `extra` fields are included, truncated to
+    LOG_MAX_FIELD_CHARS so a stray large object cannot blow up a log line.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._cached_second = -1
+        self._cached_prefix = ""
+
+    def _timestamp(self, created: float) -> str:
+        # strftime 只在秒數改變時呼叫一次
+        second = int(created)
+        if second != self._cached_second:
+            self._cached_second = second
+            self._cached_prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(second))
+        return f"{self._cached_prefix}.{int((created - second) * 1000):03d}Z"
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": self._timestamp(record.created),
+            "level": record.levelname,
+            "logger": record.name,
+            "location": f"{record.filename}:{record.lineno}",
+            "message": truncate(record.getMessage(), LOG_MAX_FIELD_CHARS * 4),
+        }
+        for key, value in record.__dict__.items():
+            if key in _RECORD_ATTRS or key.startswith("_"):
+                continue
+            if isinstance(value, dict):
+                payload[key] = {k: truncate(v) for k, v in value.items()}
+            else:
+                payload[key] = truncate(value)
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread. The stock
+    `prepare` formats the message in the caller's thread, which is exactly
+    the cost we want off the request path.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+# --- Setup ---
+
+def configure_logging(stream: Any = None) -> None:
+    """
+    Installs the root handler: records are filtered and queued in the calling
+    thread, and formatted and written by a background listener thread.
+    Safe to call more than once.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT))
+
+    # SimpleQueue: C 實作、無 task_done 的鎖開銷
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    handler = _DeferredQueueHandler(log_queue)
+    handler.addFilter(TaskSamplingFilter())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(LOG_LEVEL)
+    logging.getLogger("langgraph").setLevel(LANGGRAPH_LOG_LEVEL)
+    # boto 的 DEBUG log 量極大
+    for noisy in ("botocore", "boto3", "urllib3"):
+        logging.getLogger(noisy).setLevel(max(logging.INFO, logging.getLevelName(LOG_LEVEL)))
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """
+    Flushes queued records and stops the listener thread.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
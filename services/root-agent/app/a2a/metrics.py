@@ -0,0 +1,232 @@
+# a2a_cash_flow_demo/services/root-agent/app/a2a/metrics.py
+
+"""
+Prometheus metrics for the root agent.
+
+Everything is registered on the default registry, which is what the
+Instrumentator in main.py exposes on `/metrics`.
+"""
+
+from prometheus_client import Counter, Gauge, Histogram
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 131072, 262144, 409600, 1048576)
+# 等待 remote agent callback 可達數分鐘
+STAGE_BUCKETS = (0.01, 0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 900.0, 3600.0)
+
+# --- Checkpoint cache (Redis in front of DynamoDB) ---
+CHECKPOINT_CACHE_REQUESTS = Counter(
+    "a2a_checkpoint_cache_requests_total",
+    "Latest-checkpoint lookups served by the Redis cache, by result (hit/miss/bypass).",
+    ["result"],
+)
+CHECKPOINT_CACHE_ERRORS = Counter(
+    "a2a_checkpoint_cache_errors_total",
+    "Redis errors raised by the checkpoint cache, by operation.",
+    ["operation"],
+)
+CHECKPOINT_WRITE_BEHIND_FAILURES = Counter(
+    "a2a_checkpoint_write_behind_failures_total",
+    "Write-behind checkpoint writes to DynamoDB, by outcome (retried/lost/skipped).",
+    ["outcome"],
+)
+
+# --- Graph nodes ---
+NODE_DURATION = Histogram(
+    "a2a_graph_node_duration_seconds",
+    "Execution time of LangGraph nodes.",
+    ["node"],
+    buckets=LATENCY_BUCKETS,
+)
+NODE_ERRORS = Counter(
+    "a2a_graph_node_errors_total",
+    "LangGraph node executions that raised.",
+    ["node"],
+)
+
+# --- Checkpointer ---
+CHECKPOINT_OPERATION_DURATION = Histogram(
+    "a2a_checkpoint_operation_duration_seconds",
+    "Latency of checkpointer operations (get_tuple/put/put_writes/list).",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+)
+CHECKPOINT_PAYLOAD_BYTES = Histogram(
+    "a2a_checkpoint_payload_bytes",
+    "Size of serialized checkpoint payloads, by direction (dumps/loads).",
+    ["direction"],
+    buckets=SIZE_BUCKETS,
+)
+CHECKPOINT_SERDE_RAW_BYTES = Histogram(
+    "a2a_checkpoint_serde_raw_bytes",
+    "Size of checkpoint blobs before compression by the compact serializer.",
+    buckets=SIZE_BUCKETS,
+)
+CHECKPOINT_SERDE_BLOBS = Counter(
+    "a2a_checkpoint_serde_blobs_total",
+    "Blobs written by the compact serializer, by encoding (raw/zlib/zstd/s3).",
+    ["encoding"],
+)
+
+# --- Dispatch (EventBridge) ---
+DISPATCH_DURATION = Histogram(
+    "a2a_dispatch_duration_seconds",
+    "Time from submitting a dispatch until its EventId (or error) came back.",
+    ["detail_type"],
+    buckets=LATENCY_BUCKETS,
+)
+DISPATCH_FAILURES = Counter(
+    "a2a_dispatch_failures_total",
+    "Dispatches that could not be delivered to EventBridge.",
+    ["detail_type"],
+)
+PUT_EVENTS_BATCH_SIZE = Histogram(
+    "a2a_put_events_batch_size",
+    "Number of entries per put_events call.",
+    buckets=(1, 2, 3, 5, 7, 10),
+)
+
+# --- Workflow stages ---
+STAGE_DURATION = Histogram(
+    "a2a_stage_duration_seconds",
+    "Time a task spent in a status before moving to the next one.",
+    ["from_status", "to_status"],
+    buckets=STAGE_BUCKETS,
+)
+
+# --- Callback idempotency ---
+CALLBACK_DEDUPE_REQUESTS = Counter(
+    "a2a_callback_dedupe_requests_total",
+    "Callback deliveries checked for duplicates, by result (hit_local/hit_shared/miss).",
+    ["result"],
+)
+CALLBACK_DEDUPE_ERRORS = Counter(
+    "a2a_callback_dedupe_errors_total",
+    "Errors from the shared dedupe store (the delivery is processed anyway).",
+    ["backend"],
+)
+
+# --- Task status projection ---
+TASK_PROJECTION_READS = Counter(
+    "a2a_task_projection_reads_total",
+    "Task status reads, by where they were served from (cache/store).",
+    ["source"],
+)
+
+# --- Task event streams (SSE) ---
+TASK_EVENT_SUBSCRIBERS = Gauge(
+    "a2a_task_event_subscribers",
+    "Open GET /tasks/{task_id}/events streams on this replica.",
+)
+TASK_EVENTS_PUBLISHED = Counter(
+    "a2a_task_events_published_total",
+    "Task events published, by type (status/message).",
+    ["type"],
+)
+TASK_EVENTS_DROPPED = Counter(
+    "a2a_task_events_dropped_total",
+    "Events dropped because a slow stream's queue was full.",
+)
+
+# --- Direct HTTP invoke (sync fast path) ---
+REMOTE_INVOKE_DURATION = Histogram(
+    "a2a_remote_invoke_duration_seconds",
+    "Latency of POST /a2a/invoke calls to remote agents.",
+    ["detail_type"],
+    buckets=LATENCY_BUCKETS,
+)
+REMOTE_INVOKE_RESULTS = Counter(
+    "a2a_remote_invoke_results_total",
+    "Direct invokes by outcome: inline (200), accepted (202), error, or not_sent / not_served (fell back to EventBridge).",
+    ["detail_type", "outcome"],
+)
+
+# --- Remote ticket polling ---
+REMOTE_POLL_PENDING = Gauge(
+    "a2a_remote_poll_pending_tickets",
+    "Remote tickets waiting for a result on this replica.",
+)
+REMOTE_POLL_REQUESTS = Counter(
+    "a2a_remote_poll_requests_total",
+    "GET /a2a/result polls, by outcome (running/succeeded/failed/error/not_found/timeout).",
+    ["outcome"],
+)
+
+# --- Stuck-task deadlines ---
+TASK_DEADLINES_EXPIRED = Counter(
+    "a2a_task_deadlines_expired_total",
+    "Waiting tasks whose remote-agent deadline passed, by action (retry/hitl/stale/busy/error).",
+    ["action"],
+)
+TASK_DEADLINE_ERRORS = Counter(
+    "a2a_task_deadline_errors_total",
+    "Failed deadline store operations.",
+    ["backend", "operation"],
+)
+
+# --- Per-thread locking ---
+THREAD_LOCK_WAIT = Histogram(
+    "a2a_thread_lock_wait_seconds",
+    "Time spent waiting for a task's thread lock (in-process lock plus shared lease).",
+    buckets=LATENCY_BUCKETS,
+)
+THREAD_LOCK_TIMEOUTS = Counter(
+    "a2a_thread_lock_timeouts_total",
+    "Lock waits that gave up because another handler held the task, by scope (local/shared).",
+    ["scope"],
+)
+THREAD_LOCK_ERRORS = Counter(
+    "a2a_thread_lock_errors_total",
+    "Failed shared lease operations (acquire/renew/release/fence); acquire and renew errors fail closed.",
+    ["operation"],
+)
+CHECKPOINT_FENCED_WRITES = Counter(
+    "a2a_checkpoint_fenced_writes_total",
+    "Checkpoint writes refused because the writer no longer held the task's shared thread lease.",
+)
+
+# --- Startup ---
+STARTUP_DURATION = Gauge(
+    "a2a_startup_duration_seconds",
+    "Start-up phases of this process: import of main, each warm-up step, and ready (import start to ready).",
+    ["phase"],
+)
+READY = Gauge(
+    "a2a_ready",
+    "1 once warm-up finished and the replica reports ready on /readyz.",
+)
+
+# --- Admission control (task starts) ---
+ADMISSION_DECISIONS = Counter(
+    "a2a_admission_decisions_total",
+    "Task starts by admission outcome (admitted/queue_full/queue_timeout/rate_limited).",
+    ["outcome"],
+)
+ADMISSION_WAIT = Histogram(
+    "a2a_admission_wait_seconds",
+    "Time admitted task starts spent queued for a slot and paced by the downstream budgets.",
+    buckets=LATENCY_BUCKETS,
+)
+ADMISSION_IN_FLIGHT = Gauge(
+    "a2a_admission_in_flight",
+    "Task starts currently holding an admission slot.",
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "a2a_admission_queue_depth",
+    "Task starts waiting for an admission slot.",
+)
+ADMISSION_LIMIT = Gauge(
+    "a2a_admission_limit",
+    "Configured admission limits, by limit (in_flight/queue).",
+    ["limit"],
+)
+ADMISSION_RATE = Gauge(
+    "a2a_admission_rate_per_second",
+    "Current adaptive call budget per downstream (eventbridge/dynamodb); lowered on throttling, then recovers.",
+    ["downstream"],
+)
+DOWNSTREAM_THROTTLES = Counter(
+    "a2a_downstream_throttles_total",
+    "Throttling errors observed from a downstream (eventbridge/dynamodb).",
+    ["downstream"],
+)
@@ -0,0 +1,275 @@
+# a2a_cash_flow_demo/services/root-agent/app/a2a/polling.py
+
+import os
+import time
+import heapq
+import random
+import asyncio
+import logging
+import itertools
+import threading
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+import httpx
+
+from .metrics import REMOTE_POLL_PENDING, REMOTE_POLL_REQUESTS
+
+# --- Configuration ---
+# event: 202 之後仍走 EventBridge/callback；poll: 由 root agent 輪詢 GET /a2a/result
+REMOTE_ASYNC_RESULT_MODE = os.getenv("REMOTE_ASYNC_RESULT_MODE", "event").lower()
+REMOTE_POLL_MIN_INTERVAL = float(os.getenv("REMOTE_POLL_MIN_INTERVAL", "0.5"))
+REMOTE_POLL_MAX_INTERVAL = float(os.getenv("REMOTE_POLL_MAX_INTERVAL", "60"))
+# 同一個 remote host 同時進行中的輪詢數上限
+REMOTE_POLL_HOST_CONCURRENCY = int(os.getenv("REMOTE_POLL_HOST_CONCURRENCY", "16"))
+# 超過這段時間仍沒有結果就放棄這張 ticket
+REMOTE_POLL_TIMEOUT_SECONDS = float(os.getenv("REMOTE_POLL_TIMEOUT_SECONDS", "3600"))
+
+TERMINAL_RESULT_STATUSES = {"SUCCEEDED", "FAILED"}
+
+logger = logging.getLogger(__name__)
+
+
+class PendingTicket:
+    __slots__ = ("ticket", "base_url", "task_id", "detail_type", "deadline", "next_at", "attempts")
+
+    def __init__(self, ticket: str, base_url: str, task_id: str, detail_type: str, timeout_seconds: float):
+        self.ticket = ticket
+        self.base_url = base_url.rstrip("/")
+        self.task_id = task_id
+        self.detail_type = detail_type
+        self.deadline = time.monotonic() + timeout_seconds
+        self.next_at = 0.0
+        self.attempts = 0
+
+
+ResultHandler = Callable[[PendingTicket, Dict[str, Any]], Awaitable[None]]
+
+
+class PollScheduler:
+    """
+    Polls `GET /a2a/result?ticket=...` for outstanding remote tickets.
+
+    Tickets sit in one min-heap ordered by their next poll time; a single
+    scheduler task sleeps until the earliest one is due. Due tickets are
+    queued per remote host and drained by at most `host_concurrency` workers
+    per host over the shared keep-alive client, so the cost is a heap entry
+    per ticket, not a thread or coroutine. The next poll follows the `eta`
+    the remote returns, or exponential backoff when it gives none.
+
+    Finished results (SUCCEEDED / FAILED) are handed to `on_result`; if it
+    raises, the ticket is polled again later.
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        on_result: ResultHandler,
+        min_interval: float = REMOTE_POLL_MIN_INTERVAL,
+        max_interval: float = REMOTE_POLL_MAX_INTERVAL,
+        host_concurrency: int = REMOTE_POLL_HOST_CONCURRENCY,
+        timeout_seconds: float = REMOTE_POLL_TIMEOUT_SECONDS,
+    ):
+        self.client = client
+        self.on_result = on_result
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.host_concurrency = host_concurrency
+        self.timeout_seconds = timeout_seconds
+
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tickets: Dict[str, PendingTicket] = {}
+        self._heap: List[Tuple[float, int, PendingTicket]] = []
+        self._seq = itertools.count()
+        self._host_queues: Dict[str, Deque[PendingTicket]] = {}
+        self._host_workers: Dict[str, int] = {}
+        self._workers: set = set()
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._tickets)
+
+    # --- Lifecycle ---
+
+    def start(self) -> None:
+        self.loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, *self._workers, return_exceptions=True)
+            self._task = None
+
+    # --- Registration ---
+
+    def add(self, ticket: str, base_url: str, task_id: str, detail_type: str, eta: Optional[float] = None) -> None:
+        """
+        Starts polling a ticket. Safe to call from any thread.
+        """
+        pending = PendingTicket(ticket, base_url, task_id, detail_type, self.timeout_seconds)
+        delay = self._clamp(eta) if eta is not None else self.min_interval
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            self._register(pending, delay)
+        else:
+            self.loop.call_soon_threadsafe(self._register, pending, delay)
+
+    def _register(self, pending: PendingTicket, delay: float) -> None:
+        self._tickets[pending.ticket] = pending
+        REMOTE_POLL_PENDING.set(len(self._tickets))
+        self._schedule(pending, delay)
+
+    def _forget(self, pending: PendingTicket) -> None:
+        self._tickets.pop(pending.ticket, None)
+        REMOTE_POLL_PENDING.set(len(self._tickets))
+
+    def _schedule(self, pending: PendingTicket, delay: float) -> None:
+        pending.next_at = time.monotonic() + delay
+        earliest = self._heap[0][0] if self._heap else None
+        heapq.heappush(self._heap, (pending.next_at, next(self._seq), pending))
+        if earliest is None or pending.next_at < earliest:
+            self._wake.set()
+
+    def _clamp(self, seconds: float) -> float:
+        return min(max(float(seconds), self.min_interval), self.max_interval)
+
+    def _backoff(self, pending: PendingTicket) -> float:
+        delay = min(self.min_interval * (2 ** pending.attempts), self.max_interval)
+        # 加一點 jitter，避免大量 ticket 同時到期
+        return delay * random.uniform(0.9, 1.1)
+
+    # --- Scheduling loop ---
+
+    async def _run(self) -> None:
+        while True:
+            now = time.monotonic()
+            while self._heap and self._heap[0][0] <= now:
+                next_at, _, pending = heapq.heappop(self._heap)
+                # 已重新排程或已移除的舊 entry
+                if pending.next_at != next_at or self._tickets.get(pending.ticket) is not pending:
+                    continue
+                self._enqueue(pending)
+
+            timeout = self._heap[0][0] - now if self._heap else None
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _enqueue(self, pending: PendingTicket) -> None:
+        queue = self._host_queues.setdefault(pending.base_url, deque())
+        queue.append(pending)
+        while self._host_workers.get(pending.base_url, 0) < min(self.host_concurrency, len(queue)):
+            self._host_workers[pending.base_url] = self._host_workers.get(pending.base_url, 0) + 1
+            worker = asyncio.create_task(self._host_worker(pending.base_url))
+            self._workers.add(worker)
+            worker.add_done_callback(self._workers.discard)
+
+    async def _host_worker(self, base_url: str) -> None:
+        queue = self._host_queues[base_url]
+        try:
+            while queue:
+                await self._poll(queue.popleft())
+        finally:
+            self._host_workers[base_url] -= 1
+
+    # --- Polling ---
+
+    async def _poll(self, pending: PendingTicket) -> None:
+        if time.monotonic() > pending.deadline:
+            REMOTE_POLL_REQUESTS.labels(outcome="timeout").inc()
+            logger.error("Giving up on ticket %s for task %s after %.0fs without a result.",
+                         pending.ticket, pending.task_id, self.timeout_seconds)
+            self._forget(pending)
+            return
+
+        pending.attempts += 1
+        try:
+            response = await self.client.get(f"{pending.base_url}/a2a/result", params={"ticket": pending.ticket})
+        except httpx.HTTPError as e:
+            REMOTE_POLL_REQUESTS.labels(outcome="error").inc()
+            logger.warning("Polling ticket %s failed: %s", pending.ticket, e)
+            self._schedule(pending, self._backoff(pending))
+            return
+
+        if response.status_code == 404:
+            REMOTE_POLL_REQUESTS.labels(outcome="not_found").inc()
+            logger.error("Remote agent does not know ticket %s (task %s); dropping it.", pending.ticket, pending.task_id)
+            self._forget(pending)
+            return
+        if response.status_code != 200:
+            REMOTE_POLL_REQUESTS.labels(outcome="error").inc()
+            retry_after = response.headers.get("retry-after")
+            delay = self._clamp(retry_after) if retry_after and retry_after.isdigit() else self._backoff(pending)
+            self._schedule(pending, delay)
+            return
+
+        try:
+            body = response.json()
+            if not isinstance(body, dict):
+                raise ValueError(f"expected a JSON object, got {type(body).__name__}")
+        except ValueError as e:
+            # 例如 proxy 回傳的 HTML 錯誤頁；與其他錯誤一樣稍後重試
+            REMOTE_POLL_REQUESTS.labels(outcome="error").inc()
+            logger.warning("Polling ticket %s returned an unreadable body: %s", pending.ticket, e)
+            self._schedule(pending, self._backoff(pending))
+            return
+
+        status = body.get("status")
+        if status not in TERMINAL_RESULT_STATUSES:
+            REMOTE_POLL_REQUESTS.labels(outcome="running").inc()
+            eta = body.get("eta")
+            try:
+                delay = self._clamp(eta) if eta is not None else self._backoff(pending)
+            except (TypeError, ValueError):
+                delay = self._backoff(pending)
+            self._schedule(pending, delay)
+            return
+
+        REMOTE_POLL_REQUESTS.labels(outcome=status.lower()).inc()
+        try:
+            await self.on_result(pending, body)
+        except Exception as e:
+            logger.error("Handling result of ticket %s for task %s failed, polling again: %s",
+                         pending.ticket, pending.task_id, e)
+            self._schedule(pending, self._backoff(pending))
+            return
+        self._forget(pending)
+
+
+_scheduler: Optional[PollScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+async def start_poll_scheduler(client: httpx.AsyncClient, on_result: ResultHandler) -> Optional[PollScheduler]:
+    """
+    Starts the shared scheduler on the running loop when
+    REMOTE_ASYNC_RESULT_MODE is "poll".
+    """
+    global _scheduler
+    if REMOTE_ASYNC_RESULT_MODE != "poll":
+        return None
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = PollScheduler(client, on_result)
+            _scheduler.start()
+    return _scheduler
+
+
+def get_poll_scheduler() -> Optional[PollScheduler]:
+    return _scheduler
+
+
+async def stop_poll_scheduler() -> None:
+    global _scheduler
+    with _scheduler_lock:
+        scheduler, _scheduler = _scheduler, None
+    if scheduler is not None:
+        await scheduler.stop()
@@ -0,0 +1,235 @@
+# a2a_cash_flow_demo/services/root-agent/app/a2a/projection.py
+
+import os
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Any, Dict, Hashable, List, Optional, Sequence
+
+
+from .executor import run_blocking
+from .metrics import TASK_PROJECTION_READS
+
+# --- Configuration ---
+AWS_REGION = os.getenv("AWS_REGION", "ap-southeast-1")
+# 預設與 checkpoint 共用 tasks table；PK 以 "task#" / "loan_case#" 開頭，不會與 thread_id 衝突
+DDB_TASK_PROJECTION_TABLE_NAME = os.getenv(
+    "DDB_A2A_TASK_PROJECTION_TABLE_NAME",
+    os.getenv("DDB_A2A_TASKS_TABLE_NAME", "ds_demo_a2a_tasks"),
+)
+# 多個 replica 時，其他 replica 寫入的狀態最多延遲這麼久才會被讀到
+TASK_PROJECTION_CACHE_TTL_SECONDS = float(os.getenv("TASK_PROJECTION_CACHE_TTL_SECONDS", "2"))
+TASK_PROJECTION_CACHE_MAX_ENTRIES = int(os.getenv("TASK_PROJECTION_CACHE_MAX_ENTRIES", "10000"))
+
+TASK_PK_PREFIX = "task#"
+LOAN_CASE_PK_PREFIX = "loan_case#"
+PROJECTION_SK = "projection"
+
+# Fields of AgentState copied into the projection
+PROJECTED_FIELDS = ("task_id", "loan_case_id", "status", "status_since", "created_at", "needs_info")
+
+logger = logging.getLogger(__name__)
+
+
+def projection_from_state(values: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Small status record of a task, built from its graph state.
+    """
+    now = time.time()
+    record = {field: values.get(field) for field in PROJECTED_FIELDS}
+    record["needs_info"] = list(record["needs_info"] or [])
+    record["updated_at"] = now
+    # 微秒，作為 ETag 的版本號
+    record["version"] = time.time_ns() // 1000
+    return record
+
+
+def etag_for(records: Sequence[Dict[str, Any]]) -> str:
+    """
+    Strong ETag over the versions of one or more projection records.
+    """
+    digest = hashlib.sha1()
+    for record in records:
+        digest.update(f"{record['task_id']}:{record['version']};".encode())
+    return f'"{digest.hexdigest()[:20]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def _to_item(record: Dict[str, Any]) -> Dict[str, Any]:
+    # boto3 不接受 float
+    return {k: Decimal(str(v)) if isinstance(v, float) else v for k, v in record.items() if v is not None}
+
+
+def _from_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    record = {k: v for k, v in item.items() if k not in ("PK", "SK")}
+    for key, value in record.items():
+        if isinstance(value, Decimal):
+            record[key] = int(value) if value == value.to_integral_value() else float(value)
+    return record
+
+
+class TTLCache:
+    """
+    Bounded, thread-safe LRU mapping whose entries expire after `ttl_seconds`.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class TaskProjectionStore:
+    """
+    Read model for task status, so polling clients never load a checkpoint.
+
+    Every transition writes two small items in one BatchWriteItem:
+    `task#{task_id}` / `projection` for lookups by task, and
+    `loan_case#{loan_case_id}` / `task#{task_id}` for listing a loan case's
+    tasks with a single Query. Reads are served from an in-process TTL cache
+    that this replica's own writes keep current.
+    """
+
+    def __init__(
+        self,
+        table: Any,
+        cache_ttl_seconds: float = TASK_PROJECTION_CACHE_TTL_SECONDS,
+        cache_max_entries: int = TASK_PROJECTION_CACHE_MAX_ENTRIES,
+    ):
+        self.table = table
+        self.cache = TTLCache(cache_max_entries, cache_ttl_seconds)
+
+    # --- Writes ---
+
+    def put(self, record: Dict[str, Any]) -> None:
+        task_id = record["task_id"]
+        item = _to_item(record)
+        with self.table.batch_writer() as batch:
+            batch.put_item(Item={"PK": f"{TASK_PK_PREFIX}{task_id}", "SK": PROJECTION_SK, **item})
+            if record.get("loan_case_id"):
+                batch.put_item(Item={
+                    "PK": f"{LOAN_CASE_PK_PREFIX}{record['loan_case_id']}",
+                    "SK": f"{TASK_PK_PREFIX}{task_id}",
+                    **item,
+                })
+        self.cache.put(("task", task_id), record)
+        self.cache.invalidate(("loan_case", record.get("loan_case_id")))
+
+    # --- Reads ---
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        record = self.cache.get(("task", task_id))
+        if record is not None:
+            TASK_PROJECTION_READS.labels(source="cache").inc()
+            return record
+
+        TASK_PROJECTION_READS.labels(source="store").inc()
+        response = self.table.get_item(Key={"PK": f"{TASK_PK_PREFIX}{task_id}", "SK": PROJECTION_SK})
+        item = response.get("Item")
+        if item is None:
+            return None
+        record = _from_item(item)
+        self.cache.put(("task", task_id), record)
+        return record
+
+    def list_for_loan_case(self, loan_case_id: str) -> List[Dict[str, Any]]:
+        records = self.cache.get(("loan_case", loan_case_id))
+        if records is not None:
+            TASK_PROJECTION_READS.labels(source="cache").inc()
+            return records
+
+        from boto3.dynamodb.conditions import Key
+
+        TASK_PROJECTION_READS.labels(source="store").inc()
+        records = []
+        query_kwargs: Dict[str, Any] = {
+            "KeyConditionExpression": Key("PK").eq(f"{LOAN_CASE_PK_PREFIX}{loan_case_id}")
+            & Key("SK").begins_with(TASK_PK_PREFIX),
+        }
+        while True:
+            response = self.table.query(**query_kwargs)
+            records.extend(_from_item(item) for item in response.get("Items", []))
+            if "LastEvaluatedKey" not in response:
+                break
+            query_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+        records.sort(key=lambda r: r.get("created_at") or 0)
+        self.cache.put(("loan_case", loan_case_id), records)
+        return records
+
+    async def aget(self, task_id: str) -> Optional[Dict[str, Any]]:
+        # 命中快取時不經過 executor
+        record = self.cache.get(("task", task_id))
+        if record is not None:
+            TASK_PROJECTION_READS.labels(source="cache").inc()
+            return record
+        return await run_blocking(self.get, task_id)
+
+    async def alist_for_loan_case(self, loan_case_id: str) -> List[Dict[str, Any]]:
+        records = self.cache.get(("loan_case", loan_case_id))
+        if records is not None:
+            TASK_PROJECTION_READS.labels(source="cache").inc()
+            return records
+        return await run_blocking(self.list_for_loan_case, loan_case_id)
+
+
+_store: Optional[TaskProjectionStore] = None
+_store_lock = threading.Lock()
+
+
+def get_projection_store() -> TaskProjectionStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                import boto3
+
+                table = boto3.resource("dynamodb", region_name=AWS_REGION).Table(DDB_TASK_PROJECTION_TABLE_NAME)
+                _store = TaskProjectionStore(table)
+    return _store
+
+
+def record_task_status(values: Optional[Dict[str, Any]]) -> None:
+    """
+    Writes the projection for a task's committed state. Failures are logged,
+    not raised: the checkpoint stays the source of truth.
+    """
+    if not values or not values.get("task_id"):
+        return
+    try:
+        get_projection_store().put(projection_from_state(values))
+    except Exception as e:
+        logger.warning("Failed to update status projection for task %s: %s", values.get("task_id"), e)
@@ -0,0 +1,131 @@
+# a2a_cash_flow_demo/services/root-agent/app/a2a/ratelimit.py
+
+import time
+import asyncio
+import threading
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Asyncio token bucket: `rate` tokens per second, bursting up to `capacity`.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        self._refill()
+        if self._tokens >= tokens:
+            self._tokens -= tokens
+            return True
+        return False
+
+    def wait_time(self, tokens: float = 1.0) -> float:
+        """Seconds until `tokens` would be available."""
+        self._refill()
+        return max(0.0, (tokens - self._tokens) / self.rate)
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        # 以 lock 排隊，先到先得
+        async with self._lock:
+            while not self.try_acquire(tokens):
+                await asyncio.sleep(self.wait_time(tokens))
+
+
+class AdaptiveTokenBucket:
+    """
+    Thread-safe token bucket whose rate adapts to the downstream it guards
+    (AIMD): `throttled()` multiplies the rate by `decrease_factor`, at most
+    once per `cooldown_seconds` so one burst of errors counts once, and the
+    rate then climbs back towards `max_rate` by `recovery_per_second` of it
+    per second. The burst size follows the current rate.
+
+    `reserve` takes tokens ahead of time: the caller gets the delay after
+    which its tokens are available, so concurrent callers are paced without
+    queueing on a lock.
+    """
+
+    def __init__(
+        self,
+        max_rate: float,
+        min_rate: Optional[float] = None,
+        burst_seconds: float = 1.0,
+        decrease_factor: float = 0.7,
+        cooldown_seconds: float = 1.0,
+        recovery_per_second: float = 0.05,
+    ):
+        if max_rate <= 0:
+            raise ValueError("max_rate must be positive")
+        self.max_rate = max_rate
+        self.min_rate = min_rate if min_rate is not None else max_rate * 0.05
+        self.burst_seconds = burst_seconds
+        self.decrease_factor = decrease_factor
+        self.cooldown_seconds = cooldown_seconds
+        self.recovery_per_second = recovery_per_second
+        self._rate = max_rate
+        self._tokens = max_rate * burst_seconds
+        self._updated = time.monotonic()
+        self._last_decrease = float("-inf")
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        if self._rate < self.max_rate:
+            self._rate = min(self.max_rate, self._rate + self.max_rate * self.recovery_per_second * elapsed)
+        self._tokens = min(self._rate * self.burst_seconds, self._tokens + elapsed * self._rate)
+
+    @property
+    def rate(self) -> float:
+        with self._lock:
+            self._refill()
+            return self._rate
+
+    def wait_time(self, tokens: float = 1.0) -> float:
+        """Seconds until `tokens` would be available."""
+        with self._lock:
+            self._refill()
+            return max(0.0, (tokens - self._tokens) / self._rate)
+
+    def reserve(self, tokens: float = 1.0, max_wait: Optional[float] = None) -> Optional[float]:
+        """
+        Takes `tokens` and returns how many seconds to wait before using
+        them, or None - taking nothing - when that would exceed `max_wait`.
+        """
+        with self._lock:
+            self._refill()
+            wait = max(0.0, (tokens - self._tokens) / self._rate)
+            if max_wait is not None and wait > max_wait:
+                return None
+            self._tokens -= tokens
+            return wait
+
+    def refund(self, tokens: float = 1.0) -> None:
+        with self._lock:
+            self._tokens = min(self._rate * self.burst_seconds, self._tokens + tokens)
+
+    def throttled(self) -> bool:
+        """
+        Reports a throttling error. Returns True if the rate was lowered.
+        """
+        with self._lock:
+            self._refill()
+            if self._updated - self._last_decrease < self.cooldown_seconds:
+                return False
+            self._last_decrease = self._updated
+            self._rate = max(self.min_rate, self._rate * self.decrease_factor)
+            self._tokens = min(self._tokens, self._rate * self.burst_seconds)
+            return True
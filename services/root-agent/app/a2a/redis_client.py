@@ -0,0 +1,56 @@
+# a2a_cash_flow_demo/services/root-agent/app/a2a/redis_client.py
+
+import os
+import logging
+import threading
+from typing import Any, Optional
+
+# --- Configuration ---
+# 短期記憶 Redis (checkpoint cache、callback 去重)
+REDIS_HOST = os.environ.get("REDIS_HOST")
+REDIS_PORT = os.environ.get("REDIS_PORT", "6379")
+# ElastiCache Serverless 只接受 TLS 連線
+REDIS_SSL = os.environ.get("REDIS_SSL", "false").lower() == "true"
+REDIS_SOCKET_TIMEOUT = float(os.environ.get("REDIS_SOCKET_TIMEOUT", "0.2"))
+
+logger = logging.getLogger(__name__)
+
+_client: Optional[Any] = None
+_client_lock = threading.Lock()
+
+
+def get_redis_client() -> Optional[Any]:
+    """
+    Returns the shared Redis client, or None when REDIS_HOST is not set.
+    A failed ping is only logged: callers fall back to their durable store
+    until Redis is reachable.
+    """
+    global _client
+    if _client is None and REDIS_HOST:
+        with _client_lock:
+            if _client is None:
+                import redis
+
+                client = redis.Redis(
+                    host=REDIS_HOST,
+                    port=int(REDIS_PORT),
+                    ssl=REDIS_SSL,
+                    socket_timeout=REDIS_SOCKET_TIMEOUT,
+                    socket_connect_timeout=REDIS_SOCKET_TIMEOUT,
+                )
+                try:
+                    client.ping()
+                    logger.info(f"✅ Redis connected successfully at {REDIS_HOST}:{REDIS_PORT}")
+                except Exception as e:
+                    logger.warning(f"⚠️ Redis connection failed: {e}")
+                    logger.warning("Redis-backed caches will fall back to their durable stores until Redis is reachable.")
+                _client = client
+    return _client
+
+
+def close_redis_client() -> None:
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
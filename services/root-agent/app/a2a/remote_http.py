@@ -0,0 +1,131 @@
+# a2a_cash_flow_demo/services/root-agent/app/a2a/remote_http.py
+
+import os
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+# --- Configuration ---
+REMOTE1_URL = os.getenv("REMOTE1_URL", "http://remote-agent-1-service")
+REMOTE2_URL = os.getenv("REMOTE2_URL", "http://remote-agent-2-service")
+# event: 一律走 EventBridge；http: 先直接呼叫 POST /a2a/invoke，只有請求確定沒送出時才退回 EventBridge
+REMOTE_DISPATCH_MODE = os.getenv("REMOTE_DISPATCH_MODE", "event").lower()
+REMOTE_HTTP_CONNECT_TIMEOUT = float(os.getenv("REMOTE_HTTP_CONNECT_TIMEOUT", "0.5"))
+# 等待 inline 結果的上限，超過就退回非同步流程
+REMOTE_HTTP_TIMEOUT = float(os.getenv("REMOTE_HTTP_TIMEOUT", "3"))
+REMOTE_HTTP_MAX_CONNECTIONS = int(os.getenv("REMOTE_HTTP_MAX_CONNECTIONS", "100"))
+REMOTE_HTTP_MAX_KEEPALIVE = int(os.getenv("REMOTE_HTTP_MAX_KEEPALIVE", "20"))
+REMOTE_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("REMOTE_HTTP_KEEPALIVE_EXPIRY", "30"))
+REMOTE_AGENT_AUTH_TOKEN = os.getenv("REMOTE_AGENT_AUTH_TOKEN")
+
+# EventBridge detail-type -> remote agent base URL
+REMOTE_AGENT_URLS = {
+    "Task.RecognizeTransactions": REMOTE1_URL,
+    "Task.DraftResponse": REMOTE2_URL,
+}
+
+# detail-type -> (callback source, status on SUCCEEDED, status on FAILED)
+REMOTE_AGENT_RESULTS = {
+    "Task.RecognizeTransactions": ("remote-agent-a", "transactions_recognized", "error_dispatch_a"),
+    "Task.DraftResponse": ("remote-agent-b", "response_drafted", "error_dispatch_b"),
+}
+
+# Transport errors raised before the request reached the remote agent: only
+# these are safe to retry over EventBridge without running the task twice.
+NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+# Answers meaning the remote agent has no A2A HTTP API (nothing was run)
+NOT_SERVED_STATUS_CODES = {404, 405}
+
+logger = logging.getLogger(__name__)
+
+
+def build_http_client(transport: Any = None) -> httpx.AsyncClient:
+    """
+    Keep-alive connection pool shared by every call to the remote agents.
+    """
+    headers = {"Authorization": f"Bearer {REMOTE_AGENT_AUTH_TOKEN}"} if REMOTE_AGENT_AUTH_TOKEN else None
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(REMOTE_HTTP_TIMEOUT, connect=REMOTE_HTTP_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=REMOTE_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=REMOTE_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=REMOTE_HTTP_KEEPALIVE_EXPIRY,
+        ),
+        headers=headers,
+        transport=transport,
+    )
+
+
+class RemoteInvoker:
+    """
+    Calls `POST /a2a/invoke` on the remote agents over one pooled async
+    client owned by the application's event loop.
+
+    Graph nodes run on executor threads, so `invoke` submits the request to
+    that loop and waits for it; the loop thread itself must use `ainvoke`.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, client: httpx.AsyncClient):
+        self.loop = loop
+        self.client = client
+
+    async def ainvoke(self, base_url: str, envelope: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        response = await self.client.post(
+            f"{base_url.rstrip('/')}/a2a/invoke",
+            json=envelope,
+            headers={"Idempotency-Key": envelope["idempotency_key"]},
+        )
+        try:
+            body = response.json() if response.content else {}
+        except ValueError:
+            body = {}
+        if not isinstance(body, dict):
+            body = {}
+        return response.status_code, body
+
+    def invoke(self, base_url: str, envelope: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            raise RuntimeError("RemoteInvoker.invoke would block its own event loop; use ainvoke.")
+        future = asyncio.run_coroutine_threadsafe(self.ainvoke(base_url, envelope), self.loop)
+        # 連線與讀取逾時由 httpx 控制，這裡只多留一點餘裕
+        return future.result(timeout=REMOTE_HTTP_TIMEOUT + REMOTE_HTTP_CONNECT_TIMEOUT + 1)
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+_invoker: Optional[RemoteInvoker] = None
+_invoker_lock = threading.Lock()
+
+
+async def start_remote_invoker(transport: Any = None) -> Optional[RemoteInvoker]:
+    """
+    Creates the shared invoker on the running loop. Called from the app
+    lifespan; a no-op unless REMOTE_DISPATCH_MODE is "http".
+    """
+    global _invoker
+    if REMOTE_DISPATCH_MODE != "http" and transport is None:
+        return None
+    with _invoker_lock:
+        if _invoker is None:
+            _invoker = RemoteInvoker(asyncio.get_running_loop(), build_http_client(transport))
+    return _invoker
+
+
+def get_remote_invoker() -> Optional[RemoteInvoker]:
+    return _invoker
+
+
+async def close_remote_invoker() -> None:
+    global _invoker
+    with _invoker_lock:
+        invoker, _invoker = _invoker, None
+    if invoker is not None:
+        await invoker.aclose()
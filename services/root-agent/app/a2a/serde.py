@@ -0,0 +1,276 @@
+# a2a_cash_flow_demo/services/root-agent/app/a2a/serde.py
+
+import os
+import zlib
+import hashlib
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Iterable, Iterator, Optional, Set, Tuple
+
+from .metrics import CHECKPOINT_SERDE_BLOBS, CHECKPOINT_SERDE_RAW_BYTES
+
+# --- Configuration ---
+# compact: msgpack + 壓縮 + S3 外溢；default: LangGraph 原本的 JsonPlusSerializer
+CHECKPOINT_SERDE = os.getenv("CHECKPOINT_SERDE", "compact").lower()
+# zstd / zlib / none；未安裝 zstandard 時退回 zlib
+CHECKPOINT_COMPRESSION = os.getenv("CHECKPOINT_COMPRESSION", "zstd").lower()
+CHECKPOINT_COMPRESSION_LEVEL = int(os.getenv("CHECKPOINT_COMPRESSION_LEVEL", "3"))
+# 小於此大小不壓縮 (壓縮 header 反而變大，且省不到 1 KB 的計費單位)
+CHECKPOINT_COMPRESS_MIN_BYTES = int(os.getenv("CHECKPOINT_COMPRESS_MIN_BYTES", "1024"))
+# 壓縮後仍超過此大小的 blob 存到 S3，item 只留 reference (DynamoDB item 上限 400 KB)
+CHECKPOINT_SPILL_BUCKET = os.getenv("CHECKPOINT_SPILL_BUCKET")
+CHECKPOINT_SPILL_PREFIX = os.getenv("CHECKPOINT_SPILL_PREFIX", "checkpoints/")
+CHECKPOINT_SPILL_MIN_BYTES = int(os.getenv("CHECKPOINT_SPILL_MIN_BYTES", str(300 * 1024)))
+AWS_REGION = os.getenv("AWS_REGION", "ap-southeast-1")
+
+# Type tag stored in the item's `type` attribute for every blob this
+# serializer writes. DynamoDBSaver decodes a checkpoint's metadata with the
+# checkpoint's tag, so the tag must not depend on the blob: the encoding is
+# recorded in a header inside each blob instead.
+COMPACT_TYPE = "a2a"
+
+# Blob header: MAGIC, encoding, len(inner type), inner type, body.
+MAGIC = b"\xa2"
+RAW, ZLIB, ZSTD, S3 = 0, 1, 2, 3
+ENCODING_NAMES = {RAW: "raw", ZLIB: "zlib", ZSTD: "zstd", S3: "s3"}
+
+# S3 DeleteObjects 一次最多 1000 個 key
+MAX_DELETE_OBJECTS = 1000
+
+# Thread whose checkpoint is being written (see spill_scope); blobs only
+# spill inside a scope, under that thread's prefix.
+_spill_thread: "contextvars.ContextVar[Optional[str]]" = contextvars.ContextVar("checkpoint_spill_thread", default=None)
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+@contextmanager
+def spill_scope(thread_id: str) -> Iterator[None]:
+    """
+    Blobs serialized in the body spill under `thread_id`'s prefix.
+    """
+    token = _spill_thread.set(thread_id)
+    try:
+        yield
+    finally:
+        _spill_thread.reset(token)
+
+
+class S3BlobStore:
+    """
+    Blobs in S3 keyed by thread and content: "{prefix}{thread_id}/{sha256}",
+    so retried or repeated writes of the same blob are idempotent, and a
+    blob is only ever shared by checkpoints of the same thread. They are
+    deleted by reference when the thread's checkpoints are pruned or deleted.
+    """
+
+    def __init__(self, client: Any, bucket: str, prefix: str = CHECKPOINT_SPILL_PREFIX):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def put(self, data: bytes, thread_id: str) -> str:
+        key = f"{self.prefix}{thread_id}/{hashlib.sha256(data).hexdigest()}"
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=data)
+        return f"s3://{self.bucket}/{key}"
+
+    def get(self, ref: str) -> bytes:
+        bucket, _, key = ref[len("s3://"):].partition("/")
+        return self.client.get_object(Bucket=bucket, Key=key)["Body"].read()
+
+    def thread_refs(self, thread_id: str) -> Set[str]:
+        """
+        References of every blob stored for `thread_id`.
+        """
+        refs: Set[str] = set()
+        kwargs = {"Bucket": self.bucket, "Prefix": f"{self.prefix}{thread_id}/"}
+        while True:
+            response = self.client.list_objects_v2(**kwargs)
+            refs.update(f"s3://{self.bucket}/{obj['Key']}" for obj in response.get("Contents", []))
+            if not response.get("IsTruncated"):
+                return refs
+            kwargs["ContinuationToken"] = response["NextContinuationToken"]
+
+    def delete(self, refs: Iterable[str]) -> int:
+        """
+        Deletes the referenced blobs; returns how many were deleted.
+        """
+        keys = sorted(ref[len(f"s3://{self.bucket}/"):] for ref in refs if ref.startswith(f"s3://{self.bucket}/"))
+        for start in range(0, len(keys), MAX_DELETE_OBJECTS):
+            chunk = keys[start:start + MAX_DELETE_OBJECTS]
+            response = self.client.delete_objects(
+                Bucket=self.bucket,
+                Delete={"Objects": [{"Key": key} for key in chunk], "Quiet": True},
+            )
+            errors = response.get("Errors") or []
+            if errors:
+                raise RuntimeError(f"Failed to delete {len(errors)} spilled checkpoint blobs, e.g. {errors[0]}")
+        return len(keys)
+
+    def delete_thread(self, thread_id: str, keep: Iterable[str] = ()) -> int:
+        """
+        Deletes `thread_id`'s blobs except the references in `keep` (still
+        used by checkpoints that stay); returns how many were deleted.
+        """
+        return self.delete(self.thread_refs(thread_id) - set(keep))
+
+
+class CompactSerializer:
+    """
+    Checkpoint serializer for DynamoDB items.
+
+    The inner serializer (JsonPlusSerializer) already encodes LangChain
+    messages and the rest of AgentState as msgpack; on top of that, blobs of
+    at least `compress_min_bytes` are compressed with zstd (or zlib) when it
+    makes them smaller, and blobs still at least `spill_min_bytes` are stored
+    in S3 with only a reference kept in the item. Spilling needs the thread
+    (see spill_scope); outside a scope, e.g. for the Redis cache entries,
+    blobs stay inline.
+
+    Blobs written by the default serializer (any other type tag) are still
+    read, so existing checkpoints stay loadable after switching.
+    """
+
+    def __init__(
+        self,
+        inner: Any,
+        compression: str = CHECKPOINT_COMPRESSION,
+        level: int = CHECKPOINT_COMPRESSION_LEVEL,
+        compress_min_bytes: int = CHECKPOINT_COMPRESS_MIN_BYTES,
+        spill_store: Optional[S3BlobStore] = None,
+        spill_min_bytes: int = CHECKPOINT_SPILL_MIN_BYTES,
+    ):
+        if compression == "zstd" and zstandard is None:
+            logger.warning("CHECKPOINT_COMPRESSION=zstd but zstandard is not installed; using zlib.")
+            compression = "zlib"
+        if compression not in ("zstd", "zlib", "none"):
+            raise ValueError(f"Unknown CHECKPOINT_COMPRESSION: {compression}")
+        self.inner = inner
+        self.compression = compression
+        self.level = level
+        self.compress_min_bytes = compress_min_bytes
+        self.spill_store = spill_store
+        self.spill_min_bytes = spill_min_bytes
+        # zstandard (de)compressors must not be shared between threads
+        self._local = threading.local()
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        inner_type, body = self.inner.dumps_typed(obj)
+        CHECKPOINT_SERDE_RAW_BYTES.observe(len(body))
+        encoding = RAW
+        if self.compression != "none" and len(body) >= self.compress_min_bytes:
+            compressed = self._compress(body)
+            if len(compressed) < len(body):
+                encoding = ZSTD if self.compression == "zstd" else ZLIB
+                body = compressed
+        blob = _pack(encoding, inner_type, body)
+        thread_id = _spill_thread.get()
+        if self.spill_store is not None and thread_id is not None and len(blob) >= self.spill_min_bytes:
+            ref = self.spill_store.put(blob, thread_id)
+            blob = _pack(S3, inner_type, ref.encode())
+            encoding = S3
+        CHECKPOINT_SERDE_BLOBS.labels(encoding=ENCODING_NAMES[encoding]).inc()
+        return COMPACT_TYPE, blob
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        type_, blob = data
+        if type_ != COMPACT_TYPE:
+            return self.inner.loads_typed(data)
+        encoding, inner_type, body = _unpack(blob)
+        if encoding == S3:
+            if self.spill_store is None:
+                raise ValueError("Checkpoint blob was spilled to S3 but CHECKPOINT_SPILL_BUCKET is not set.")
+            encoding, inner_type, body = _unpack(self.spill_store.get(body.decode()))
+        if encoding == ZSTD:
+            body = self._zstd_decompressor().decompress(body)
+        elif encoding == ZLIB:
+            body = zlib.decompress(body)
+        elif encoding != RAW:
+            raise ValueError(f"Unexpected checkpoint blob encoding {encoding}")
+        return self.inner.loads_typed((inner_type, body))
+
+    def _compress(self, body: bytes) -> bytes:
+        if self.compression == "zlib":
+            return zlib.compress(body, self.level)
+        compressor = getattr(self._local, "compressor", None)
+        if compressor is None:
+            compressor = self._local.compressor = zstandard.ZstdCompressor(level=self.level)
+        return compressor.compress(body)
+
+    def _zstd_decompressor(self) -> Any:
+        if zstandard is None:
+            raise ValueError("Checkpoint blob is zstd-compressed but zstandard is not installed.")
+        decompressor = getattr(self._local, "decompressor", None)
+        if decompressor is None:
+            decompressor = self._local.decompressor = zstandard.ZstdDecompressor()
+        return decompressor
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.inner, name)
+
+
+def _pack(encoding: int, inner_type: str, body: bytes) -> bytes:
+    tag = inner_type.encode()
+    return MAGIC + bytes((encoding, len(tag))) + tag + body
+
+
+def _unpack(blob: bytes) -> Tuple[int, str, bytes]:
+    if blob[:1] != MAGIC:
+        raise ValueError("Not a compact checkpoint blob.")
+    encoding, tag_length = blob[1], blob[2]
+    return encoding, blob[3:3 + tag_length].decode(), blob[3 + tag_length:]
+
+
+def spilled_ref(type_: str, blob: Any) -> Optional[str]:
+    """
+    The S3 reference a stored blob points to, or None when it is inline.
+    """
+    if type_ != COMPACT_TYPE:
+        return None
+    blob = bytes(getattr(blob, "value", blob))
+    if blob[:1] != MAGIC or blob[1] != S3:
+        return None
+    return _unpack(blob)[2].decode()
+
+
+def _create_s3_client() -> Any:
+    import boto3
+
+    return boto3.client("s3", region_name=AWS_REGION)
+
+
+_spill_store: Optional[S3BlobStore] = None
+_spill_store_lock = threading.Lock()
+
+
+def get_spill_store() -> Optional[S3BlobStore]:
+    """
+    The blob store on CHECKPOINT_SPILL_BUCKET, or None when spilling is off.
+    """
+    global _spill_store
+    if _spill_store is None and CHECKPOINT_SPILL_BUCKET and CHECKPOINT_SERDE != "default":
+        with _spill_store_lock:
+            if _spill_store is None:
+                _spill_store = S3BlobStore(_create_s3_client(), CHECKPOINT_SPILL_BUCKET)
+    return _spill_store
+
+
+def build_serializer(inner: Any, s3_client: Any = None) -> Any:
+    """
+    Serializer for the checkpointer according to CHECKPOINT_SERDE: the
+    compact one around `inner` (spilling to CHECKPOINT_SPILL_BUCKET when
+    set), or `inner` itself.
+    """
+    if CHECKPOINT_SERDE == "default":
+        return inner
+    spill_store = get_spill_store()
+    if s3_client is not None and CHECKPOINT_SPILL_BUCKET:
+        spill_store = S3BlobStore(s3_client, CHECKPOINT_SPILL_BUCKET)
+    return CompactSerializer(inner, spill_store=spill_store)
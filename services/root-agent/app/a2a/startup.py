@@ -0,0 +1,99 @@
+# a2a_cash_flow_demo/services/root-agent/app/a2a/startup.py
+
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Tuple
+
+from .executor import run_blocking
+from .metrics import READY, STARTUP_DURATION
+
+# --- Configuration ---
+# warm-up 某一步失敗 (例如 DynamoDB 尚不可達) 後的重試間隔；成功前 /readyz 回 503
+STARTUP_RETRY_SECONDS = float(os.getenv("STARTUP_RETRY_SECONDS", "5"))
+
+logger = logging.getLogger(__name__)
+
+
+class WarmUp:
+    """
+    Runs the blocking start-up steps - building the graph and its
+    checkpointer, creating AWS clients - in the executor once the server is
+    already accepting connections, so liveness probes pass right away and the
+    replica reports ready only after every step succeeded.
+
+    Steps run in order; a failing step is retried every `retry_seconds`.
+    The `on_ready` hooks (background consumers that need the graph) run
+    after the last step, each until it succeeds once, and are reported and
+    retried like steps; they must therefore be safe to call again.
+    `started_at` is a `time.perf_counter()` value taken when the process
+    began importing the app, so the "ready" phase covers imports as well.
+    """
+
+    def __init__(
+        self,
+        steps: Sequence[Tuple[str, Callable[[], Any]]],
+        on_ready: Sequence[Callable[[], Awaitable[None]]] = (),
+        started_at: Optional[float] = None,
+        retry_seconds: float = STARTUP_RETRY_SECONDS,
+    ):
+        self.steps = list(steps)
+        self.on_ready = list(on_ready)
+        self.started_at = time.perf_counter() if started_at is None else started_at
+        self.retry_seconds = retry_seconds
+        self.ready = False
+        self._status: Dict[str, Dict[str, Any]] = {name: {"state": "pending"} for name, _ in self.steps}
+        for hook in self.on_ready:
+            self._status[self._hook_name(hook)] = {"state": "pending"}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        READY.set(0)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "uptime_seconds": round(time.perf_counter() - self.started_at, 3),
+            "steps": self._status,
+        }
+
+    @staticmethod
+    def _hook_name(hook: Callable[[], Awaitable[None]]) -> str:
+        return f"on_ready:{getattr(hook, '__name__', type(hook).__name__)}"
+
+    async def _run(self) -> None:
+        for name, step in self.steps:
+            await self._until_ok(name, lambda step=step: run_blocking(step))
+        for hook in self.on_ready:
+            await self._until_ok(self._hook_name(hook), hook)
+        elapsed = time.perf_counter() - self.started_at
+        STARTUP_DURATION.labels(phase="ready").set(elapsed)
+        READY.set(1)
+        self.ready = True
+        logger.info("Ready after %.2fs.", elapsed)
+
+    async def _until_ok(self, name: str, run: Callable[[], Awaitable[Any]]) -> None:
+        attempts = 0
+        while True:
+            attempts += 1
+            started = time.perf_counter()
+            try:
+                await run()
+            except Exception as e:
+                self._status[name] = {"state": "failed", "attempts": attempts, "error": str(e)}
+                logger.error("Warm-up step %s failed (attempt %d), retrying in %.0fs: %s",
+                             name, attempts, self.retry_seconds, e)
+                await asyncio.sleep(self.retry_seconds)
+                continue
+            elapsed = time.perf_counter() - started
+            STARTUP_DURATION.labels(phase=name).set(elapsed)
+            self._status[name] = {"state": "ok", "attempts": attempts, "seconds": round(elapsed, 3)}
+            return
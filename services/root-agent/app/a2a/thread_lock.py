@@ -0,0 +1,287 @@
+# a2a_cash_flow_demo/services/root-agent/app/a2a/thread_lock.py
+
+import os
+import time
+import asyncio
+import logging
+import threading
+import contextvars
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from .metrics import THREAD_LOCK_ERRORS, THREAD_LOCK_TIMEOUTS, THREAD_LOCK_WAIT
+from .redis_client import REDIS_HOST, get_redis_client
+
+# --- Configuration ---
+# memory: 只在同一個 process 內序列化；redis: 跨 uvicorn worker / replica 的 lease
+THREAD_LOCK_BACKEND = os.getenv("THREAD_LOCK_BACKEND", "redis" if REDIS_HOST else "memory").lower()
+# lease 長度；持有期間每 1/3 lease 續約一次，process 當掉時最多這麼久後自動釋放
+THREAD_LOCK_LEASE_SECONDS = float(os.getenv("THREAD_LOCK_LEASE_SECONDS", "30"))
+# 等待同一個 thread 上其他處理者的上限，逾時由呼叫端回 409/503 讓對方重試
+THREAD_LOCK_WAIT_SECONDS = float(os.getenv("THREAD_LOCK_WAIT_SECONDS", "10"))
+# 搶 shared lease 的重試間隔
+THREAD_LOCK_RETRY_SECONDS = float(os.getenv("THREAD_LOCK_RETRY_SECONDS", "0.05"))
+THREAD_LOCK_KEY_PREFIX = os.getenv("THREAD_LOCK_KEY_PREFIX", "a2a:thread_lock")
+
+# Lease held by the current task (see ThreadLocker.hold); run_blocking and
+# LangGraph's executors copy the context, so checkpoint writes can see it.
+_held_lease: "contextvars.ContextVar[Optional[ThreadLease]]" = contextvars.ContextVar("thread_lease", default=None)
+
+logger = logging.getLogger(__name__)
+
+
+class ThreadBusyError(Exception):
+    """
+    Another handler kept the thread for longer than the wait limit, or the
+    shared lease could not be taken or kept; the caller should retry later.
+    """
+
+
+class ThreadLeaseLost(ThreadBusyError):
+    """
+    The shared lease expired or could not be renewed while held, so another
+    worker may already be processing the thread.
+    """
+
+
+class ThreadLease:
+    """
+    What `thread_lock` yields. `check()` raises ThreadLeaseLost once the
+    shared lease can no longer be relied on: call it before every step that
+    writes the thread (update_state, resuming the graph). `fence()` also asks
+    the lease store whether the lease is still ours; the checkpointer calls
+    it before each checkpoint write (see check_thread_lease).
+    """
+
+    def __init__(self, thread_id: str, lease_seconds: Optional[float] = None, owned: Optional[Callable[[], bool]] = None):
+        self.thread_id = thread_id
+        self.lease_seconds = lease_seconds
+        self.owned = owned
+        # 最後一次確認持有 lease 的時間點 + lease 長度；None = 沒有 shared lease
+        self.valid_until = None if lease_seconds is None else time.monotonic() + lease_seconds
+        self.lost: Optional[str] = None
+
+    def confirmed(self, at: float) -> None:
+        self.valid_until = at + self.lease_seconds
+
+    def check(self) -> None:
+        if self.lost is None and self.valid_until is not None and time.monotonic() >= self.valid_until:
+            self.lost = "the lease expired before it was renewed"
+        if self.lost is not None:
+            raise ThreadLeaseLost(f"Lost the lease on thread {self.thread_id}: {self.lost}.")
+
+    def fence(self) -> None:
+        self.check()
+        if self.owned is None:
+            return
+        try:
+            owned = self.owned()
+        except Exception as e:
+            THREAD_LOCK_ERRORS.labels(operation="fence").inc()
+            raise ThreadLeaseLost(f"Could not confirm the lease on thread {self.thread_id}: {e}.") from e
+        if not owned:
+            self.lost = "another worker holds it now"
+            self.check()
+
+
+class KeyedLocks:
+    """
+    One asyncio.Lock per key, created on first use and dropped once nobody
+    holds or waits for it, so idle threads cost nothing.
+    """
+
+    def __init__(self):
+        # key -> [lock, holders + waiters]
+        self._locks: Dict[str, List[Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    @asynccontextmanager
+    async def hold(self, key: str, timeout: Optional[float]) -> AsyncIterator[None]:
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            try:
+                await asyncio.wait_for(entry[0].acquire(), timeout)
+            except asyncio.TimeoutError:
+                THREAD_LOCK_TIMEOUTS.labels(scope="local").inc()
+                raise ThreadBusyError(f"Thread {key} is busy in this process.") from None
+            try:
+                yield
+            finally:
+                entry[0].release()
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                self._locks.pop(key, None)
+
+
+class RedisThreadLeases:
+    """
+    Shared leases via redis-py's Lock: `SET key token NX PX lease`, with the
+    token-checked extend and delete done in Redis-side scripts, so a holder
+    whose lease ran out can never release someone else's.
+    """
+
+    backend = "redis"
+
+    def __init__(self, client: Any, lease_seconds: float = THREAD_LOCK_LEASE_SECONDS, key_prefix: str = THREAD_LOCK_KEY_PREFIX):
+        self.client = client
+        self.lease_seconds = lease_seconds
+        self.key_prefix = key_prefix
+
+    def try_acquire(self, thread_id: str) -> Optional[Any]:
+        lease = self.client.lock(f"{self.key_prefix}:{thread_id}", timeout=self.lease_seconds, thread_local=False)
+        return lease if lease.acquire(blocking=False) else None
+
+    def renew(self, lease: Any) -> None:
+        lease.reacquire()
+
+    def owns(self, lease: Any) -> bool:
+        return lease.owned()
+
+    def release(self, lease: Any) -> None:
+        lease.release()
+
+
+class ThreadLocker:
+    """
+    Serializes the read-update-resume sequence of one graph thread.
+
+    Callbacks, HITL answers and the deadline sweeper for the same thread_id
+    first queue on an in-process lock, so within a process they never touch
+    the checkpointer concurrently and only one of them polls the shared
+    lease. The holder then takes the shared lease (if any) to exclude other
+    uvicorn workers and replicas, and renews it every third of its length
+    until it is done. Different threads never wait on each other. Lease
+    calls run on asyncio's default thread pool, not on the graph executor,
+    so renewals are not queued behind long graph runs.
+
+    Errors from the shared store fail closed: without the lease another
+    worker could resume the same thread, so acquire errors raise
+    ThreadBusyError, and a lease that could not be renewed in time makes the
+    yielded ThreadLease's `check()` raise ThreadLeaseLost before the next
+    write.
+    """
+
+    def __init__(
+        self,
+        leases: Any = None,
+        wait_seconds: float = THREAD_LOCK_WAIT_SECONDS,
+        retry_seconds: float = THREAD_LOCK_RETRY_SECONDS,
+    ):
+        self.leases = leases
+        self.wait_seconds = wait_seconds
+        self.retry_seconds = retry_seconds
+        self.local = KeyedLocks()
+
+    @asynccontextmanager
+    async def hold(self, thread_id: str) -> AsyncIterator[ThreadLease]:
+        started = time.monotonic()
+        async with self.local.hold(thread_id, self.wait_seconds):
+            if self.leases is None:
+                THREAD_LOCK_WAIT.observe(time.monotonic() - started)
+                yield ThreadLease(thread_id)
+                return
+            lease, acquired_at = await self._acquire(thread_id, started + self.wait_seconds)
+            THREAD_LOCK_WAIT.observe(time.monotonic() - started)
+            held = ThreadLease(thread_id, self.leases.lease_seconds, lambda: self.leases.owns(lease))
+            held.confirmed(acquired_at)
+            renewer = asyncio.create_task(self._renew(held, lease))
+            token = _held_lease.set(held)
+            try:
+                yield held
+            finally:
+                _held_lease.reset(token)
+                renewer.cancel()
+                await asyncio.gather(renewer, return_exceptions=True)
+                await self._release(thread_id, lease)
+
+    async def _acquire(self, thread_id: str, deadline: float) -> Tuple[Any, float]:
+        """
+        Polls the shared lease until `deadline`; returns it with the time the
+        successful attempt started. Raises ThreadBusyError on timeout and
+        when the store fails (fail closed).
+        """
+        while True:
+            attempted = time.monotonic()
+            try:
+                lease = await asyncio.to_thread(self.leases.try_acquire, thread_id)
+            except Exception as e:
+                THREAD_LOCK_ERRORS.labels(operation="acquire").inc()
+                logger.warning("Acquiring the %s lease for thread %s failed: %s", self.leases.backend, thread_id, e)
+                raise ThreadBusyError(f"Could not lock thread {thread_id}: the {self.leases.backend} lease store failed.") from e
+            if lease is not None:
+                return lease, attempted
+            if time.monotonic() >= deadline:
+                THREAD_LOCK_TIMEOUTS.labels(scope="shared").inc()
+                raise ThreadBusyError(f"Thread {thread_id} is busy on another worker.")
+            await asyncio.sleep(self.retry_seconds)
+
+    async def _renew(self, held: ThreadLease, lease: Any) -> None:
+        interval = self.leases.lease_seconds / 3
+        while True:
+            await asyncio.sleep(interval)
+            attempted = time.monotonic()
+            try:
+                await asyncio.to_thread(self.leases.renew, lease)
+            except Exception as e:
+                THREAD_LOCK_ERRORS.labels(operation="renew").inc()
+                logger.error("Lost the %s lease for thread %s while holding it: %s", self.leases.backend, held.thread_id, e)
+                held.lost = f"renewing it failed ({e})"
+                return
+            held.confirmed(attempted)
+
+    async def _release(self, thread_id: str, lease: Any) -> None:
+        try:
+            await asyncio.to_thread(self.leases.release, lease)
+        except Exception as e:
+            THREAD_LOCK_ERRORS.labels(operation="release").inc()
+            logger.warning("Releasing the %s lease for thread %s failed: %s", self.leases.backend, thread_id, e)
+
+
+_locker: Optional[ThreadLocker] = None
+_locker_lock = threading.Lock()
+
+
+def _build_leases() -> Any:
+    if THREAD_LOCK_BACKEND == "redis":
+        client = get_redis_client()
+        if client is None:
+            logger.warning("THREAD_LOCK_BACKEND=redis but REDIS_HOST is not set; threads are only locked within this process.")
+            return None
+        return RedisThreadLeases(client)
+    return None
+
+
+def get_thread_locker() -> ThreadLocker:
+    global _locker
+    if _locker is None:
+        with _locker_lock:
+            if _locker is None:
+                _locker = ThreadLocker(_build_leases())
+    return _locker
+
+
+def thread_lock(thread_id: str):
+    """
+    `async with thread_lock(task_id) as lease:` around any get_state ->
+    update_state -> resume sequence, with `lease.check()` before each write.
+    Raises ThreadBusyError after THREAD_LOCK_WAIT_SECONDS or when the shared
+    lease store fails.
+    """
+    return get_thread_locker().hold(thread_id)
+
+
+def check_thread_lease(thread_id: str) -> None:
+    """
+    Fencing check before a checkpoint write: raises ThreadLeaseLost when the
+    current task holds `thread_id`'s lock but its shared lease expired or
+    was taken over. Writes made without holding the lock pass.
+    """
+    held = _held_lease.get()
+    if held is not None and held.thread_id == thread_id:
+        held.fence()
@@ -1,10 +1,18 @@
 # a2a_cash_flow_demo/services/root-agent/app/a2a/tools.py
 
-import boto3
 import json
 import os
 import logging
-from typing import Dict, Any
+import threading
+import time
+from typing import Dict, Any, Optional
+
+from .admission import report_throttle
+from .dispatcher import DispatchOutcomeUnknown, EventBridgeDispatcher
+from .instrumentation import span
+from .metrics import DISPATCH_DURATION, DISPATCH_FAILURES, REMOTE_INVOKE_DURATION, REMOTE_INVOKE_RESULTS
+from .remote_http import NOT_SENT_ERRORS, NOT_SERVED_STATUS_CODES, REMOTE_AGENT_URLS, get_remote_invoker
+from .polling import get_poll_scheduler
 
 # --- Configuration ---
 # It's recommended to manage these via environment variables
@@ -12,13 +20,50 @@ from typing import Dict, Any
 AWS_REGION = os.getenv("AWS_REGION", "ap-southeast-1") 
 # 您實際 Event Bus 的名稱
 EVENT_BUS_NAME = os.getenv("EVENT_BUS_NAME", "a2a-cash-flow-demo-bus") 
+# 等待批次送出結果的最長時間 (秒)
+DISPATCH_TIMEOUT_SECONDS = float(os.getenv("DISPATCH_TIMEOUT_SECONDS", "10"))
+
+# boto3 client，第一次派送 (或啟動 warm-up) 時才建立；可預先指定 (例如 fakes.FakeEventBridgeClient)
+eventbridge_client: Optional[Any] = None
+
+_dispatcher: Optional[EventBridgeDispatcher] = None
+_dispatcher_lock = threading.Lock()
+
+def _create_eventbridge_client() -> Optional[Any]:
+    try:
+        import boto3
+
+        return boto3.client("events", region_name=AWS_REGION)
+    except Exception as e:
+        logging.getLogger(__name__).error("Failed to initialize boto3 client: %s", e)
+        return None
+
+def get_dispatcher() -> Optional[EventBridgeDispatcher]:
+    """
+    Returns the shared batching dispatcher, creating it (and the EventBridge
+    client) on first use.
+    """
+    global _dispatcher, eventbridge_client
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                if eventbridge_client is None:
+                    eventbridge_client = _create_eventbridge_client()
+                if eventbridge_client is not None:
+                    _dispatcher = EventBridgeDispatcher(eventbridge_client, on_throttle=lambda: report_throttle("eventbridge"))
+    return _dispatcher
+
+def close_dispatcher() -> None:
+    """
+    Flushes pending events and stops the dispatcher thread.
+    """
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is not None:
+            _dispatcher.close()
+            _dispatcher = None
 
-# Initialize boto3 client
-try:
-    eventbridge_client = boto3.client("events", region_name=AWS_REGION)
-except Exception as e:
-    logging.error(f"Failed to initialize boto3 client: {e}")
-    eventbridge_client = None
+logger = logging.getLogger(__name__)
 
 # --- Tool Definitions ---
 
@@ -30,10 +75,18 @@ def dispatch_to_remote_agent(
 ) -> Dict[str, Any]:
     """
     Sends a task to a remote agent via AWS EventBridge.
+
+    The entry is handed to the shared EventBridgeDispatcher, which batches it
+    with concurrent dispatches into a single put_events call. When the wait
+    times out after the entry was sent, the outcome is unknown: the result is
+    `status="unknown"` and the task waits for a callback as if dispatched
+    (the deadline sweeper dispatches it again if none arrives).
     """
-    if not eventbridge_client:
+    dispatcher = get_dispatcher()
+    if not dispatcher:
         error_msg = "EventBridge client is not initialized."
-        logging.error(error_msg)
+        logger.error(error_msg)
+        DISPATCH_FAILURES.labels(detail_type=detail_type).inc()
         return {"status": "error", "message": error_msg}
 
     event_detail = {
@@ -41,33 +94,128 @@ def dispatch_to_remote_agent(
         "loan_case_id": loan_case_id,
     }
 
+    start = time.perf_counter()
     try:
-        logging.info(f"Dispatching task {task_id} for case {loan_case_id} to {agent_name}...")
-        response = eventbridge_client.put_events(
-            Entries=[
+        logger.info("Dispatching task %s for case %s to %s...", task_id, loan_case_id, agent_name)
+        with span("dispatch", task_id=task_id, detail_type=detail_type):
+            event_id = dispatcher.put_event(
                 {
                     "Source": "a2a.root-agent",
                     "DetailType": detail_type, # e.g., "Task.RecognizeTransactions"
                     "Detail": json.dumps(event_detail),
                     # 使用正確的 EventBusName
                     "EventBusName": EVENT_BUS_NAME, 
-                }
-            ]
-        )
-        
-        failed_count = response.get("FailedEntryCount", 0)
-        if failed_count > 0:
-            error_message = f"Failed to send event to EventBridge for task {task_id}. Response: {response}"
-            logging.error(error_message)
-            return {"status": "error", "message": error_message}
-
-        logging.info(f"Successfully dispatched task {task_id} to {agent_name}. EventID: {response['Entries'][0]['EventId']}")
+                },
+                timeout=DISPATCH_TIMEOUT_SECONDS,
+            )
+        DISPATCH_DURATION.labels(detail_type=detail_type).observe(time.perf_counter() - start)
+
+        logger.info("Successfully dispatched task %s to %s. EventID: %s", task_id, agent_name, event_id)
         return {
             "status": "success",
             "message": f"Task {task_id} dispatched to {agent_name}.",
-            "event_id": response["Entries"][0]["EventId"],
+            "event_id": event_id,
+        }
+    except DispatchOutcomeUnknown as e:
+        DISPATCH_DURATION.labels(detail_type=detail_type).observe(time.perf_counter() - start)
+        logger.warning("Dispatch of task %s to %s has an unknown outcome: %s", task_id, agent_name, e)
+        return {
+            "status": "unknown",
+            "message": f"Task {task_id} may have been dispatched to {agent_name}: {e}",
         }
     except Exception as e:
+        DISPATCH_DURATION.labels(detail_type=detail_type).observe(time.perf_counter() - start)
+        DISPATCH_FAILURES.labels(detail_type=detail_type).inc()
         error_message = f"An exception occurred while dispatching task {task_id}: {e}"
-        logging.error(error_message)
-        return {"status": "error", "message": error_message}
\ No newline at end of file
+        logger.error(error_message)
+        return {"status": "error", "message": error_message}
+
+def invoke_remote_agent(
+    task_id: str,
+    loan_case_id: str,
+    agent_name: str,
+    detail_type: str
+) -> Dict[str, Any]:
+    """
+    Sends a task to a remote agent, preferring the synchronous fast path.
+
+    With REMOTE_DISPATCH_MODE=http the agent's `POST /a2a/invoke` is called
+    first; a `200 SUCCEEDED` answer is returned with `mode="inline"` so the
+    graph can continue without waiting for a callback. A `202` ticket is
+    handed to the poll scheduler when REMOTE_ASYNC_RESULT_MODE=poll
+    (`mode="poll"`); otherwise the agent was asked to report the result as a
+    callback (`mode="event"`).
+
+    It falls back to `dispatch_to_remote_agent` only when the request never
+    reached the agent (connection errors) or the agent does not serve the
+    A2A API. A read timeout, a 5xx or a failed result may mean the task
+    already ran, so those are returned as dispatch errors instead of
+    sending the task a second time.
+    """
+    invoker = get_remote_invoker()
+    base_url = REMOTE_AGENT_URLS.get(detail_type)
+    if invoker is not None and base_url:
+        scheduler = get_poll_scheduler()
+        envelope = {
+            "task_id": task_id,
+            "loan_case_id": loan_case_id,
+            "task_type": detail_type,
+            # remote agent 以此去重，重送同一個任務不會重複執行
+            "idempotency_key": f"{task_id}:{detail_type}",
+            # 202 之後的結果：由 root agent 輪詢，或由 remote agent 送 callback
+            "result_delivery": "poll" if scheduler is not None else "callback",
+        }
+        start = time.perf_counter()
+        try:
+            with span("remote_invoke", task_id=task_id, detail_type=detail_type):
+                status_code, body = invoker.invoke(base_url, envelope)
+        except NOT_SENT_ERRORS as e:
+            REMOTE_INVOKE_RESULTS.labels(detail_type=detail_type, outcome="not_sent").inc()
+            logger.warning("Could not reach %s for task %s, falling back to EventBridge: %s", agent_name, task_id, e)
+        except Exception as e:
+            REMOTE_INVOKE_RESULTS.labels(detail_type=detail_type, outcome="error").inc()
+            error_message = f"Direct invoke of {agent_name} for task {task_id} failed after the request was sent: {e!r}"
+            logger.error(error_message)
+            return {"status": "error", "mode": "http", "message": error_message}
+        else:
+            REMOTE_INVOKE_DURATION.labels(detail_type=detail_type).observe(time.perf_counter() - start)
+            if status_code == 200 and body.get("status") == "SUCCEEDED":
+                REMOTE_INVOKE_RESULTS.labels(detail_type=detail_type, outcome="inline").inc()
+                logger.info("Task %s answered inline by %s.", task_id, agent_name)
+                return {
+                    "status": "success",
+                    "mode": "inline",
+                    "message": f"Task {task_id} completed inline by {agent_name}.",
+                    "output": body.get("output"),
+                }
+            if status_code == 202 and body.get("ticket"):
+                REMOTE_INVOKE_RESULTS.labels(detail_type=detail_type, outcome="accepted").inc()
+                if scheduler is not None:
+                    scheduler.add(body["ticket"], base_url, task_id, detail_type, eta=body.get("eta"))
+                    logger.info("Task %s accepted by %s as ticket %s; polling for the result.", task_id, agent_name, body["ticket"])
+                    return {
+                        "status": "success",
+                        "mode": "poll",
+                        "message": f"Task {task_id} accepted by {agent_name}.",
+                        "ticket": body["ticket"],
+                    }
+                logger.info("Task %s accepted by %s as ticket %s; awaiting its callback.", task_id, agent_name, body["ticket"])
+                return {
+                    "status": "success",
+                    "mode": "event",
+                    "message": f"Task {task_id} accepted by {agent_name}.",
+                    "ticket": body["ticket"],
+                }
+            if status_code in NOT_SERVED_STATUS_CODES:
+                REMOTE_INVOKE_RESULTS.labels(detail_type=detail_type, outcome="not_served").inc()
+                logger.info("%s does not serve /a2a/invoke (%s); using EventBridge for task %s.", agent_name, status_code, task_id)
+            else:
+                REMOTE_INVOKE_RESULTS.labels(detail_type=detail_type, outcome="error").inc()
+                error_message = (f"Direct invoke of {agent_name} for task {task_id} returned {status_code}: "
+                                 f"{body.get('error') or body.get('status')}")
+                logger.error(error_message)
+                return {"status": "error", "mode": "http", "message": error_message}
+
+    result = dispatch_to_remote_agent(task_id, loan_case_id, agent_name, detail_type)
+    result.setdefault("mode", "event")
+    return result
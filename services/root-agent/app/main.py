@@ -1,3 +1,6 @@
+import time
+# 啟動計時起點：a2a_startup_duration_seconds{phase="import"|"ready"}
+IMPORT_STARTED_AT = time.perf_counter()
 from fastapi import FastAPI
 from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
@@ -8,31 +11,108 @@ import os
 
 import uuid
 import logging
-from fastapi import FastAPI, HTTPException, Body
-from pydantic import BaseModel, Field
+from fastapi import FastAPI, HTTPException, Body, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
 from typing import List, Dict, Any, Optional
 # pip install prometheus-fastapi-instrumentator
 from prometheus_fastapi_instrumentator import Instrumentator
 
-from a2a.graph import get_graph_app
-from langchain_core.messages import HumanMessage, ToolMessage
+from a2a.logging_config import configure_logging, shutdown_logging
+from a2a.graph import get_shared_graph_app, close_shared_graph_app, INLINE_RESULT_STATUSES
+from a2a.executor import run_blocking, shutdown_executor, get_executor
+from a2a.compaction import archive_messages, close_archive, prune_thread
+from a2a.tools import close_dispatcher, get_dispatcher, AWS_REGION
+from a2a.instrumentation import stage_transition
+from a2a.bulk import submit_bulk, read_ndjson_case_ids, BULK_MAX_CASES_PER_REQUEST
+from a2a.consumer import SQSCallbackConsumer, CALLBACK_QUEUE_URL
+from a2a.idempotency import callback_key, get_deduplicator
+from a2a.projection import etag_for, etag_matches, get_projection_store, record_task_status
+from a2a.events import close_event_broker, get_event_broker, publish_update
+from a2a.remote_http import close_remote_invoker, start_remote_invoker, REMOTE_AGENT_RESULTS
+from a2a.polling import start_poll_scheduler, stop_poll_scheduler
+from a2a.thread_lock import ThreadBusyError, thread_lock
+from a2a.admission import AdmissionRejected, get_admission_controller, record_throttling, ADMISSION_QUEUE_TIMEOUT_SECONDS
+from a2a.startup import WarmUp
+from a2a.metrics import STARTUP_DURATION
+from a2a.deadlines import (
+    TASK_DEADLINE_MAX_RETRIES,
+    TASK_DEADLINE_SECONDS,
+    WAITING_STATUSES,
+    cancel_task_deadline,
+    start_deadline_sweeper,
+    stop_deadline_sweeper,
+    track_task_deadline,
+)
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
 
 
 # --- Application Setup ---
 PORT = int(os.environ.get("PORT", 50000))
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s'
-)
-logging.getLogger("langgraph").setLevel(logging.DEBUG)
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+SSE_MEDIA_TYPE = "text/event-stream"
+# 所有中斷節點共用同一個 router，callback 以此節點身分更新 state
+CALLBACK_RESUME_NODE = "start_node"
+# JSON 結構化 log，經由 queue 交給背景執行緒輸出 (LOG_LEVEL / LOG_FORMAT)
+configure_logging()
 logger = logging.getLogger(__name__)
 
+def warm_dispatcher() -> None:
+    if get_dispatcher() is None:
+        raise RuntimeError("EventBridge client could not be created.")
+
+def create_sqs_client() -> Any:
+    import boto3
+
+    return boto3.client("sqs", region_name=AWS_REGION)
+
+# 依序在 executor 執行；全部成功後 /readyz 才回 200
+WARM_UP_STEPS = [
+    ("graph", get_shared_graph_app),
+    ("eventbridge", warm_dispatcher),
+    ("projection", get_projection_store),
+    ("dedupe", get_deduplicator),
+]
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    print("Application is starting up...")
+    logger.info("Application is starting up...")
+    remote_invoker = await start_remote_invoker()
+    background: Dict[str, Any] = {}
+
+    async def start_background_workers() -> None:
+        # 需要 graph 的背景工作在 warm-up 完成後才啟動；失敗時 WarmUp 會重試，已啟動的不會重複啟動
+        if remote_invoker is not None:
+            # 輪詢與直接呼叫共用同一個連線池
+            await start_poll_scheduler(remote_invoker.client, deliver_polled_result)
+        if CALLBACK_QUEUE_URL and "callback_consumer" not in background:
+            callback_consumer = SQSCallbackConsumer(
+                await run_blocking(create_sqs_client),
+                CALLBACK_QUEUE_URL,
+                consume_callback_message,
+            )
+            callback_consumer.start()
+            background["callback_consumer"] = callback_consumer
+        await start_deadline_sweeper(handle_expired_task)
+
+    warm_up = WarmUp(WARM_UP_STEPS, on_ready=[start_background_workers], started_at=IMPORT_STARTED_AT)
+    app.state.warm_up = warm_up
+    warm_up.start()
     yield
     # Clean up the ML models and release the resources
-    print("Application is shutting down...")
+    logger.info("Application is shutting down...")
+    await warm_up.stop()
+    if background.get("callback_consumer"):
+        await background["callback_consumer"].stop()
+    await stop_deadline_sweeper()
+    await stop_poll_scheduler()
+    shutdown_executor(wait=True)
+    await close_remote_invoker()
+    close_shared_graph_app()
+    close_dispatcher()
+    close_archive()
+    close_event_broker()
+    shutdown_logging()
 
 app = FastAPI(
     title="A2A Root Agent API",
@@ -43,14 +123,18 @@ app = FastAPI(
 # 盡可能早地註冊中間件，在定義完 app 之後，且在任何啟動事件之前
 Instrumentator().instrument(app).expose(app, endpoint="/metrics")
 
-# Initialize the LangGraph Application
-# This creates the compiled graph with its checkpointer
-graph_app = get_graph_app()
+# The compiled graph and its checkpointer are built by the warm-up in
+# `lifespan` (get_shared_graph_app), not at import.
+
+STARTUP_DURATION.labels(phase="import").set(time.perf_counter() - IMPORT_STARTED_AT)
 
 # --- API Models ---
 class CreateTaskRequest(BaseModel):
     loan_case_id: str = Field(..., description="The business identifier for the loan case.")
 
+class BulkCreateTasksRequest(BaseModel):
+    loan_case_ids: List[str] = Field(..., min_length=1, max_length=BULK_MAX_CASES_PER_REQUEST, description="Loan cases to start tasks for.")
+
 class CreateTaskResponse(BaseModel):
     task_id: str
     message: str
@@ -61,23 +145,122 @@ class CallbackRequest(BaseModel):
     status: str = Field(..., description="The new status to set for the task.")
     result: Dict[str, Any] = Field(description="The output from the remote agent.")
     needs_info: Optional[List[str]] = Field(None, description="Questions for HITL, if any.")
+    event_id: Optional[str] = Field(None, description="EventBridge event ID or SQS MessageId; repeated deliveries are ignored.")
 
 class HITLAnswerRequest(BaseModel):
     answer: str = Field(..., description="The human-provided answer or information.")
 
+class TaskStatusResponse(BaseModel):
+    task_id: str
+    loan_case_id: Optional[str] = None
+    status: str
+    status_since: Optional[float] = None
+    created_at: Optional[float] = None
+    updated_at: float
+    needs_info: List[str] = []
+
+class LoanCaseTasksResponse(BaseModel):
+    loan_case_id: str
+    tasks: List[TaskStatusResponse]
+
+# --- Helpers ---
+
+def _prune_finished_thread(task_id: str) -> None:
+    try:
+        prune_thread(task_id)
+    except Exception as e:
+        logger.warning("Failed to prune checkpoints for task %s: %s", task_id, e)
+
+def prune_if_finished(task_id: str, final_state: Optional[Dict[str, Any]]) -> None:
+    """
+    Once a thread reached `completed`, drops its superseded checkpoints in the
+    background so only the final one is kept in the checkpoint table.
+    """
+    if final_state and final_state.get("status") == "completed":
+        get_executor().submit(_prune_finished_thread, task_id)
+
+def run_graph(graph_input: Optional[Dict[str, Any]], config: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Runs the graph like `invoke`, publishing each node's committed status and
+    AIMessages to the task's event streams. Interrupts reached with an inline
+    remote-agent result are resumed right away. Returns the final state values.
+    """
+    task_id = config["configurable"]["thread_id"]
+    final_state = None
+    while True:
+        progressed = False
+        for mode, chunk in get_shared_graph_app().stream(graph_input, config, stream_mode=["updates", "values"]):
+            if mode == "values":
+                final_state = chunk
+                continue
+            for node, update in chunk.items():
+                if not node.startswith("__") and isinstance(update, dict):
+                    progressed = True
+                    publish_update(task_id, update)
+        # remote agent 已 inline 回傳結果：不等 callback，直接從 interrupt 繼續
+        if not progressed or not final_state or final_state.get("status") not in INLINE_RESULT_STATUSES:
+            return final_state
+        graph_input = None
+
+def record_task(final_state: Optional[Dict[str, Any]]) -> None:
+    """
+    Bookkeeping after a graph run: the status projection, and the deadline
+    of a task left waiting on a remote agent.
+    """
+    record_task_status(final_state)
+    track_task_deadline(final_state)
+
+def update_task_state(config: Dict[str, Any], values: Dict[str, Any], as_node: Optional[str] = None) -> None:
+    """
+    `update_state` on the shared graph, followed by publishing the update.
+    """
+    get_shared_graph_app().update_state(config, values, as_node=as_node)
+    publish_update(config["configurable"]["thread_id"], values)
+
+def _cached_json(content: Dict[str, Any], etag: str, if_none_match: Optional[str]) -> Response:
+    """
+    JSON response with an ETag, or an empty 304 when the client already has it.
+    """
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=content, headers=headers)
+
 # --- API Endpoints ---
 
 @app.get("/")
 def read_root():
     return {"message": "Root Agent is running."}
 
-@app.post("/tasks", response_model=CreateTaskResponse, status_code=202)
-async def create_task(request: CreateTaskRequest):
+@app.get("/healthz")
+def liveness():
     """
-    Creates a new task and starts the workflow.
+    Liveness: the process is serving requests (warm-up may still be running).
+    """
+    return {"status": "alive"}
+
+@app.get("/readyz")
+def readiness(request: Request):
+    """
+    Readiness: 200 once every warm-up step succeeded, 503 with the state of
+    each step before that.
+    """
+    status = request.app.state.warm_up.status()
+    return JSONResponse(content=status, status_code=200 if status["ready"] else 503)
+
+async def start_task(loan_case_id: str, admission_timeout: Optional[float] = ADMISSION_QUEUE_TIMEOUT_SECONDS) -> str:
+    """
+    Creates a new thread for a loan case and runs the graph until its first
+    interrupt. Returns the task ID; raises HTTPException on failure: 429 when
+    admission control turns the start away (nothing was written), 503 when
+    EventBridge or DynamoDB throttled it or the thread lock is unavailable.
+    All carry Retry-After.
+
+    The run holds the thread lock, so a callback that arrives before the
+    first checkpoint is committed waits for it instead of finding no task.
     """
     task_id = str(uuid.uuid4())
-    logger.info(f"Received request to create task for loan case: {request.loan_case_id}. Assigned Task ID: {task_id}")
+    logger.info("Received request to create task for loan case: %s. Assigned Task ID: %s", loan_case_id, task_id)
 
     # The config dictionary links a run to a persistent thread_id
     config = {"configurable": {"thread_id": task_id}}
@@ -85,70 +268,316 @@ async def create_task(request: CreateTaskRequest):
     # Initial state for the graph
     initial_state = {
         "task_id": task_id,
-        "loan_case_id": request.loan_case_id,
+        "loan_case_id": loan_case_id,
         "status": "new",
-        "messages": [HumanMessage(content=f"Start processing for loan case ID: {request.loan_case_id}")],
+        "status_since": time.time(),
+        "created_at": time.time(),
+        "messages": [HumanMessage(content=f"Start processing for loan case ID: {loan_case_id}")],
     }
 
     try:
-        logger.info(">>> Start graph_app.invoke...")
-        graph_app.invoke(initial_state, config=config)
-        logger.info(">>> Graph finished")
-        
+        # 限制同時啟動數與下游呼叫速率；超過時排隊，排不到就回 429
+        async with get_admission_controller().admit(admission_timeout):
+            async with thread_lock(task_id) as lease:
+                logger.debug(">>> Start graph_app.invoke...", extra={"task_id": task_id})
+                archive_messages(task_id, initial_state["messages"])
+                lease.check()
+                final_state = await run_blocking(run_graph, initial_state, config)
+                await run_blocking(record_task, final_state)
+                logger.debug(">>> Graph finished", extra={"task_id": task_id})
+
+    except AdmissionRejected as e:
+        logger.warning("Rejected task start for loan case %s (%s): %s", loan_case_id, e.outcome, e)
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except ThreadBusyError as e:
+        logger.warning("Could not lock task %s to start it: %s", task_id, e)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
-        # 如果是 EventBridge 失敗，錯誤會在這裡被捕獲
-        logger.error(f"Failed to start graph for task {task_id}. Error: {e}")
-        # 為了更友善的錯誤提示，我們可以檢查錯誤是否為預期的連線/權限問題
-        if "events" in str(e) or "PutEvents" in str(e):
-             raise HTTPException(status_code=503, detail=f"Workflow failed to start due to external AWS service error (EventBridge/DynamoDB): {e}")
-        else:
-             raise HTTPException(status_code=500, detail=f"Failed to start workflow: {e}")
+        logger.error("Failed to start graph for task %s. Error: %s", task_id, e)
+        # throttling 回報給 admission controller 調降額度，並請客戶端稍後重試
+        downstream = record_throttling(e)
+        if downstream is not None:
+            raise HTTPException(
+                status_code=503,
+                detail=f"Workflow failed to start: {downstream} is throttling requests.",
+                headers={"Retry-After": "1"},
+            )
+        raise HTTPException(status_code=500, detail=f"Failed to start workflow: {e}")
+
+    return task_id
+
+async def start_bulk_task(loan_case_id: str) -> str:
+    """
+    start_task for bulk uploads: submit_bulk already bounds and paces its
+    starts, so they wait for admission instead of timing out.
+    """
+    return await start_task(loan_case_id, admission_timeout=None)
 
+@app.post("/tasks", response_model=CreateTaskResponse, status_code=202)
+async def create_task(request: CreateTaskRequest):
+    """
+    Creates a new task and starts the workflow. Answers 429 with Retry-After
+    when admission control is saturated.
+    """
+    task_id = await start_task(request.loan_case_id)
     return {"task_id": task_id, "message": "Task created and workflow initiated."}
 
-@app.post("/callbacks", status_code=200)
-async def handle_callback(request: CallbackRequest):
+@app.post("/tasks/bulk", status_code=202)
+async def create_tasks_bulk(request: Request):
     """
-    Endpoint to receive results from remote agents (via an SQS consumer).
-    This resumes the graph execution.
+    Creates one task per loan case. Accepts either a JSON body
+    (`{"loan_case_ids": [...]}`) or a streamed NDJSON upload
+    (`Content-Type: application/x-ndjson`), and streams back one NDJSON line
+    per case with its task ID as soon as the workflow has started.
+    """
+    content_type = request.headers.get("content-type", "")
+    try:
+        if content_type.startswith(NDJSON_MEDIA_TYPE):
+            case_ids = await read_ndjson_case_ids(request.stream())
+        else:
+            case_ids = BulkCreateTasksRequest(**(await request.json())).loan_case_ids
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=422, detail=f"Invalid bulk request: {e}")
+
+    return StreamingResponse(submit_bulk(case_ids, start_bulk_task), media_type=NDJSON_MEDIA_TYPE, status_code=202)
+
+@app.get("/tasks/{task_id}", response_model=TaskStatusResponse)
+async def get_task_status(task_id: str, request: Request):
+    """
+    Current status of a task, served from the status projection (never from
+    the checkpoint). Supports `If-None-Match` for cheap polling.
+    """
+    record = await get_projection_store().aget(task_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"Task with ID '{task_id}' not found.")
+    content = TaskStatusResponse(**record).model_dump()
+    return _cached_json(content, etag_for([record]), request.headers.get("if-none-match"))
+
+@app.get("/loan-cases/{loan_case_id}/tasks", response_model=LoanCaseTasksResponse)
+async def list_loan_case_tasks(loan_case_id: str, request: Request):
+    """
+    Status of every task started for a loan case, oldest first.
+    """
+    records = await get_projection_store().alist_for_loan_case(loan_case_id)
+    content = LoanCaseTasksResponse(
+        loan_case_id=loan_case_id,
+        tasks=[TaskStatusResponse(**record) for record in records],
+    ).model_dump()
+    return _cached_json(content, etag_for(records), request.headers.get("if-none-match"))
+
+@app.get("/tasks/{task_id}/events")
+async def stream_task_events(task_id: str):
+    """
+    Server-sent events for a task: its current status, then every status
+    change and new AIMessage as the graph resumes, until it reaches a
+    terminal status (completed or a dispatch error).
+    """
+    store = get_projection_store()
+    record = await store.aget(task_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"Task with ID '{task_id}' not found.")
+
+    async def snapshot():
+        # 訂閱後再讀一次，避免漏掉訂閱前一刻的狀態變化
+        current = await store.aget(task_id) or record
+        return {
+            "type": "status",
+            "task_id": task_id,
+            "status": current["status"],
+            "needs_info": current.get("needs_info") or [],
+            "ts": current.get("updated_at"),
+        }
+
+    return StreamingResponse(
+        get_event_broker().stream(task_id, snapshot()),
+        media_type=SSE_MEDIA_TYPE,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+async def process_callback(request: CallbackRequest) -> bool:
+    """
+    Applies a remote-agent result to its thread and resumes the graph.
+    Shared by the `/callbacks` endpoint and the in-process SQS consumer.
+    Returns False, without touching the checkpointer, for a repeated delivery.
     """
     task_id = request.task_id
-    logger.info(f"Received callback for task {task_id} from {request.source} with status '{request.status}'")
+    dedupe_key = callback_key(task_id, request.source, request.event_id, request.model_dump(exclude={"event_id"}))
+    deduplicator = get_deduplicator()
+    if not await deduplicator.claim(dedupe_key):
+        logger.info("Ignoring duplicate callback for task %s from %s (%s)", task_id, request.source, dedupe_key)
+        return False
+
+    logger.info("Received callback for task %s from %s with status '%s'", task_id, request.source, request.status)
 
     config = {"configurable": {"thread_id": task_id}}
 
     try:
-        # Check if the task exists by trying to get its state
-        current_state = graph_app.get_state(config)
-        if not current_state:
-            raise HTTPException(status_code=404, detail=f"Task with ID '{task_id}' not found.")
-        
-        # Prepare the state update
-        state_update = {
-            "status": request.status,
-        }
-        if request.needs_info:
-            state_update["needs_info"] = request.needs_info
-            state_update["status"] = "awaiting_human_input" # Override status if HITL is needed
-        
-        # Update the state with the new status from the callback
-        graph_app.update_state(config, state_update)
-
-        # Create a message representing the callback result and invoke the graph
-        # This will make the graph resume from its interrupted state
-        tool_message = ToolMessage(
-            content=f"Received result from {request.source}: {request.result}",
-            name=request.source
-        )
+        # 同一個 thread 的 callback / HITL 回覆 / 逾時處理依序執行，跨 worker 與 replica
+        async with thread_lock(task_id) as lease:
+            # get_state returns an empty snapshot (never None) for an unknown thread
+            current_state = await run_blocking(get_shared_graph_app().get_state, config)
+            if not current_state.values:
+                raise HTTPException(status_code=404, detail=f"Task with ID '{task_id}' not found.")
+
+            # Only the agent the current stage waits on may move the task: a late
+            # result of an earlier stage, or any result after the task finished or
+            # was handed to a human, must not reopen it. 409 = dropped, not retried.
+            status = current_state.values.get("status")
+            if status == "new":
+                # 派送已送出但 checkpoint 尚未寫入 (例如未共用 lease 的另一個 replica)：稍後重試
+                raise ThreadBusyError(f"Task '{task_id}' is still being dispatched.")
+            waiting = WAITING_STATUSES.get(status)
+            if waiting is None or waiting[2] != request.source:
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"Task '{task_id}' is in status '{status}' and is not waiting for {request.source}.",
+                )
+
+            # Prepare the state update
+            state_update = {
+                "status": request.status,
+            }
+            if request.needs_info:
+                state_update["needs_info"] = request.needs_info
+                state_update["status"] = "awaiting_human_input" # Override status if HITL is needed
+                state_update["resume_status"] = waiting[0]
+            state_update.update(stage_transition(current_state.values, state_update["status"]))
         
-        # Resume the graph. The router will direct it to the next step based on the new status.
-        graph_app.invoke({"messages": [tool_message]}, config)
+            # Create a message representing the callback result
+            tool_message = ToolMessage(
+                content=f"Received result from {request.source}: {request.result}",
+                name=request.source,
+                tool_call_id=request.event_id or dedupe_key,
+            )
+            state_update["messages"] = [tool_message]
+
+            # Update the state as the interrupted node, so the router picks the next
+            # step from the new status, then resume from the interrupt. Invoking with
+            # new input instead would restart the workflow at the entry point.
+            lease.check()
+            await run_blocking(update_task_state, config, state_update, as_node=CALLBACK_RESUME_NODE)
+            archive_messages(task_id, [tool_message])
+            lease.check()
+            final_state = await run_blocking(run_graph, None, config)
+            await run_blocking(record_task, final_state)
+            prune_if_finished(task_id, final_state)
 
+    except ThreadBusyError as e:
+        await deduplicator.release(dedupe_key)
+        # 5xx：SQS consumer 不刪除訊息、poll scheduler 稍後重試
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except HTTPException:
+        await deduplicator.release(dedupe_key)
+        raise
     except Exception as e:
-        logger.error(f"Error processing callback for task {task_id}. Error: {e}")
+        await deduplicator.release(dedupe_key)
+        record_throttling(e)
+        logger.error("Error processing callback for task %s. Error: %s", task_id, e)
         raise HTTPException(status_code=500, detail=f"Failed to process callback: {e}")
 
-    return {"message": f"Callback for task {task_id} processed."}
+    return True
+
+async def consume_callback_message(payload: Dict[str, Any]) -> None:
+    """
+    Handler for messages read from SQS.callback by SQSCallbackConsumer.
+    Malformed messages and unknown tasks are dropped instead of redelivered.
+    """
+    try:
+        request = CallbackRequest(**payload)
+    except ValidationError as e:
+        logger.error("Dropping malformed callback message: %s", e)
+        return
+
+    try:
+        await process_callback(request)
+    except HTTPException as e:
+        if e.status_code >= 500:
+            raise
+        logger.error("Dropping callback for task %s: %s", request.task_id, e.detail)
+
+async def deliver_polled_result(ticket, body: Dict[str, Any]) -> None:
+    """
+    Result handler of the poll scheduler: a finished remote ticket is applied
+    like a callback, keyed on the ticket for deduplication. Raises on server
+    errors so the scheduler polls the ticket again.
+    """
+    source, succeeded_status, failed_status = REMOTE_AGENT_RESULTS[ticket.detail_type]
+    succeeded = body.get("status") == "SUCCEEDED"
+    request = CallbackRequest(
+        task_id=ticket.task_id,
+        source=source,
+        status=succeeded_status if succeeded else failed_status,
+        result=(body.get("output") or {}) if succeeded else {"error": body.get("error")},
+        needs_info=body.get("needs_info"),
+        event_id=f"ticket:{ticket.ticket}",
+    )
+    try:
+        await process_callback(request)
+    except HTTPException as e:
+        if e.status_code >= 500:
+            raise
+        logger.error("Dropping polled result for task %s: %s", ticket.task_id, e.detail)
+
+async def handle_expired_task(task_id: str) -> str:
+    """
+    Deadline sweeper callback for a task whose remote-agent result is overdue.
+    The stage is dispatched again up to TASK_DEADLINE_MAX_RETRIES times by
+    rewinding the status the router dispatches it from; after that the task
+    is handed to a human. Returns the action taken.
+    """
+    config = {"configurable": {"thread_id": task_id}}
+    try:
+        async with thread_lock(task_id) as lease:
+            current_state = await run_blocking(get_shared_graph_app().get_state, config)
+            values = current_state.values if current_state else {}
+            status = values.get("status")
+            if status not in WAITING_STATUSES:
+                # 結果已送達 (可能由其他 replica 處理)，或任務不存在
+                await run_blocking(cancel_task_deadline, task_id)
+                return "stale"
+
+            dispatch_status, agent_name, _ = WAITING_STATUSES[status]
+            retries = dict(values.get("deadline_retries") or {})
+            attempt = retries.get(status, 0)
+            if attempt < TASK_DEADLINE_MAX_RETRIES:
+                action = "retry"
+                retries[status] = attempt + 1
+                message = AIMessage(content=f"No result from {agent_name} within {TASK_DEADLINE_SECONDS:.0f}s. "
+                                            f"Dispatching the task again (retry {attempt + 1}/{TASK_DEADLINE_MAX_RETRIES}).")
+                state_update = {"status": dispatch_status, "deadline_retries": retries}
+            else:
+                action = "hitl"
+                message = AIMessage(content=f"No result from {agent_name} after {attempt + 1} attempts. Handing the task to a human.")
+                state_update = {
+                    "status": "awaiting_human_input",
+                    "needs_info": [f"{agent_name} did not return a result after {attempt + 1} attempts; please review the loan case."],
+                    "resume_status": dispatch_status,
+                }
+            logger.warning("Task %s timed out in status '%s' (attempt %d): %s", task_id, status, attempt + 1, action)
+            state_update.update(stage_transition(values, state_update["status"]))
+            state_update["messages"] = [message]
+
+            lease.check()
+            await run_blocking(update_task_state, config, state_update, as_node=CALLBACK_RESUME_NODE)
+            archive_messages(task_id, [message])
+            lease.check()
+            final_state = await run_blocking(run_graph, None, config)
+            await run_blocking(record_task, final_state)
+            return action
+    except ThreadBusyError:
+        # 正在處理 callback / HITL 回覆；lease 到期後再檢查
+        return "busy"
+
+@app.post("/callbacks", status_code=200)
+async def handle_callback(request: CallbackRequest):
+    """
+    Endpoint to receive results from remote agents over HTTP.
+    Results on SQS.callback are consumed in-process by SQSCallbackConsumer.
+    This resumes the graph execution.
+    """
+    if not await process_callback(request):
+        return {"message": f"Duplicate callback for task {request.task_id} ignored.", "duplicate": True}
+    return {"message": f"Callback for task {request.task_id} processed."}
 
 
 @app.post("/tasks/{task_id}/answers", status_code=200)
@@ -156,39 +585,53 @@ async def submit_hitl_answer(task_id: str, request: HITLAnswerRequest):
     """
     Endpoint for a human to submit required information, resuming the graph.
     """
-    logger.info(f"Received HITL answer for task {task_id}.")
+    logger.info("Received HITL answer for task %s.", task_id)
     config = {"configurable": {"thread_id": task_id}}
     
     try:
-        current_state = graph_app.get_state(config)
-        if not current_state:
-            raise HTTPException(status_code=404, detail=f"Task with ID '{task_id}' not found.")
-        
-        if current_state.values.get("status") != "needs_human_input":
-             raise HTTPException(status_code=400, detail=f"Task '{task_id}' is not awaiting human input.")
-
-        # Update the state with the human's answer and change status to resume
-        # The specific next status depends on your workflow logic. Let's assume after HITL,
-        # it might need to go back to Agent A or B. We'll set a generic "resuming" status
-        # and let the router decide.
-        graph_app.update_state(
-            config,
-            {
-                "human_answer": request.answer,
-                "status": "resuming_after_hitl" # A new status for the router to catch
-            }
-        )
+        async with thread_lock(task_id) as lease:
+            current_state = await run_blocking(get_shared_graph_app().get_state, config)
+            if not current_state.values:
+                raise HTTPException(status_code=404, detail=f"Task with ID '{task_id}' not found.")
+
+            if current_state.values.get("status") != "awaiting_human_input":
+                raise HTTPException(status_code=400, detail=f"Task '{task_id}' is not awaiting human input.")
 
-        # Resume the graph with the human's answer as input
-        human_message = HumanMessage(content=f"Human provided answer: {request.answer}")
-        graph_app.invoke({"messages": [human_message]}, config)
+            # Resume like a callback: update the state as the interrupted node and
+            # continue from the interrupt. The router dispatches the stage that
+            # was handed to a human again, now with the human's answer.
+            resume_status = current_state.values.get("resume_status") or "new"
+            human_message = HumanMessage(content=f"Human provided answer: {request.answer}")
+            lease.check()
+            await run_blocking(
+                update_task_state,
+                config,
+                {
+                    "human_answer": request.answer,
+                    "status": resume_status,
+                    "needs_info": [],
+                    "messages": [human_message],
+                    **stage_transition(current_state.values, resume_status),
+                },
+                as_node=CALLBACK_RESUME_NODE,
+            )
+            archive_messages(task_id, [human_message])
+            lease.check()
+            final_state = await run_blocking(run_graph, None, config)
+            await run_blocking(record_task, final_state)
+            prune_if_finished(task_id, final_state)
         
+    except ThreadBusyError as e:
+        raise HTTPException(status_code=409, detail=f"{e} Retry the answer shortly.", headers={"Retry-After": "1"})
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error processing HITL answer for task {task_id}. Error: {e}")
+        logger.error("Error processing HITL answer for task %s. Error: %s", task_id, e)
         raise HTTPException(status_code=500, detail=f"Failed to process HITL answer: {e}")
 
     return {"message": f"HITL answer for task {task_id} submitted and workflow resumed."}
 
 if __name__ == "__main__":
     # 這裡就用你指定的寫法；注意：reload 在容器內要搭配掛載原始碼才看得到變更
-    uvicorn.run(app="main:app", host="0.0.0.0", port=PORT)
+    # WEB_CONCURRENCY > 1 時同一個 pod 跑多個 worker process；同一個 task 的處理由 thread_lock 跨 process 序列化
+    uvicorn.run(app="main:app", host="0.0.0.0", port=PORT, workers=int(os.environ.get("WEB_CONCURRENCY", "1")))
@@ -0,0 +1,349 @@
+# a2a_cash_flow_demo/services/root-agent/benchmarks/bench_load.py
+
+"""
+Root-agent throughput and latency under load, without an AWS account.
+
+The app runs in this process under uvicorn with local stand-ins for every
+AWS dependency: CHECKPOINT_BACKEND=memory (InMemorySaver behind the same
+serializer and instrumentation as in production), a
+FakeEventBridgeClient, FakeDynamoDBTable for the status projection and
+checkpoint pruning, and a FakeSQSClient as SQS.callback when
+--callbacks sqs. Two stub remote agents receive every dispatched event (as
+the EventBridge rules would route it) and answer after --agent-ms.
+
+Each of --concurrency virtual users runs full task lifecycles over HTTP:
+
+    POST /tasks -> agent A callback -> agent B callback -> completed
+    -> GET /tasks/{task_id} (checks the projection says "completed")
+
+--callbacks http: the stub agents POST /callbacks (latency recorded per
+endpoint). --callbacks sqs: they put the callback on the fake queue and
+the in-process consumer applies it; users poll GET /tasks/{task_id}.
+
+Reported: completed tasks/s and p50/p95/p99 per endpoint plus the whole
+lifecycle. The load generator shares the process (and the GIL) with the
+app, and fake AWS calls cost no network time, so absolute numbers are an
+upper bound; compare runs on the same machine.
+
+--output writes the results as JSON; --baseline compares against such a
+file and exits 1 when tasks/s dropped or a p95 rose by more than --tolerance.
+
+    cd services/root-agent
+    python benchmarks/bench_load.py --tasks 500 --concurrency 50 --output load.json
+    python benchmarks/bench_load.py --tasks 500 --concurrency 50 --baseline load.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import socket
+import asyncio
+import argparse
+from typing import Any, Dict, List, Optional
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+sys.path.insert(0, APP_DIR)
+
+CALLBACK_QUEUE = "local://callback"
+LIFECYCLE = "lifecycle"
+# detail-type -> (source, status reported by the callback)
+REMOTE_AGENTS = {
+    "Task.RecognizeTransactions": ("remote-agent-a", "transactions_recognized"),
+    "Task.DraftResponse": ("remote-agent-b", "response_drafted"),
+}
+CATEGORIES = ("salary", "rent", "utilities", "transfer_in", "transfer_out", "card_payment", "loan_repayment", "other")
+
+
+def app_env(args: argparse.Namespace) -> None:
+    """
+    Must run before the app is imported: its modules read their
+    configuration at import time.
+    """
+    os.environ.update({
+        "CHECKPOINT_BACKEND": "memory",
+        "LOG_LEVEL": "WARNING",
+        "AWS_REGION": "ap-southeast-1",
+        "REMOTE_DISPATCH_MODE": "event",
+        "REMOTE_ASYNC_RESULT_MODE": "event",
+    })
+    for name in ("REDIS_HOST", "CALLBACK_QUEUE_URL", "DDB_A2A_AUDIT_TABLE_NAME", "CHECKPOINT_SPILL_BUCKET"):
+        os.environ.pop(name, None)
+    if args.callbacks == "sqs":
+        os.environ["CALLBACK_QUEUE_URL"] = CALLBACK_QUEUE
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    def observe(self, name: str, seconds: float) -> None:
+        self.latencies.setdefault(name, []).append(seconds)
+
+    def error(self, name: str, reason: Any) -> None:
+        key = f"{name} {reason}"
+        self.errors[key] = self.errors.get(key, 0) + 1
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q * len(ordered)) - 1))]
+
+
+class StubRemoteAgents:
+    """
+    Plays remote agents A and B: each dispatched event is answered after
+    `delay` seconds with a successful callback, over HTTP or on the callback
+    queue. Completion of a task (agent B's callback applied) resolves the
+    future registered for it, in HTTP mode.
+    """
+
+    def __init__(self, http: Any, recorder: Recorder, delay: float, transactions: int, sqs: Any = None):
+        self.http = http
+        self.recorder = recorder
+        self.delay = delay
+        self.transactions = transactions
+        self.sqs = sqs
+        self.finished: Dict[str, asyncio.Future] = {}
+        self.rng = random.Random(7)
+        self._tasks: set = set()
+
+    def deliver(self, entry: Dict[str, Any]) -> None:
+        task = asyncio.create_task(self._answer(entry))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _result(self, detail_type: str) -> Dict[str, Any]:
+        if detail_type != "Task.RecognizeTransactions":
+            return {"draft": "Cash flow is stable over the last 12 months."}
+        return {"transactions": [
+            {"amount": round(self.rng.uniform(-50000, 80000), 2), "category": self.rng.choice(CATEGORIES)}
+            for _ in range(self.transactions)
+        ]}
+
+    async def _answer(self, entry: Dict[str, Any]) -> None:
+        await asyncio.sleep(self.delay)
+        detail = json.loads(entry["Detail"])
+        source, status = REMOTE_AGENTS[entry["DetailType"]]
+        payload = {
+            "task_id": detail["task_id"],
+            "source": source,
+            "status": status,
+            "result": self._result(entry["DetailType"]),
+            "event_id": entry["EventId"],
+        }
+        if self.sqs is not None:
+            self.sqs.send_message(QueueUrl=CALLBACK_QUEUE, MessageBody=json.dumps(payload))
+            return
+        # 和真正的 remote agent 一樣，5xx (例如 thread 忙碌) 稍後重送
+        for attempt in range(5):
+            started = time.perf_counter()
+            try:
+                response = await self.http.post("/callbacks", json=payload)
+            except Exception as e:
+                self.recorder.error("POST /callbacks", type(e).__name__)
+                await asyncio.sleep(0.1 * (attempt + 1))
+                continue
+            self.recorder.observe("POST /callbacks", time.perf_counter() - started)
+            if response.status_code == 200:
+                break
+            self.recorder.error("POST /callbacks", response.status_code)
+            if response.status_code < 500:
+                break
+            await asyncio.sleep(float(response.headers.get("Retry-After", "0.1")))
+        if status == "response_drafted":
+            future = self.finished.get(detail["task_id"])
+            if future is not None and not future.done():
+                future.set_result(None)
+
+
+def install_fakes(main: Any, agents: StubRemoteAgents, sqs: Any) -> Any:
+    from a2a import compaction, projection, tools
+    from a2a.fakes import FakeDynamoDBTable, FakeEventBridgeClient
+
+    loop = asyncio.get_running_loop()
+
+    class RoutedEventBridge(FakeEventBridgeClient):
+        # EventBridge rules -> remote agents; put_events runs on the dispatcher thread
+        def put_events(self, Entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+            response = super().put_events(Entries)
+            for entry, result in zip(Entries, response["Entries"]):
+                if "EventId" in result:
+                    loop.call_soon_threadsafe(agents.deliver, {**entry, "EventId": result["EventId"]})
+            return response
+
+    eventbridge = RoutedEventBridge()
+    tools.eventbridge_client = eventbridge
+    projection._store = projection.TaskProjectionStore(FakeDynamoDBTable())
+    compaction._checkpoint_table = FakeDynamoDBTable()
+    if sqs is not None:
+        main.create_sqs_client = lambda: sqs
+    return eventbridge
+
+
+async def run_task(http: Any, agents: StubRemoteAgents, recorder: Optional[Recorder], args: argparse.Namespace, index: int) -> None:
+    recorder = recorder or Recorder()
+    started = time.perf_counter()
+    response = await http.post("/tasks", json={"loan_case_id": f"case-{index % 97:04d}"})
+    recorder.observe("POST /tasks", time.perf_counter() - started)
+    if response.status_code != 202:
+        recorder.error("POST /tasks", response.status_code)
+        return
+    task_id = response.json()["task_id"]
+
+    deadline = started + args.task_timeout
+    status = None
+    if args.callbacks == "http":
+        future = agents.finished.setdefault(task_id, asyncio.get_running_loop().create_future())
+        try:
+            await asyncio.wait_for(future, args.task_timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            agents.finished.pop(task_id, None)
+    while time.perf_counter() < deadline:
+        polled = time.perf_counter()
+        response = await http.get(f"/tasks/{task_id}")
+        recorder.observe("GET /tasks/{task_id}", time.perf_counter() - polled)
+        status = response.json().get("status") if response.status_code == 200 else response.status_code
+        if status == "completed" or args.callbacks == "http":
+            break
+        await asyncio.sleep(args.poll_ms / 1000.0)
+    if status == "completed":
+        recorder.observe(LIFECYCLE, time.perf_counter() - started)
+    else:
+        recorder.error(LIFECYCLE, f"ended in {status}")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    import httpx
+    import uvicorn
+
+    app_env(args)
+    import main
+    from a2a.fakes import FakeSQSClient
+
+    recorder = Recorder()
+    port = free_port()
+    limits = httpx.Limits(max_connections=args.concurrency * 3 + 10, max_keepalive_connections=args.concurrency * 3 + 10)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=args.task_timeout) as http:
+        sqs = FakeSQSClient() if args.callbacks == "sqs" else None
+        agents = StubRemoteAgents(http, Recorder(), args.agent_ms / 1000.0, args.transactions, sqs)
+        eventbridge = install_fakes(main, agents, sqs)
+
+        server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning", lifespan="on"))
+        serving = asyncio.create_task(server.serve())
+        try:
+            while not server.started or (await http.get("/readyz")).status_code != 200:
+                if serving.done():
+                    serving.result()
+                    raise RuntimeError("uvicorn exited before the app was ready")
+                await asyncio.sleep(0.05)
+
+            # 不計入結果的暖身 (首次編譯、連線建立)
+            await asyncio.gather(*(run_task(http, agents, None, args, i) for i in range(args.warmup)))
+            agents.recorder = recorder
+            warmup_calls = len(eventbridge.calls)
+
+            remaining = iter(range(args.tasks))
+
+            async def user() -> None:
+                for index in remaining:
+                    await run_task(http, agents, recorder, args, index)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(user() for _ in range(args.concurrency)))
+            elapsed = time.perf_counter() - started
+        finally:
+            server.should_exit = True
+            await serving
+
+    completed = len(recorder.latencies.get(LIFECYCLE, []))
+    return {
+        "config": {
+            "tasks": args.tasks,
+            "concurrency": args.concurrency,
+            "callbacks": args.callbacks,
+            "agent_ms": args.agent_ms,
+            "transactions": args.transactions,
+            "python": sys.version.split()[0],
+        },
+        "elapsed_seconds": elapsed,
+        "completed": completed,
+        "tasks_per_second": completed / elapsed,
+        "put_events_calls": len(eventbridge.calls) - warmup_calls,
+        "errors": recorder.errors,
+        "endpoints": {
+            name: {
+                "count": len(values),
+                "p50_ms": percentile(values, 0.50) * 1000,
+                "p95_ms": percentile(values, 0.95) * 1000,
+                "p99_ms": percentile(values, 0.99) * 1000,
+                "max_ms": max(values) * 1000,
+            }
+            for name, values in sorted(recorder.latencies.items())
+        },
+    }
+
+
+def report(results: Dict[str, Any]) -> None:
+    print(f"completed     {results['completed']}/{results['config']['tasks']} tasks in {results['elapsed_seconds']:.2f}s "
+          f"-> {results['tasks_per_second']:.1f} tasks/s ({results['put_events_calls']} put_events calls)")
+    print(f"{'endpoint':<24} {'count':>7} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+    for name, r in results["endpoints"].items():
+        print(f"{name:<24} {r['count']:>7} {r['p50_ms']:>7.1f}ms {r['p95_ms']:>7.1f}ms {r['p99_ms']:>7.1f}ms {r['max_ms']:>7.1f}ms")
+    for error, count in sorted(results["errors"].items()):
+        print(f"error         {error}: {count}")
+
+
+def compare(results: Dict[str, Any], baseline_path: str, tolerance: float) -> bool:
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    checks = [("tasks/s", baseline["tasks_per_second"], results["tasks_per_second"], False)]
+    for name, before in baseline["endpoints"].items():
+        after = results["endpoints"].get(name)
+        if after is not None:
+            checks.append((f"{name} p95", before["p95_ms"], after["p95_ms"], True))
+    ok = True
+    for metric, before, after, lower_is_better in checks:
+        change = after / before - 1 if before else 0.0
+        regressed = change > tolerance if lower_is_better else change < -tolerance
+        ok = ok and not regressed
+        print(f"{metric:<28} {before:9.1f} -> {after:9.1f}  {change:+6.1%}{'  REGRESSION' if regressed else ''}")
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20, help="virtual users, each running one task at a time")
+    parser.add_argument("--callbacks", choices=("http", "sqs"), default="http")
+    parser.add_argument("--agent-ms", type=float, default=20.0, help="stub remote agent processing time")
+    parser.add_argument("--transactions", type=int, default=20, help="transactions in agent A's result")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--poll-ms", type=float, default=20.0, help="GET /tasks/{task_id} interval with --callbacks sqs")
+    parser.add_argument("--task-timeout", type=float, default=30.0)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON file from an earlier --output to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed change before failing, e.g. 0.2 = 20%%")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    report(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline and not compare(results, args.baseline, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# a2a_cash_flow_demo/services/root-agent/benchmarks/bench_logging.py
+
+"""
+Per-request logging overhead, before and after the logging overhaul.
+
+"before": basicConfig(DEBUG) on a synchronous stream handler, eager
+f-strings and the full AgentState attached to every debug record.
+"after":  configure_logging() - INFO by default (or sampled DEBUG), lazy
+%-formatting, state summaries and a QueueHandler feeding a background thread.
+
+A "request" mimics what one task pass emits: a handful of INFO lines plus
+an enter/leave debug pair per node. Output goes to /dev/null so the numbers
+measure formatting and handler work in the request thread, not the terminal.
+
+    cd services/root-agent
+    python benchmarks/bench_logging.py --requests 5000
+"""
+
+import os
+import sys
+import time
+import uuid
+import logging
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from langchain_core.messages import AIMessage, HumanMessage  # noqa: E402
+
+NODES = ("start_node", "draft_response_node", "human_in_the_loop_node", "finish_node")
+
+
+def make_state(history: int) -> dict:
+    messages = []
+    for i in range(history):
+        messages.append(HumanMessage(content=f"transaction batch {i}: " + "x" * 400))
+        messages.append(AIMessage(content=f"recognized {i}: " + "y" * 400))
+    return {
+        "task_id": str(uuid.uuid4()),
+        "loan_case_id": "case-0001",
+        "status": "drafting_response",
+        "messages": messages,
+    }
+
+
+def reset_root() -> None:
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+
+
+def run_before(states: list, requests: int, sink) -> float:
+    reset_root()
+    logging.basicConfig(
+        level=logging.DEBUG,
+        stream=sink,
+        format='%(asctime)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s',
+    )
+    logging.getLogger("langgraph").setLevel(logging.DEBUG)
+    logger = logging.getLogger("bench.before")
+
+    start = time.perf_counter()
+    for i in range(requests):
+        state = states[i % len(states)]
+        logger.info(f"Received request to create task for loan case: {state['loan_case_id']}. Assigned Task ID: {state['task_id']}")
+        for node in NODES:
+            logger.debug(f"Enter node={node}", extra={"state": state})
+            logging.info(f"[Task: {state['task_id']}] Routing based on status: '{state['status']}'")
+            logger.debug(f"Leave node={node}")
+    return time.perf_counter() - start
+
+
+def run_after(states: list, requests: int, sink) -> tuple:
+    reset_root()
+    from a2a import logging_config
+    from a2a.logging_config import configure_logging, debug_enabled, shutdown_logging, summarize_state
+
+    configure_logging(stream=sink)
+    logger = logging.getLogger("bench.after")
+
+    start = time.perf_counter()
+    for i in range(requests):
+        state = states[i % len(states)]
+        logger.info("Received request to create task for loan case: %s. Assigned Task ID: %s", state["loan_case_id"], state["task_id"])
+        for node in NODES:
+            sampled = debug_enabled(logger, state["task_id"])
+            if sampled:
+                logger.debug("Enter node=%s", node, extra={"task_id": state["task_id"], "state": summarize_state(state)})
+            logger.info("[Task: %s] Routing based on status: '%s'", state["task_id"], state["status"])
+            if sampled:
+                logger.debug("Leave node=%s", node, extra={"task_id": state["task_id"]})
+    elapsed = time.perf_counter() - start
+    # 等背景執行緒寫完所有 record，回報總成本
+    shutdown_logging()
+    drained = time.perf_counter() - start
+    logging_config._listener = None
+    return elapsed, drained
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--history", type=int, default=10, help="message pairs in the simulated state")
+    args = parser.parse_args()
+
+    # States are built up front so only logging is timed
+    states = [make_state(args.history) for _ in range(min(args.requests, 500))]
+    with open(os.devnull, "w") as sink:
+        before = run_before(states, args.requests, sink)
+        after, drained = run_after(states, args.requests, sink)
+
+    def per_request(total: float) -> float:
+        return total / args.requests * 1e6
+
+    print(f"requests={args.requests} history={args.history} "
+          f"LOG_LEVEL={os.getenv('LOG_LEVEL', 'INFO')} LOG_FORMAT={os.getenv('LOG_FORMAT', 'json')}")
+    print(f"before: {per_request(before):9.1f} us/request (request thread)")
+    print(f"after:  {per_request(after):9.1f} us/request (request thread)")
+    print(f"after:  {per_request(drained):9.1f} us/request (including background drain)")
+    if per_request(after):
+        print(f"speedup: {per_request(before) / per_request(after):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+# a2a_cash_flow_demo/services/root-agent/benchmarks/bench_serde.py
+
+"""
+Checkpoint size and (de)serialization cost: LangGraph's default serializer
+versus the compact one (a2a/serde.py) with zlib and zstd.
+
+Each scenario is a checkpoint as DynamoDBSaver writes it: AgentState in
+channel_values, with the message window filled by the messages a task
+accumulates - dispatch notes plus ToolMessages carrying remote-agent results
+(recognized transactions rendered as text, as main.py does for callbacks).
+"transactions" sets how many transactions each result lists.
+
+Reported per serializer: item bytes, DynamoDB write units (1 KB each, the
+billing unit), and median encode / decode time. "spill" adds the S3 spill
+against an in-memory S3 stand-in, so it shows which blobs would leave the
+item; its timings exclude network round trips.
+
+    cd services/root-agent
+    python benchmarks/bench_serde.py --repeat 200
+    python benchmarks/bench_serde.py --output serde.json
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import uuid
+import random
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage  # noqa: E402
+from langgraph.checkpoint.base import empty_checkpoint  # noqa: E402
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer  # noqa: E402
+
+from a2a.fakes import FakeS3Client  # noqa: E402
+from a2a.serde import CompactSerializer, S3BlobStore, spill_scope  # noqa: E402
+
+# name -> (messages in the window, transactions per remote-agent result)
+SCENARIOS = {
+    "started": (2, 0),
+    "recognized": (4, 50),
+    "drafted": (8, 200),
+    "full_window": (20, 200),
+    "oversized": (20, 1500),
+    "spilled": (20, 3000),
+}
+CATEGORIES = ("salary", "rent", "utilities", "transfer_in", "transfer_out", "card_payment", "loan_repayment", "other")
+
+
+def recognized_transactions(rng: random.Random, count: int) -> dict:
+    transactions = [
+        {
+            "date": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "description": f"{rng.choice(CATEGORIES).upper()} REF{rng.randint(100000, 999999)}",
+            "amount": round(rng.uniform(-50000, 80000), 2),
+            "currency": "TWD",
+            "category": rng.choice(CATEGORIES),
+            "confidence": round(rng.random(), 3),
+        }
+        for _ in range(count)
+    ]
+    return {"transactions": transactions, "summary": {"count": count, "net": round(sum(t["amount"] for t in transactions), 2)}}
+
+
+def make_checkpoint(rng: random.Random, messages: int, transactions: int) -> dict:
+    task_id = str(uuid.UUID(int=rng.getrandbits(128)))
+    window = [HumanMessage(content="Start processing for loan case ID: case-0001")]
+    while len(window) < messages:
+        window.append(AIMessage(content="Task has been dispatched to Remote Agent A to recognize transaction details. Awaiting callback."))
+        result = recognized_transactions(rng, transactions)
+        window.append(ToolMessage(
+            content=f"Received result from remote-agent-a: {result}",
+            name="remote-agent-a",
+            tool_call_id=str(uuid.UUID(int=rng.getrandbits(128))),
+        ))
+    checkpoint = empty_checkpoint()
+    checkpoint["channel_values"] = {
+        "task_id": task_id,
+        "loan_case_id": "case-0001",
+        "status": "transactions_recognized",
+        "messages": window[:messages],
+        "needs_info": [],
+        "human_answer": "",
+        "status_since": 1760000000.0,
+        "created_at": 1760000000.0,
+        "deadline_retries": {"recognizing_transactions": 0},
+    }
+    checkpoint["channel_versions"] = {name: f"{len(window):032d}.0.{rng.random()}" for name in checkpoint["channel_values"]}
+    return checkpoint
+
+
+def serializers() -> dict:
+    inner = JsonPlusSerializer()
+    return {
+        "default": inner,
+        "compact_zlib": CompactSerializer(inner, compression="zlib", level=6),
+        "compact_zstd": CompactSerializer(inner, compression="zstd", level=3),
+        "compact_zstd+spill": CompactSerializer(inner, compression="zstd", level=3, spill_store=S3BlobStore(FakeS3Client(), "bench")),
+    }
+
+
+def measure(serde, checkpoint: dict, repeat: int) -> dict:
+    encode, decode = [], []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        typed = serde.dumps_typed(checkpoint)
+        encode.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        serde.loads_typed(typed)
+        decode.append(time.perf_counter() - started)
+    size = len(typed[1])
+    return {
+        "bytes": size,
+        "write_units": math.ceil(size / 1024),
+        "fits_item": size < 400 * 1024,
+        "encode_us": statistics.median(encode) * 1e6,
+        "decode_us": statistics.median(decode) * 1e6,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    results = {}
+    for scenario, (messages, transactions) in SCENARIOS.items():
+        checkpoint = make_checkpoint(rng, messages, transactions)
+        # 只有 checkpointer 寫入 (spill_scope 內) 才會外溢到 S3
+        with spill_scope(checkpoint["channel_values"]["task_id"]):
+            results[scenario] = {name: measure(serde, checkpoint, args.repeat) for name, serde in serializers().items()}
+
+    print(f"{'scenario':<12} {'serializer':<20} {'bytes':>9} {'WCU':>5} {'ratio':>6} {'encode':>10} {'decode':>10}")
+    for scenario, by_serde in results.items():
+        baseline = by_serde["default"]["bytes"]
+        for name, r in by_serde.items():
+            note = "" if r["fits_item"] else "  > 400 KB item limit"
+            print(f"{scenario:<12} {name:<20} {r['bytes']:>9} {r['write_units']:>5} {r['bytes'] / baseline:>6.2f} "
+                  f"{r['encode_us']:>8.0f}us {r['decode_us']:>8.0f}us{note}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+# a2a_cash_flow_demo/services/root-agent/benchmarks/bench_startup.py
+
+"""
+Cold-start cost of the root agent, for tracking as a regression metric.
+
+"import":      `python -X importtime -c "import main"` - cumulative import
+               time of the app module, plus its heaviest direct imports.
+"first 200":   uvicorn started in a fresh process until GET /healthz answers
+               200 (the process accepts traffic; liveness passes).
+"ready":       the same process until GET /readyz answers 200 (warm-up done:
+               graph compiled, clients created, background consumers up).
+
+Every number is the median of --runs fresh processes. The server runs with
+CHECKPOINT_BACKEND=memory and without REDIS_HOST / CALLBACK_QUEUE_URL, so it
+needs no AWS account; "ready" therefore excludes the DynamoDB DescribeTable
+round trip a real replica makes.
+
+--output writes the medians as JSON; --baseline compares against such a file
+and exits 1 when a metric got slower by more than --tolerance.
+
+    cd services/root-agent
+    python benchmarks/bench_startup.py --runs 5 --output startup.json
+    python benchmarks/bench_startup.py --runs 5 --baseline startup.json
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import statistics
+import subprocess
+import urllib.error
+import urllib.request
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+METRICS = ("import_seconds", "first_200_seconds", "ready_seconds")
+
+
+def app_env() -> dict:
+    env = dict(os.environ)
+    env.update({"CHECKPOINT_BACKEND": "memory", "LOG_LEVEL": "WARNING", "AWS_REGION": "ap-southeast-1"})
+    for name in ("REDIS_HOST", "CALLBACK_QUEUE_URL"):
+        env.pop(name, None)
+    return env
+
+
+def parse_importtime(stderr: str, module: str = "main"):
+    """
+    Returns (total seconds, [(cumulative seconds, name)] of direct imports).
+    """
+    total, children = 0.0, []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line.split(":", 1)[1].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth == 0 and name.strip() == module:
+            total = int(cumulative) / 1e6
+        elif depth == 1:
+            children.append((int(cumulative) / 1e6, name.strip()))
+    return total, sorted(children, reverse=True)
+
+
+def measure_import():
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=APP_DIR, env=app_env(), capture_output=True, text=True, check=True,
+    )
+    return parse_importtime(result.stderr)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def status_of(url: str) -> int:
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except OSError:
+        return 0
+
+
+def measure_server(timeout: float):
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=APP_DIR, env=app_env(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    first_200 = ready = None
+    try:
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {process.returncode}")
+            if first_200 is None and status_of(f"http://127.0.0.1:{port}/healthz") == 200:
+                first_200 = time.perf_counter() - started
+            if first_200 is not None and status_of(f"http://127.0.0.1:{port}/readyz") == 200:
+                ready = time.perf_counter() - started
+                break
+            time.sleep(0.01)
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+    if ready is None:
+        raise RuntimeError(f"not ready within {timeout:.0f}s")
+    return first_200, ready
+
+
+def compare(results: dict, baseline_path: str, tolerance: float) -> bool:
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    ok = True
+    for metric in METRICS:
+        before, after = baseline[metric], results[metric]
+        change = after / before - 1
+        regressed = change > tolerance
+        ok = ok and not regressed
+        print(f"{metric:<18} {before:7.3f}s -> {after:7.3f}s  {change:+6.1%}{'  REGRESSION' if regressed else ''}")
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8, help="heaviest direct imports to list")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--output", help="write the medians to this JSON file")
+    parser.add_argument("--baseline", help="JSON file from an earlier --output to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before failing, e.g. 0.2 = 20%%")
+    args = parser.parse_args()
+
+    imports, first_200s, readies = [], [], []
+    children = []
+    for _ in range(args.runs):
+        total, children = measure_import()
+        imports.append(total)
+        first_200, ready = measure_server(args.timeout)
+        first_200s.append(first_200)
+        readies.append(ready)
+
+    results = {
+        "import_seconds": statistics.median(imports),
+        "first_200_seconds": statistics.median(first_200s),
+        "ready_seconds": statistics.median(readies),
+        "runs": args.runs,
+        "python": sys.version.split()[0],
+    }
+    print(f"import main   {results['import_seconds']:7.3f}s  (min {min(imports):.3f}s)")
+    for cumulative, name in children[:args.top]:
+        print(f"  {name:<40} {cumulative:7.3f}s")
+    print(f"first 200     {results['first_200_seconds']:7.3f}s  (min {min(first_200s):.3f}s)")
+    print(f"ready         {results['ready_seconds']:7.3f}s  (min {min(readies):.3f}s)")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline and not compare(results, args.baseline, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+# a2a_cash_flow_demo/services/root-agent/tests/conftest.py
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+# main.py / graph.py 在 import 時讀取設定：測試使用 in-process checkpoint、不連 Redis / AWS
+os.environ.setdefault("CHECKPOINT_BACKEND", "memory")
+os.environ.setdefault("TASK_DEADLINE_ENABLED", "false")
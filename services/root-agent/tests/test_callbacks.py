@@ -0,0 +1,71 @@
+# a2a_cash_flow_demo/services/root-agent/tests/test_callbacks.py
+
+from unittest import mock
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from a2a import tools
+
+
+@pytest.fixture
+def client():
+    with TestClient(main.app) as client:
+        yield client
+
+
+def task_values(task_id: str) -> dict:
+    return main.get_shared_graph_app().get_state({"configurable": {"thread_id": task_id}}).values
+
+
+def callback(task_id: str, source: str, status: str, event_id: str, **fields) -> dict:
+    return {"task_id": task_id, "source": source, "status": status, "result": {}, "event_id": event_id, **fields}
+
+
+def dispatched(**kwargs) -> dict:
+    return {"status": "success", "mode": "event", "message": "dispatched"}
+
+
+def test_callback_before_first_checkpoint_is_applied(client):
+    pending = []
+
+    def answer_immediately(**kwargs):
+        if kwargs["detail_type"] == "Task.RecognizeTransactions":
+            # Remote Agent A 在 start_node 的 checkpoint 寫入前就回報結果
+            request = main.CallbackRequest(**callback(kwargs["task_id"], "remote-agent-a", "transactions_recognized", "fast"))
+            pending.append(client.portal.start_task_soon(main.process_callback, request))
+        return dispatched()
+
+    with mock.patch.object(tools, "invoke_remote_agent", side_effect=answer_immediately):
+        task_id = client.post("/tasks", json={"loan_case_id": "case-1"}).json()["task_id"]
+        assert pending[0].result(timeout=10) is True
+
+    assert task_values(task_id)["status"] == "drafting_response"
+
+
+def test_callback_from_other_agent_is_dropped(client):
+    with mock.patch.object(tools, "invoke_remote_agent", side_effect=dispatched):
+        task_id = client.post("/tasks", json={"loan_case_id": "case-2"}).json()["task_id"]
+        response = client.post("/callbacks", json=callback(task_id, "remote-agent-b", "response_drafted", "late"))
+
+    assert response.status_code == 409
+    assert task_values(task_id)["status"] == "recognizing_transactions"
+
+
+def test_human_answer_resumes_the_stage(client):
+    with mock.patch.object(tools, "invoke_remote_agent", side_effect=dispatched) as invoke:
+        task_id = client.post("/tasks", json={"loan_case_id": "case-3"}).json()["task_id"]
+        client.post("/callbacks", json=callback(task_id, "remote-agent-a", "transactions_recognized", "e1",
+                                                needs_info=["statement period?"]))
+        assert task_values(task_id)["status"] == "awaiting_human_input"
+
+        response = client.post(f"/tasks/{task_id}/answers", json={"answer": "2025-01"})
+
+    assert response.status_code == 200
+    assert task_values(task_id)["status"] == "recognizing_transactions"
+    assert [call.kwargs["detail_type"] for call in invoke.call_args_list] == ["Task.RecognizeTransactions"] * 2
+
+
+def test_answer_for_unknown_task_is_404(client):
+    assert client.post("/tasks/missing/answers", json={"answer": "x"}).status_code == 404
@@ -0,0 +1,87 @@
+# a2a_cash_flow_demo/services/root-agent/tests/test_checkpoint_cache.py
+
+import time
+
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.memory import InMemorySaver
+
+from a2a.checkpoint import CachedCheckpointSaver, CheckpointWriteLost
+from a2a.fakes import FakeRedis
+
+CONFIG = {"configurable": {"thread_id": "task-1", "checkpoint_ns": ""}}
+
+
+def make_saver(redis: FakeRedis, **kwargs) -> CachedCheckpointSaver:
+    return CachedCheckpointSaver(InMemorySaver(), redis, retry_seconds=0.2, **kwargs)
+
+
+def put(saver: CachedCheckpointSaver, checkpoint_id: str, config=CONFIG) -> dict:
+    checkpoint = empty_checkpoint()
+    checkpoint["id"] = checkpoint_id
+    return saver.put(config, checkpoint, {"source": "loop", "step": 0}, {})
+
+
+def latest_id(saver: CachedCheckpointSaver) -> str:
+    return saver.get_tuple(CONFIG).checkpoint["id"]
+
+
+def test_serves_latest_checkpoint_from_cache():
+    redis = FakeRedis()
+    saver = make_saver(redis)
+    put(saver, "c1")
+    redis.fail = True
+    # durable 與快取都寫過 c1；Redis 故障時退回 durable
+    assert latest_id(saver) == "c1"
+
+
+def test_put_during_backoff_does_not_leave_old_checkpoint_cached():
+    redis = FakeRedis()
+    saver = make_saver(redis)
+    put(saver, "c1")
+
+    redis.fail = True
+    assert latest_id(saver) == "c1"  # get fails -> backoff
+    redis.fail = False
+    put(saver, "c2")  # durable only; Redis still holds c1
+
+    time.sleep(0.3)
+    assert latest_id(saver) == "c2"
+
+
+def test_failed_cache_refresh_is_invalidated_once_redis_is_back():
+    redis = FakeRedis()
+    saver = make_saver(redis)
+    put(saver, "c1")
+
+    redis.fail = True
+    put(saver, "c2")  # durable write succeeds, refresh and delete fail
+    redis.fail = False
+    assert latest_id(saver) == "c2"  # still in backoff: durable
+
+    time.sleep(0.3)
+    assert latest_id(saver) == "c2"
+    key = saver._key(CONFIG)
+    cached = saver._cache_get(key)
+    assert cached is None or cached["checkpoint"]["id"] == "c2"
+
+
+def test_lost_write_behind_write_raises_once():
+    class FailingSaver(InMemorySaver):
+        def put(self, *args, **kwargs):
+            raise RuntimeError("DynamoDB down")
+
+    saver = CachedCheckpointSaver(
+        FailingSaver(), FakeRedis(), write_behind=True, write_retries=1, write_backoff_seconds=0.0
+    )
+    try:
+        put(saver, "c1")
+        saver.flush()
+        try:
+            saver.get_tuple(CONFIG)
+        except CheckpointWriteLost:
+            pass
+        else:
+            raise AssertionError("expected CheckpointWriteLost")
+        assert saver.get_tuple(CONFIG) is None
+    finally:
+        saver.close()
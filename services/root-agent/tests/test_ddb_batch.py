@@ -0,0 +1,60 @@
+# a2a_cash_flow_demo/services/root-agent/tests/test_ddb_batch.py
+
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import pytest
+
+from a2a.ddb_batch import BatchingTable, DynamoDBPutBatcher
+from a2a.fakes import FakeDynamoDBTable
+
+
+def throttle(table: FakeDynamoDBTable, pk: str, times: int) -> None:
+    """
+    Returns puts of `pk` as UnprocessedItems `times` times, like a hot partition.
+    """
+    client = table.meta.client
+    write = client.batch_write_item
+    remaining = [times]
+
+    def batch_write_item(RequestItems):
+        requests = RequestItems[table.name]
+        held = [r for r in requests if r["PutRequest"]["Item"]["PK"] == pk and remaining[0] > 0]
+        if held:
+            remaining[0] -= 1
+        sent = [r for r in requests if r not in held]
+        if sent:
+            write(RequestItems={table.name: sent})
+        return {"UnprocessedItems": {table.name: held} if held else {}}
+
+    client.batch_write_item = batch_write_item
+
+
+def test_throttled_item_does_not_hold_up_later_batches():
+    table = FakeDynamoDBTable()
+    throttle(table, "hot", times=2)
+    throttled = []
+    batcher = DynamoDBPutBatcher(table, linger_ms=1, retry_backoff_ms=300, on_throttle=lambda: throttled.append(1))
+    try:
+        hot = batcher.submit({"PK": "hot", "SK": "1"})
+        time.sleep(0.05)
+        cold = batcher.submit({"PK": "cold", "SK": "1"})
+        cold.result(timeout=0.2)
+        assert not hot.done()
+        hot.result(timeout=2)
+        assert len(throttled) == 2
+    finally:
+        batcher.close()
+
+
+def test_put_item_gives_up_after_the_timeout():
+    table = FakeDynamoDBTable()
+    throttle(table, "hot", times=100)
+    batching = BatchingTable(table, DynamoDBPutBatcher(table, linger_ms=1, max_retries=100, retry_backoff_ms=50), timeout=0.2)
+    try:
+        with pytest.raises(FutureTimeoutError):
+            batching.put_item(Item={"PK": "hot", "SK": "1"})
+        batching.put_item(Item={"PK": "cold", "SK": "1"})
+    finally:
+        batching._batcher.max_retries = 0
+        batching.close()
@@ -0,0 +1,74 @@
+# a2a_cash_flow_demo/services/root-agent/tests/test_events.py
+
+import time
+import asyncio
+
+from langchain_core.messages import AIMessage
+
+from a2a.events import TaskEventBroker, events_from_update
+from a2a.fakes import FakeRedis
+
+CHANNEL = "test:task-events"
+
+
+def wait_for_listeners(redis: FakeRedis, count: int) -> None:
+    deadline = time.monotonic() + 2
+    while len(redis._subscribers.get(CHANNEL, [])) < count:
+        assert time.monotonic() < deadline, "listeners never subscribed"
+        time.sleep(0.01)
+
+
+async def collect(stream) -> list:
+    return [chunk async for chunk in stream]
+
+
+async def no_snapshot():
+    return None
+
+
+def test_events_published_on_one_replica_reach_streams_on_another():
+    redis = FakeRedis()
+    replica_a = TaskEventBroker(redis, channel=CHANNEL)
+    replica_b = TaskEventBroker(redis, channel=CHANNEL)
+    try:
+        wait_for_listeners(redis, 2)
+
+        async def scenario():
+            stream = asyncio.create_task(collect(replica_b.stream("task-1", no_snapshot(), heartbeat_seconds=0.05, max_seconds=5)))
+            await asyncio.sleep(0.1)
+            updates = [
+                {"status": "drafting_response", "messages": [AIMessage(content="Recognized 42 transactions.")]},
+                {"status": "completed"},
+            ]
+            for update in updates:
+                for event in events_from_update("task-1", update):
+                    # 由 executor thread 發布，與 graph run 相同
+                    await asyncio.to_thread(replica_a.publish, event)
+            return await asyncio.wait_for(stream, timeout=2)
+
+        chunks = [chunk for chunk in asyncio.run(scenario()) if not chunk.startswith(":")]
+        assert [chunk.split("\n", 1)[0] for chunk in chunks] == ["event: status", "event: message", "event: status"]
+        assert '"completed"' in chunks[-1]
+    finally:
+        replica_a.close()
+        replica_b.close()
+
+
+def test_events_are_delivered_locally_while_redis_is_down():
+    redis = FakeRedis()
+    broker = TaskEventBroker(redis, channel=CHANNEL)
+    try:
+        wait_for_listeners(redis, 1)
+        redis.fail = True
+
+        async def scenario():
+            stream = asyncio.create_task(collect(broker.stream("task-1", no_snapshot(), heartbeat_seconds=0.05, max_seconds=5)))
+            await asyncio.sleep(0.1)
+            for event in events_from_update("task-1", {"status": "completed"}):
+                broker.publish(event)
+            return await asyncio.wait_for(stream, timeout=2)
+
+        chunks = [chunk for chunk in asyncio.run(scenario()) if not chunk.startswith(":")]
+        assert len(chunks) == 1 and '"completed"' in chunks[0]
+    finally:
+        broker.close()
@@ -0,0 +1,26 @@
+# a2a_cash_flow_demo/services/root-agent/tests/test_graph.py
+
+import pytest
+from langgraph.checkpoint.memory import InMemorySaver
+
+from a2a.checkpoint import CachedCheckpointSaver, FencedCheckpointSaver, SpillScopedSaver
+from a2a.ddb_batch import BatchingTable
+from a2a.fakes import FakeDynamoDBTable, FakeRedis, FakeS3Client
+from a2a.graph import close_checkpointer
+from a2a.instrumentation import InstrumentedCheckpointSaver
+from a2a.serde import S3BlobStore
+from a2a.thread_lock import check_thread_lease
+
+
+def test_close_checkpointer_flushes_the_batching_table_behind_every_wrapper():
+    durable = InMemorySaver()
+    durable.table = BatchingTable(FakeDynamoDBTable())
+    # 與 get_graph_app() 啟用 S3 外溢與 Redis 快取時的組合相同
+    checkpointer = SpillScopedSaver(durable, S3BlobStore(FakeS3Client(), "bucket"))
+    checkpointer = CachedCheckpointSaver(checkpointer, FakeRedis(), write_behind=True)
+    checkpointer = InstrumentedCheckpointSaver(FencedCheckpointSaver(checkpointer, check_thread_lease))
+
+    close_checkpointer(checkpointer)
+
+    with pytest.raises(RuntimeError, match="closed"):
+        durable.table.put_item(Item={"PK": "a", "SK": "b"})
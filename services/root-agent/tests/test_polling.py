@@ -0,0 +1,43 @@
+# a2a_cash_flow_demo/services/root-agent/tests/test_polling.py
+
+import asyncio
+
+import httpx
+
+from a2a.polling import PollScheduler
+
+
+def test_unreadable_result_body_is_polled_again():
+    responses = [
+        httpx.Response(200, text="<html>502 Bad Gateway</html>"),
+        httpx.Response(200, json=["not", "an", "object"]),
+        httpx.Response(200, json={"status": "RUNNING", "eta": "soon"}),
+        httpx.Response(200, json={"status": "SUCCEEDED", "result": {"ok": True}}),
+    ]
+    polled = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        polled.append(request.url.params["ticket"])
+        return responses[len(polled) - 1]
+
+    async def scenario():
+        results = []
+        done = asyncio.Event()
+
+        async def on_result(pending, body):
+            results.append((pending.task_id, body["result"]))
+            done.set()
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            scheduler = PollScheduler(client, on_result, min_interval=0.01, max_interval=0.05)
+            scheduler.start()
+            try:
+                scheduler.add("ticket-1", "http://remote-agent-1", "task-1", "TransactionRecognitionRequested")
+                await asyncio.wait_for(done.wait(), timeout=2)
+            finally:
+                await scheduler.stop()
+        assert results == [("task-1", {"ok": True})]
+        assert polled == ["ticket-1"] * 4
+        assert len(scheduler) == 0
+
+    asyncio.run(scenario())
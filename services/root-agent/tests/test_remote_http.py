@@ -0,0 +1,76 @@
+# a2a_cash_flow_demo/services/root-agent/tests/test_remote_http.py
+
+import asyncio
+
+import httpx
+
+from a2a.fakes import StubRemoteAgent
+from a2a.polling import PollScheduler
+from a2a.remote_http import RemoteInvoker, build_http_client
+
+BASE_URL = "http://remote-agent-1"
+
+
+def envelope(task_id: str) -> dict:
+    return {"task_id": task_id, "idempotency_key": f"{task_id}:recognize", "input": {}}
+
+
+def test_inline_result_from_an_executor_thread():
+    agent = StubRemoteAgent(inline=True, output={"transactions": 3})
+
+    async def scenario():
+        invoker = RemoteInvoker(asyncio.get_running_loop(), build_http_client(httpx.MockTransport(agent)))
+        try:
+            # graph 節點在 executor thread 上呼叫同步的 invoke
+            return await asyncio.to_thread(invoker.invoke, BASE_URL, envelope("task-1"))
+        finally:
+            await invoker.aclose()
+
+    status_code, body = asyncio.run(scenario())
+    assert status_code == 200
+    assert body["output"] == {"transactions": 3}
+    assert agent.calls == [("POST", "/a2a/invoke")]
+
+
+def test_accepted_ticket_is_polled_until_it_succeeds():
+    agent = StubRemoteAgent(inline=False, output={"transactions": 3}, eta_seconds=0.1)
+
+    async def scenario():
+        results = []
+        done = asyncio.Event()
+
+        async def on_result(pending, body):
+            results.append((pending.task_id, body["output"]))
+            done.set()
+
+        client = build_http_client(httpx.MockTransport(agent))
+        invoker = RemoteInvoker(asyncio.get_running_loop(), client)
+        scheduler = PollScheduler(client, on_result, min_interval=0.02, max_interval=0.2)
+        scheduler.start()
+        try:
+            status_code, body = await invoker.ainvoke(BASE_URL, envelope("task-1"))
+            assert status_code == 202
+            scheduler.add(body["ticket"], BASE_URL, "task-1", "Task.RecognizeTransactions", eta=body["eta"])
+            await asyncio.wait_for(done.wait(), timeout=2)
+        finally:
+            await scheduler.stop()
+            await invoker.aclose()
+        return results
+
+    assert asyncio.run(scenario()) == [("task-1", {"transactions": 3})]
+    assert agent.calls[0] == ("POST", "/a2a/invoke")
+    assert ("GET", "/a2a/result") in agent.calls
+
+
+def test_unavailable_agent_answers_503():
+    agent = StubRemoteAgent()
+    agent.fail = True
+
+    async def scenario():
+        invoker = RemoteInvoker(asyncio.get_running_loop(), build_http_client(httpx.MockTransport(agent)))
+        try:
+            return await invoker.ainvoke(BASE_URL, envelope("task-1"))
+        finally:
+            await invoker.aclose()
+
+    assert asyncio.run(scenario()) == (503, {"error": "unavailable"})
@@ -0,0 +1,72 @@
+# a2a_cash_flow_demo/services/root-agent/tests/test_thread_lock.py
+
+import time
+import asyncio
+
+import pytest
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.memory import InMemorySaver
+
+from a2a.checkpoint import FencedCheckpointSaver
+from a2a.executor import GRAPH_EXECUTOR_WORKERS, get_executor, run_blocking
+from a2a.fakes import FakeRedis
+from a2a.thread_lock import (
+    RedisThreadLeases,
+    ThreadBusyError,
+    ThreadLeaseLost,
+    ThreadLocker,
+    check_thread_lease,
+)
+
+KEY_PREFIX = "test:thread_lock"
+
+
+def locker(redis: FakeRedis, lease_seconds: float = 0.3) -> ThreadLocker:
+    return ThreadLocker(RedisThreadLeases(redis, lease_seconds=lease_seconds, key_prefix=KEY_PREFIX), wait_seconds=0.2, retry_seconds=0.01)
+
+
+def put(saver: FencedCheckpointSaver, thread_id: str) -> None:
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    saver.put(config, empty_checkpoint(), {}, {})
+
+
+def test_lease_is_renewed_while_the_graph_executor_is_saturated():
+    async def scenario():
+        redis = FakeRedis()
+        async with locker(redis).hold("t-1") as lease:
+            busy = [get_executor().submit(time.sleep, 0.8) for _ in range(GRAPH_EXECUTOR_WORKERS)]
+            await asyncio.sleep(0.6)
+            lease.fence()
+            assert redis.exists(f"{KEY_PREFIX}:t-1")
+        for future in busy:
+            future.result()
+
+    asyncio.run(scenario())
+
+
+def test_checkpoint_write_is_refused_after_the_lease_is_taken_over():
+    async def scenario():
+        redis = FakeRedis()
+        saver = FencedCheckpointSaver(InMemorySaver(), check_thread_lease)
+        async with locker(redis, lease_seconds=30).hold("t-1"):
+            await run_blocking(put, saver, "t-1")
+            # 模擬 lease 過期後被另一個 worker 取得
+            redis.set(f"{KEY_PREFIX}:t-1", b"other-worker")
+            with pytest.raises(ThreadLeaseLost):
+                await run_blocking(put, saver, "t-1")
+            # 其他 thread 不受影響
+            await run_blocking(put, saver, "t-2")
+        assert saver.get_tuple({"configurable": {"thread_id": "t-1", "checkpoint_ns": ""}}) is not None
+
+    asyncio.run(scenario())
+
+
+def test_lease_store_outage_fails_closed():
+    async def scenario():
+        redis = FakeRedis()
+        redis.fail = True
+        with pytest.raises(ThreadBusyError):
+            async with locker(redis).hold("t-1"):
+                pass
+
+    asyncio.run(scenario())
@@ -57,6 +57,17 @@ resource "aws_dynamodb_table" "a2a_tasks_table" {
     type = "S"
   }
 
+  # deadline GSI：只有等待 remote agent 結果的任務有這兩個屬性 (sparse)
+  attribute {
+    name = "deadline_shard"
+    type = "S"
+  }
+
+  attribute {
+    name = "due_at"
+    type = "N"
+  }
+
   # 保留你原本的 GSI（查 checkpoint_ns + checkpoint_id）
   global_secondary_index {
     name            = "checkpoint_ns-checkpoint_id-index"
@@ -65,6 +76,14 @@ resource "aws_dynamodb_table" "a2a_tasks_table" {
     projection_type = "ALL"
   }
 
+  # TASK_DEADLINE_BACKEND=dynamodb 時，sweeper 以此查出已逾時的任務
+  global_secondary_index {
+    name            = "deadline_shard-due_at-index"
+    hash_key        = "deadline_shard"
+    range_key       = "due_at"
+    projection_type = "KEYS_ONLY"
+  }
+
   tags = {
     Name        = var.a2a_tasks_table_name
     Environment = "demo"
@@ -95,6 +114,29 @@ resource "aws_dynamodb_table" "a2a_audit_table" {
   }
 }
 
+# ds_demo_a2a_callback_dedupe - callback 去重 (CALLBACK_DEDUPE_BACKEND=dynamodb)
+resource "aws_dynamodb_table" "a2a_callback_dedupe_table" {
+  name         = var.a2a_callback_dedupe_table_name
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "dedupe_key"
+
+  attribute {
+    name = "dedupe_key"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
+  tags = {
+    Name        = var.a2a_callback_dedupe_table_name
+    Environment = "demo"
+    Purpose     = "callback-idempotency"
+  }
+}
+
 # 輸出 DynamoDB 表格的 ARN
 output "a2a_tasks_table_arn" {
   value = aws_dynamodb_table.a2a_tasks_table.arn
@@ -104,6 +146,28 @@ output "a2a_audit_table_arn" {
   value = aws_dynamodb_table.a2a_audit_table.arn
 }
 
+# ds-demo-a2a-checkpoint-spill - 超過 CHECKPOINT_SPILL_MIN_BYTES 的 checkpoint blob
+# (key 為 checkpoints/<thread_id>/<內容的 SHA-256>，item 只存 s3:// reference)；
+# root agent prune / 刪除 checkpoint 時一併刪除不再被引用的 blob，不使用 lifecycle 到期
+# (到期會刪掉仍被 checkpoint 引用的 blob)
+resource "aws_s3_bucket" "a2a_checkpoint_spill" {
+  bucket = var.a2a_checkpoint_spill_bucket_name
+
+  tags = {
+    Name        = var.a2a_checkpoint_spill_bucket_name
+    Environment = "demo"
+    Purpose     = "langgraph-checkpoint-spill"
+  }
+}
+
+resource "aws_s3_bucket_public_access_block" "a2a_checkpoint_spill" {
+  bucket                  = aws_s3_bucket.a2a_checkpoint_spill.id
+  block_public_acls       = true
+  block_public_policy     = true
+  ignore_public_acls      = true
+  restrict_public_buckets = true
+}
+
 # ----------------------------------------
 # 區塊 2: SQS Queues & EventBridge (訊息傳遞)
 # ----------------------------------------
@@ -133,16 +197,42 @@ resource "aws_sqs_queue" "remote_b_queue" {
 }
 
 # SQS.callback: Remote Agent 完成工作後回報給 Root Agent 的佇列
+# 處理失敗的訊息重送 maxReceiveCount 次後移到 DLQ，不會在 retention 期間內無限重送
 resource "aws_sqs_queue" "callback_queue" {
   name                      = var.callback_queue_name
   message_retention_seconds = 1209600
 
+  redrive_policy = jsonencode({
+    deadLetterTargetArn = aws_sqs_queue.callback_dlq.arn
+    maxReceiveCount     = var.callback_max_receive_count
+  })
+
   tags = {
     Name        = var.callback_queue_name
     Environment = "demo"
   }
 }
 
+# SQS.callback-dlq: 一直處理失敗的 callback，保留給人工檢查或 redrive
+resource "aws_sqs_queue" "callback_dlq" {
+  name                      = "${var.callback_queue_name}-dlq"
+  message_retention_seconds = 1209600
+
+  tags = {
+    Name        = "${var.callback_queue_name}-dlq"
+    Environment = "demo"
+  }
+}
+
+resource "aws_sqs_queue_redrive_allow_policy" "callback_dlq" {
+  queue_url = aws_sqs_queue.callback_dlq.id
+
+  redrive_allow_policy = jsonencode({
+    redrivePermission = "byQueue"
+    sourceQueueArns   = [aws_sqs_queue.callback_queue.arn]
+  })
+}
+
 # SQS.hitl: Remote Agent 需要人工作業時回報給 Root Agent 的佇列
 resource "aws_sqs_queue" "hitl_queue" {
   name                      = var.hitl_queue_name
@@ -408,10 +498,41 @@ data "aws_iam_policy_document" "root_agent_permissions" {
     resources = [
       aws_dynamodb_table.a2a_tasks_table.arn,
       "${aws_dynamodb_table.a2a_tasks_table.arn}/index/*",
-      aws_dynamodb_table.a2a_audit_table.arn
+      aws_dynamodb_table.a2a_audit_table.arn,
+      aws_dynamodb_table.a2a_callback_dedupe_table.arn
     ]
   }
 
+  # S3 權限 (checkpoint 外溢)
+  statement {
+    sid    = "CheckpointSpillAccess"
+    effect = "Allow"
+    actions = [
+      "s3:PutObject",
+      "s3:GetObject",
+      "s3:DeleteObject"
+    ]
+    resources = [
+      "${aws_s3_bucket.a2a_checkpoint_spill.arn}/checkpoints/*"
+    ]
+  }
+
+  statement {
+    sid    = "CheckpointSpillList"
+    effect = "Allow"
+    actions = [
+      "s3:ListBucket"
+    ]
+    resources = [
+      aws_s3_bucket.a2a_checkpoint_spill.arn
+    ]
+    condition {
+      test     = "StringLike"
+      variable = "s3:prefix"
+      values   = ["checkpoints/*"]
+    }
+  }
+
   # EventBridge 權限 (發送任務到 Remote Agents)
   statement {
     sid    = "EventBridgeAccess"
@@ -652,6 +773,10 @@ output "callback_queue_url" {
   value = aws_sqs_queue.callback_queue.id
 }
 
+output "callback_dlq_url" {
+  value = aws_sqs_queue.callback_dlq.id
+}
+
 output "hitl_queue_url" {
   value = aws_sqs_queue.hitl_queue.id
 }
@@ -20,6 +20,21 @@ variable "a2a_audit_table_name" {
   type        = string
 }
 
+variable "a2a_callback_dedupe_table_name" {
+  description = "DynamoDB table for callback idempotency keys"
+  type        = string
+  default     = "ds_demo_a2a_callback_dedupe"
+}
+
+# ----------------------------------------
+# S3 (checkpoint spill)
+# ----------------------------------------
+variable "a2a_checkpoint_spill_bucket_name" {
+  description = "S3 bucket for checkpoint blobs too large for a DynamoDB item (CHECKPOINT_SPILL_BUCKET)"
+  type        = string
+  default     = "ds-demo-a2a-checkpoint-spill"
+}
+
 # ----------------------------------------
 # SQS Queues
 # ----------------------------------------
@@ -38,6 +53,12 @@ variable "callback_queue_name" {
   type        = string
 }
 
+variable "callback_max_receive_count" {
+  description = "Receives of a callback message before SQS moves it to the callback DLQ"
+  type        = number
+  default     = 5
+}
+
 variable "hitl_queue_name" {
   description = "SQS Queue for Human-in-the-Loop requests"
   type        = string